@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+Decapsulates many captures in one run. Directories and globs are expanded to capture files, which
+are handed to a pool of worker processes largest first, so that one big file left until last does
+not leave the other workers idle. Each worker imports the project once and then decapsulates file
+after file, writing each to decap_<name> as ``run_me.py`` would. A file that fails is reported and
+the rest carry on.
+
+.. example::
+
+    ``` bash
+    python batch.py --jobs 8 /var/captures/2026-10-17/ '/var/captures/archive/*.pcap.gz'
+    ```
+"""
+
+##
+# Fix Path
+import __init__
+
+##
+# Python Imports
+import io
+import os
+import sys
+import glob
+import time
+import fnmatch
+import argparse
+import functools
+import multiprocessing
+
+##
+# Project Imports
+from reader        import open_reader
+from pcapng        import PCAPNG_Writer
+from writer        import PCAP_Writer
+from compression   import open_input, open_output
+from packet_tunnel import Tunnel_Packet
+from decoders      import DEFAULT_DEPTH
+from tolerant      import Tolerant_Decoder
+from index         import INDEX_SUFFIX
+
+##
+# Error Handling
+from errors import GenericException
+class Batch_Error(GenericException):
+    """ Errors relating to batch decapsulation.
+    """
+    pass
+
+##
+# Global Variables
+OUTPUT_PREFIXES = ("decap_", "quarantine_")     # Our own output, never taken as input
+
+
+def find_captures(paths, pattern="*", recursive=False):
+    """ Expands ``paths`` (capture files, directories and globs) into capture files. Directories
+    contribute the files whose names match ``pattern``. Sidecar indexes and earlier output are left
+    out, as are files named more than once.
+
+    :rtype: list of str
+    """
+    found = []
+    for path in paths:
+        for match in sorted(glob.glob(path)) or [path]:
+            if not os.path.isdir(match):
+                found.append(match)
+                continue
+            for (directory, subdirectories, filenames) in os.walk(match):
+                subdirectories.sort()
+                found.extend(os.path.join(directory, filename)
+                             for filename in sorted(filenames)
+                             if fnmatch.fnmatch(filename, pattern))
+                if not recursive:
+                    break
+    captures = []
+    seen     = set()
+    for path in found:
+        name = os.path.basename(path)
+        if name.startswith(OUTPUT_PREFIXES) or name.endswith(INDEX_SUFFIX):
+            continue
+        if os.path.abspath(path) not in seen:
+            seen.add(os.path.abspath(path))
+            captures.append(path)
+    return captures
+
+
+def output_path(in_path, output_dir=None):
+    """ decap_<name>, next to the capture or in ``output_dir``.
+    """
+    return os.path.join(output_dir or os.path.dirname(in_path),
+                        "decap_" + os.path.basename(in_path))
+
+
+def decapsulate_file(args):
+    """ Worker: decapsulates one capture by streaming it, as ``run_me.py`` does without options.
+    Any error is caught and returned rather than raised, and the partial output is removed, so one
+    bad file cannot take down the pool.
+
+    :type  args: (str, str, int, str or None, bool)
+    :param args: ``(in_path, out_path, depth, format, keep_going)``, packed into one tuple for
+        ``Pool.imap_unordered``.
+
+    :rtype:   (str, str, int, int, float, str or None)
+    :returns: ``in_path``, ``out_path``, the number of packets written, the size of the capture,
+        the seconds taken and the error, if there was one.
+    """
+    (in_path, out_path, depth, format, keep_going) = args
+    started      = time.time()
+    packet_count = 0
+    try:
+        size         = os.path.getsize(in_path)
+        packet_class = functools.partial(Tunnel_Packet, depth=depth)
+        with io.open(in_path, "rb") as raw_file:
+            reader = open_reader(open_input(raw_file), resync=keep_going)
+            if (format or reader.format) == "pcapng":
+                (writer_class, packets) = (PCAPNG_Writer, reader.iter_packets(packet_class))
+            else:
+                (writer_class, packets) = (PCAP_Writer,
+                                           reader.iter_classic_packets(packet_class))
+            if keep_going:
+                if writer_class is PCAPNG_Writer and reader.format == "pcapng":
+                    records = reader.iter_records()
+                else:
+                    records = reader.iter_classic_records()
+                packets = Tolerant_Decoder(packet_class).decode(records)
+            with open_output(out_path) as out_file:
+                with writer_class(out_file, reader.pcap_header) as writer:
+                    for packet in packets:
+                        writer.write_packet(packet)
+                packet_count = writer.packet_count
+    except Exception as error:
+        if os.path.exists(out_path):
+            os.remove(out_path)
+        return (in_path, out_path, 0, 0, time.time() - started,
+                error.__class__.__name__ + ": " + str(error))
+    return (in_path, out_path, packet_count, size, time.time() - started, None)
+
+
+def decapsulate_batch(in_paths, jobs=1, output_dir=None, depth=DEFAULT_DEPTH, format=None,
+                      keep_going=False):
+    """ Decapsulates every capture of ``in_paths`` using ``jobs`` worker processes, largest first.
+    With one job the captures are decapsulated in this process. The arguments are checked before
+    anything is decapsulated, so a :class:`Batch_Error` is raised by this call rather than once the
+    results are iterated.
+
+    :rtype:   generator of tuples
+    :returns: The result of :func:`decapsulate_file` for each capture, as it finishes.
+    """
+    if jobs < 1:
+        raise Batch_Error("jobs must be at least 1, received " + str(jobs))
+    in_paths = sorted(in_paths, key=lambda path: os.path.getsize(path) if os.path.isfile(path)
+                      else 0, reverse=True)
+    tasks    = [(in_path, output_path(in_path, output_dir), depth, format, keep_going)
+                for in_path in in_paths]
+    inputs   = {}
+    for (in_path, out_path, _, _, _) in tasks:
+        if out_path in inputs:
+            raise Batch_Error(inputs[out_path] + " and " + in_path + " would both be written " +
+                              "to " + out_path)
+        inputs[out_path] = in_path
+    return iter_batch(tasks, jobs)
+
+
+def iter_batch(tasks, jobs):
+    """ Runs :func:`decapsulate_file` over ``tasks``, yielding each result as it finishes.
+    """
+    if jobs == 1 or len(tasks) < 2:
+        for task in tasks:
+            yield decapsulate_file(task)
+        return
+    pool = multiprocessing.Pool(min(jobs, len(tasks)))
+    try:
+        # One task at a time, so a worker only takes the next file once it is free
+        for result in pool.imap_unordered(decapsulate_file, tasks, chunksize=1):
+            yield result
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Decapsulate many captures in one run.")
+    parser.add_argument("paths", nargs="+", metavar="PATH",
+                        help="Captures, directories of captures and globs.")
+    parser.add_argument("-j", "--jobs", type=int, default=multiprocessing.cpu_count(),
+                        help="Decapsulate this many captures at once (default: %(default)s).")
+    parser.add_argument("-d", "--output-dir", metavar="DIR",
+                        help="Write every decap_<name> to DIR (default: next to its capture).")
+    parser.add_argument("--pattern", default="*",
+                        help="The names of the captures to take from directories " +
+                             "(default: %(default)s).")
+    parser.add_argument("-r", "--recursive", action="store_true",
+                        help="Take captures from subdirectories too.")
+    parser.add_argument("--format", choices=["pcap", "pcapng"],
+                        help="Output format (default: the same as the input).")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, metavar="N",
+                        help="Peel off up to N nested tunnels per packet; 0 peels off every " +
+                             "recognized tunnel (default: %(default)s).")
+    parser.add_argument("--keep-going", action="store_true",
+                        help="Pass records that fail to decode through unchanged, and skip " +
+                             "past corrupted record lengths.")
+    return parser
+
+
+def parse_args(argv):
+    parser = build_parser()
+    args   = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.depth < 0:
+        parser.error("--depth must be 0 or more")
+    if args.output_dir and not os.path.isdir(args.output_dir):
+        parser.error("--output-dir " + args.output_dir + " is not a directory")
+    return args
+
+
+if __name__ == "__main__":
+    args     = parse_args(sys.argv[1:])
+    captures = find_captures(args.paths, args.pattern, args.recursive)
+    if not captures:
+        sys.stderr.write("No captures found\n")
+        sys.exit(1)
+    try:
+        results = decapsulate_batch(captures, args.jobs, args.output_dir, args.depth, args.format,
+                                    args.keep_going)
+    except Batch_Error as error:
+        # e.g. two captures of the same name sent to one --output-dir
+        build_parser().error(str(error))
+    started = time.time()
+    (total_packets, total_bytes, failed) = (0, 0, 0)
+    for (in_path, out_path, packets, size, seconds, error) in results:
+        if error is not None:
+            failed += 1
+            sys.stderr.write("FAILED %s: %s\n" % (in_path, error))
+            continue
+        total_packets += packets
+        total_bytes   += size
+        sys.stderr.write("%s: %d packets, %.1f MB in %.2fs (%.1f MB/s) -> %s\n" %
+                         (in_path, packets, size / 1e6, seconds,
+                          size / 1e6 / max(seconds, 1e-6), out_path))
+    elapsed = time.time() - started
+    sys.stderr.write("%d captures, %d failed; %d packets, %.1f MB in %.2fs (%.1f MB/s)\n" %
+                     (len(captures), failed, total_packets, total_bytes / 1e6, elapsed,
+                      total_bytes / 1e6 / max(elapsed, 1e-6)))
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+Micro-benchmarks for the per-packet hot path. Each benchmark reports the time taken per call, so
+that a change to the header/frame decoding can be compared against the previous approach.
+
+With ``--stages`` it instead runs each stage of decapsulation (Packet Header parse, ``Packet``
+parse, ``Tunnel_Packet`` parse, decapsulate, write, and all of them end to end) over a capture, by
+default a synthetic one (see :mod:`synthetic`). Each stage runs in a process of its own and reports
+packets/s, MB/s and how much its RSS grew while it ran, on top of the records it preloaded. The
+results can be saved as JSON and compared against an earlier run.
+
+.. example::
+
+    ``` bash
+    python benchmark.py
+    python benchmark.py --stages --output before.json
+    python benchmark.py --stages --compare before.json
+    ```
+"""
+
+##
+# Fix Path
+import __init__
+
+##
+# Python Imports
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import timeit
+import argparse
+import binascii
+import platform
+import resource
+import tempfile
+import multiprocessing
+
+##
+# Project Imports
+from codec          import PCAP_Codec, INTERNET
+from header_pcap    import PCAP_Header
+from header_packet  import Packet_Header
+from packet         import Packet
+from packet_tunnel  import Tunnel_Packet
+from reader         import PCAP_Reader
+from writer         import PCAP_Writer
+from tolerant       import DECODE_ERRORS
+import synthetic
+
+##
+# Global Variables
+ITERATIONS = 100000
+
+PCAP_HEADER_BYTES = ("\xd4\xc3\xb2\xa1\x02\x00\x04\x00" + "\x00" * 8 +
+                     "\xff\xff\x00\x00\x01\x00\x00\x00")
+INTERNET_BYTES    = ("\x45\x00\x00\x53\x00\x01\x00\x00\x40\x01\x00\x00" +
+                     "\x0a\x00\x00\x01\x0a\x00\x00\x02")
+PAYLOAD_BYTES     = "\x45\x00\x00\x37" + "\x00" * 16 + "X" * 35
+ICMP_BYTES        = "\x08\x00\x00\x00\x00\x07\x00\x01" + PAYLOAD_BYTES
+ETHERNET_BYTES    = "\x00\x11\x22\x33\x44\x55\x66\x77\x88\x99\xaa\xbb\x08\x00"
+FRAME_BYTES       = ETHERNET_BYTES + INTERNET_BYTES + ICMP_BYTES
+RECORD_BYTES      = (PCAP_Codec("<", False).packet_header.pack(1000, 1, len(FRAME_BYTES),
+                                                                 len(FRAME_BYTES)) + FRAME_BYTES)
+STAGES            = ("packet_header", "packet", "tunnel_packet", "decapsulate", "write",
+                     "end_to_end")
+
+
+##
+# The previous hexlify-based decoding, kept here only as the baseline to compare against
+def legacy_flip_bytes(bytes):
+    byte_list = list(bytes)
+    if binascii.hexlify(PCAP_HEADER_BYTES[0:4]) in ["d4c3b2a1", "4d3cb2a1"]:
+        byte_list.reverse()
+    return ''.join(byte_list)
+
+
+def legacy_packet_header(bytes):
+    return (int(binascii.hexlify(legacy_flip_bytes(bytes[0:4])), 16),
+            int(binascii.hexlify(legacy_flip_bytes(bytes[4:8])), 16),
+            int(binascii.hexlify(legacy_flip_bytes(bytes[8:12])), 16),
+            int(binascii.hexlify(legacy_flip_bytes(bytes[12:16])), 16))
+
+
+def legacy_internet_frame(bytes):
+    return (bytes[0], bytes[1], int(binascii.hexlify(bytes[2:4]), 16), bytes[4:6], bytes[6:8],
+            bytes[8], int(binascii.hexlify(bytes[9]), 16), bytes[10:12], bytes[12:16],
+            bytes[16:20])
+
+
+##
+# Benchmarks
+def run(name, func, iterations=ITERATIONS):
+    """ Times ``func`` and prints the cost of a single call.
+
+    :rtype:   float
+    :returns: Microseconds per call.
+    """
+    per_call = min(timeit.repeat(func, number=iterations, repeat=3)) / iterations * 1e6
+    print "%-40s %8.3f us/call" % (name, per_call)
+    return per_call
+
+
+def micro_benchmarks():
+    pcap_header = PCAP_Header(PCAP_HEADER_BYTES)
+    codec       = pcap_header.codec
+    results     = []
+    results.append(("packet header",
+                    run("packet header (hexlify)", lambda: legacy_packet_header(RECORD_BYTES)),
+                    run("packet header (struct)",
+                        lambda: codec.packet_header.unpack_from(RECORD_BYTES, 0))))
+    results.append(("internet frame",
+                    run("internet frame (hexlify)",
+                        lambda: legacy_internet_frame(INTERNET_BYTES)),
+                    run("internet frame (struct)", lambda: INTERNET.unpack_from(INTERNET_BYTES))))
+    run("Packet_Header object", lambda: Packet_Header(pcap_header, RECORD_BYTES))
+    run("Packet object", lambda: Packet(pcap_header, RECORD_BYTES), ITERATIONS / 10)
+    run("Packet object + decapsulate",
+        lambda: Packet(pcap_header, RECORD_BYTES).decapsulate(), ITERATIONS / 10)
+    print ""
+    for (name, before, after) in results:
+        print "%-40s %8.1fx faster" % (name, before / after)
+
+
+##
+# Stage Benchmarks
+def load_records(path):
+    """ Reads every record of the capture at ``path`` into memory, so that the stages that parse
+    them do not also time reading the file.
+
+    :rtype: (:class:`header_pcap.PCAP_Header`, list of **binary** strings)
+    """
+    with io.open(path, "rb") as in_file:
+        reader = PCAP_Reader(in_file)
+        return (reader.pcap_header,
+                [str(record) for (_, record) in reader.iter_classic_records()])
+
+
+def prepare_stage(name, path, pcap_header, records):
+    """ Does everything ``name`` needs before it is timed, from the records preloaded by
+    :func:`load_records` (unused by ``end_to_end``, which reads ``path`` itself).
+
+    :rtype:   callable
+    :returns: Runs the stage once, returning the number of packets and bytes it went through.
+    """
+    if name == "end_to_end":
+        def end_to_end():
+            with io.open(path, "rb") as in_file:
+                reader = PCAP_Reader(in_file)
+                with io.open(os.devnull, "wb") as out_file:
+                    with PCAP_Writer(out_file, reader.pcap_header) as writer:
+                        for packet in reader.iter_classic_packets(Tunnel_Packet):
+                            writer.write_packet(packet)
+            return (writer.packet_count, os.path.getsize(path))
+        return end_to_end
+    size = sum(len(record) for record in records)
+    if name == "packet_header":
+        return lambda: (len([Packet_Header(pcap_header, record) for record in records]), size)
+    if name == "packet":
+        # The frame-by-frame Packet only understands ICMP, so it gets the ICMP tunnels
+        icmp_records = []
+        for record in records:
+            try:
+                Packet(pcap_header, record)
+            except DECODE_ERRORS:
+                continue
+            icmp_records.append(record)
+        icmp_size = sum(len(record) for record in icmp_records)
+        return lambda: (len([Packet(pcap_header, record) for record in icmp_records]), icmp_size)
+    if name == "tunnel_packet":
+        return lambda: (len([Tunnel_Packet(pcap_header, record) for record in records]), size)
+    packets = [Tunnel_Packet(pcap_header, record) for record in records]
+    if name == "decapsulate":
+        return lambda: (len([packet.decapsulate_parts() for packet in packets]), size)
+    if name == "write":
+        def write():
+            with io.open(os.devnull, "wb") as out_file:
+                with PCAP_Writer(out_file, pcap_header) as writer:
+                    for packet in packets:
+                        writer.write_packet(packet)
+            return (writer.packet_count, size)
+        return write
+    raise ValueError("Unknown stage " + name)
+
+
+def run_stage(args):
+    """ Worker: times the fastest of ``repeat`` runs of one stage. The RSS is measured once the
+    records are loaded and again at the end, so that ``rss_growth_kb`` is what the stage itself
+    used rather than the size of the capture.
+
+    :type  args: (str, str, int)
+    :param args: ``(name, path, repeat)``, packed into one tuple for ``Pool.apply``.
+
+    :rtype: dict
+    """
+    (name, path, repeat)   = args
+    (pcap_header, records) = (None, []) if name == "end_to_end" else load_records(path)
+    loaded_rss             = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    stage                  = prepare_stage(name, path, pcap_header, records)
+    best                   = None
+    for _ in xrange(repeat):
+        started          = timeit.default_timer()
+        (packets, bytes) = stage()
+        seconds          = timeit.default_timer() - started
+        best             = seconds if best is None else min(best, seconds)
+    best     = max(best, 1e-9)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"packets":         packets,
+            "bytes":           bytes,
+            "seconds":         round(best, 6),
+            "packets_per_sec": round(packets / best, 1),
+            "mb_per_sec":      round(bytes / best / 1e6, 3),
+            "loaded_rss_kb":   loaded_rss,
+            "peak_rss_kb":     peak_rss,
+            "rss_growth_kb":   peak_rss - loaded_rss}
+
+
+def run_stages(path, stages=STAGES, repeat=3):
+    """ Runs each of ``stages`` over the capture at ``path``, each in a fresh process.
+
+    :rtype:   dict
+    :returns: The results of :func:`run_stage`, by stage name.
+    """
+    results = {}
+    for name in stages:
+        pool = multiprocessing.Pool(1)
+        try:
+            results[name] = pool.apply(run_stage, ((name, path, repeat),))
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+        print_stage(name, results[name])
+    return results
+
+
+def print_stage(name, result):
+    """ Prints one line of a stage's results.
+    """
+    print "%-15s %10d packets %12.0f packets/s %9.2f MB/s %9d KB RSS growth" % (
+        name, result["packets"], result["packets_per_sec"], result["mb_per_sec"],
+        result["rss_growth_kb"])
+
+
+def compare(baseline, results):
+    """ Prints the change in packets/s and RSS growth of each stage against ``baseline``.
+    """
+    print ""
+    print "%-15s %14s %14s %8s %11s" % ("stage", "before pkt/s", "after pkt/s", "change",
+                                         "RSS growth")
+    for name in STAGES:
+        if name not in baseline or name not in results:
+            continue
+        (before, after) = (baseline[name], results[name])
+        print "%-15s %14.0f %14.0f %+7.1f%% %+8d KB" % (
+            name, before["packets_per_sec"], after["packets_per_sec"],
+            (after["packets_per_sec"] / max(before["packets_per_sec"], 1e-9) - 1) * 100,
+            after["rss_growth_kb"] - before["rss_growth_kb"])
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark decapsulation.")
+    parser.add_argument("--stages", action="store_true",
+                        help="Benchmark each stage over a whole capture instead of the " +
+                             "micro-benchmarks.")
+    suite = parser.add_argument_group("stage benchmarks")
+    suite.add_argument("--capture", metavar="PATH",
+                       help="Benchmark this capture (default: a synthetic one).")
+    suite.add_argument("--only", metavar="STAGE[,STAGE...]",
+                       help="Only run these stages, from " + ", ".join(STAGES) + ".")
+    suite.add_argument("--repeat", type=int, default=3,
+                       help="Time each stage this many times and keep the fastest " +
+                            "(default: %(default)s).")
+    suite.add_argument("-o", "--output", metavar="PATH",
+                       help="Write the results to PATH as JSON.")
+    suite.add_argument("--compare", metavar="PATH",
+                       help="Compare against the results of an earlier run.")
+    synthetic.add_arguments(parser.add_argument_group("synthetic capture"))
+    args = parser.parse_args(argv)
+    args.only = args.only.split(",") if args.only else list(STAGES)
+    for name in args.only:
+        if name not in STAGES:
+            parser.error("unknown stage '" + name + "'")
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    return args
+
+
+def main(argv):
+    args = parse_args(argv)
+    if not args.stages:
+        return micro_benchmarks()
+    report = {"python":    platform.python_version(),
+              "platform":  platform.platform(),
+              "timestamp": int(time.time()),
+              "repeat":    args.repeat}
+    temp_dir = None
+    try:
+        if args.capture:
+            path              = args.capture
+            report["capture"] = {"path": path}
+        else:
+            temp_dir = tempfile.mkdtemp(prefix="decap_bench_")
+            path     = os.path.join(temp_dir, "synthetic.pcap")
+            with open(path, "wb") as out_file:
+                synthetic.write_capture(out_file, args.packets, args.sizes, args.mix,
+                                        ">" if args.big_endian else "<", args.nanosecond,
+                                        args.seed)
+            report["capture"] = {"packets":    args.packets,
+                                 "sizes":      args.sizes,
+                                 "mix":        args.mix,
+                                 "big_endian": args.big_endian,
+                                 "nanosecond": args.nanosecond,
+                                 "seed":       args.seed}
+        report["capture"]["bytes"] = os.path.getsize(path)
+        report["stages"]           = run_stages(path, args.only, args.repeat)
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    if args.output:
+        with open(args.output, "wb") as out_file:
+            json.dump(report, out_file, indent=1, separators=(",", ": "), sort_keys=True)
+            out_file.write("\n")
+    if args.compare:
+        with open(args.compare, "rb") as in_file:
+            baseline = json.load(in_file)
+        if baseline["capture"] != report["capture"]:
+            sys.stderr.write("Warning: %s was run over a different capture\n" % args.compare)
+        compare(baseline["stages"], report["stages"])
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,102 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+:ref:    https://wiki.wireshark.org/Development/LibpcapFileFormat
+
+Precompiled :class:`struct.Struct` codecs for every header and frame. The LibPCAP headers are
+written in the byte order of the capturing machine, so their codec is chosen once per file from the
+magic number; everything on the wire is in network (big endian) byte order.
+"""
+
+##
+# Python Imports
+import struct
+
+##
+# Project Imports
+
+##
+# Error Handling
+from errors import GenericException
+class Codec_Error(GenericException):
+    """ Errors relating to choosing or using a codec.
+    """
+    pass
+
+##
+# Global Variables
+MAGIC_MICRO = 0xa1b2c3d4
+MAGIC_NANO  = 0xa1b23c4d
+
+# Wire formats are always network byte order, so they are shared by every capture
+ETHERNET = struct.Struct("!6s6sH")          # dst_mac, src_mac, type
+INTERNET = struct.Struct("!BBHHHBBH4s4s")   # ver_head_len ... dst_ip
+ICMP     = struct.Struct("!BBHHH")          # type, code, checksum, identifier, sequence
+# Only the fields decapsulation needs, read from byte 12 of the Ethernet Frame onwards:
+# Ethernet type, IPv4 ver_head_len, total_len and protocol
+FRAME_SUMMARY = struct.Struct("!HBxH5xB")
+# Only the fields the protocol decoders dispatch on
+IPV4_SUMMARY  = struct.Struct("!BxH2xHxB")  # ver_head_len, total_len, flags, protocol
+IPV6_SUMMARY  = struct.Struct("!4xHB")      # payload_len, next_header
+UDP      = struct.Struct("!HHHH")           # src_port, dst_port, length, checksum
+GRE      = struct.Struct("!HH")             # flags_version, protocol_type
+TCP      = struct.Struct("!HHIIBB")         # src_port, dst_port, seq, ack, data_offset, flags
+UINT8    = struct.Struct("!B")
+UINT16   = struct.Struct("!H")
+UINT32   = struct.Struct("!I")
+UINT64   = struct.Struct("!Q")
+
+
+class PCAP_Codec(object):
+    """ The precompiled structures needed to decode and encode one capture's LibPCAP headers.
+
+    :type byte_order: str
+    :ivar byte_order: The :mod:`struct` byte order character, ``"<"`` or ``">"``.
+
+    :type nanosecond: bool
+    :ivar nanosecond: True when ``ts_usec`` holds nanoseconds rather than microseconds.
+
+    :type pcap_header: :class:`struct.Struct`
+    :ivar pcap_header: magic_number, version_major, version_minor, thiszone, sigfigs, snaplen,
+        network.
+
+    :type packet_header: :class:`struct.Struct`
+    :ivar packet_header: ts_sec, ts_usec, incl_len, orig_len.
+    """
+    def __init__(self, byte_order, nanosecond):
+        self.byte_order    = byte_order
+        self.nanosecond    = nanosecond
+        self.pcap_header   = struct.Struct(byte_order + "IHHiIII")
+        self.packet_header = struct.Struct(byte_order + "IIII")
+
+
+    @property
+    def magic_number(self):
+        return MAGIC_NANO if self.nanosecond else MAGIC_MICRO
+
+
+    @property
+    def swapped(self):
+        """ True when the capture's byte order differs from network byte order.
+        """
+        return self.byte_order == "<"
+
+
+# Keyed by the first four bytes of the file, exactly as they appear on disk
+CODECS = {
+    "\xa1\xb2\xc3\xd4": PCAP_Codec(">", False),
+    "\xd4\xc3\xb2\xa1": PCAP_Codec("<", False),
+    "\xa1\xb2\x3c\x4d": PCAP_Codec(">", True),
+    "\x4d\x3c\xb2\xa1": PCAP_Codec("<", True),
+}
+
+
+def codec_for_magic(magic_bytes):
+    """ Returns the :class:`PCAP_Codec` for a file starting with ``magic_bytes``.
+
+    :raises Codec_Error: If the magic number is not a LibPCAP magic number.
+    """
+    try:
+        return CODECS[str(magic_bytes)]
+    except KeyError:
+        raise Codec_Error("Magic Number not recognized. Is this a PCAP file?", [magic_bytes])
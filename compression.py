@@ -0,0 +1,357 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+Transparent gzip/bz2/xz streams for captures. Compressed input is detected from its magic bytes
+and compressed output is chosen from the file extension, so archived captures can be decapsulated
+without being decompressed to disk first. (De)compression can optionally run in a background
+thread; ``zlib``, ``bz2`` and ``lzma`` release the GIL while they work, so it overlaps with
+parsing.
+
+Everything here streams: nothing seeks, so the same readers work on pipes.
+"""
+
+##
+# Python Imports
+import io
+import bz2
+import zlib
+import Queue
+import threading
+
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+##
+# Project Imports
+from lib import peek
+
+##
+# Error Handling
+from errors import GenericException
+class Compression_Error(GenericException):
+    """ Errors relating to compressed streams.
+    """
+    pass
+
+##
+# Global Variables
+CHUNK_SIZE   = 1024 * 1024      # Bytes read from the underlying file per call
+QUEUE_DEPTH  = 8                # Chunks buffered between a background thread and the parser
+GZIP_LEVEL   = 6
+BZ2_LEVEL    = 9
+GZIP_WBITS   = 16 + zlib.MAX_WBITS
+
+MAGIC_GZIP   = "\x1f\x8b"
+MAGIC_BZ2    = "BZh"
+MAGIC_XZ     = "\xfd7zXZ\x00"
+EXTENSIONS   = {".gz": "gzip", ".gzip": "gzip", ".bz2": "bz2", ".xz": "xz"}
+
+
+def decompressor(compression):
+    """ Returns a new decompression object for ``compression``.
+    """
+    if compression == "gzip":
+        return zlib.decompressobj(GZIP_WBITS)
+    if compression == "bz2":
+        return bz2.BZ2Decompressor()
+    if compression == "xz":
+        if lzma is None:
+            raise Compression_Error("xz support requires the lzma module (backports.lzma on " +
+                                    "Python 2)")
+        return lzma.LZMADecompressor()
+    raise Compression_Error("Unknown compression '" + str(compression) + "'")
+
+
+def compressor(compression):
+    """ Returns a new compression object for ``compression``.
+    """
+    if compression == "gzip":
+        return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, GZIP_WBITS)
+    if compression == "bz2":
+        return bz2.BZ2Compressor(BZ2_LEVEL)
+    if compression == "xz":
+        if lzma is None:
+            raise Compression_Error("xz support requires the lzma module (backports.lzma on " +
+                                    "Python 2)")
+        return lzma.LZMACompressor()
+    raise Compression_Error("Unknown compression '" + str(compression) + "'")
+
+
+def detect_compression(magic):
+    """ Returns the compression the stream starting with ``magic`` uses, or None.
+    """
+    for (prefix, compression) in ((MAGIC_GZIP, "gzip"), (MAGIC_BZ2, "bz2"), (MAGIC_XZ, "xz")):
+        if magic.startswith(prefix):
+            return compression
+    return None
+
+
+def compression_for_path(path):
+    """ Returns the compression implied by the extension of ``path``, or None.
+    """
+    for (extension, compression) in EXTENSIONS.items():
+        if path.lower().endswith(extension):
+            return compression
+    return None
+
+
+class Chunked_Reader(object):
+    """ A minimal read-only binary file object built on top of :meth:`read_chunk`. It supports
+    ``read()`` and ``peek()``, which is all the PCAP readers need.
+    """
+    def __init__(self):
+        self.pending  = ""      # Data read but not yet consumed, starting at ``position``
+        self.position = 0
+        self.eof      = False
+
+
+    def read_chunk(self):
+        """ Returns the next chunk of data, or ``""`` at the end of the stream.
+        """
+        raise NotImplementedError
+
+
+    def fill(self, num_bytes):
+        """ Ensures at least ``num_bytes`` are pending, unless the stream ends first. The pending
+        data is only re-copied here, when it runs short, rather than on every read.
+        """
+        chunks = [self.pending[self.position:]]
+        length = len(chunks[0])
+        while length < num_bytes and not self.eof:
+            chunk = self.read_chunk()
+            if not chunk:
+                self.eof = True
+                break
+            chunks.append(chunk)
+            length += len(chunk)
+        self.pending  = "".join(chunks)
+        self.position = 0
+
+
+    def peek(self, num_bytes=1):
+        if len(self.pending) - self.position < num_bytes:
+            self.fill(num_bytes)
+        return self.pending[self.position:self.position + num_bytes]
+
+
+    def read(self, num_bytes=-1):
+        if num_bytes is None or num_bytes < 0:
+            self.fill(float("inf"))
+            (data, self.pending, self.position) = (self.pending, "", 0)
+            return data
+        if len(self.pending) - self.position < num_bytes:
+            self.fill(num_bytes)
+        data           = self.pending[self.position:self.position + num_bytes]
+        self.position += len(data)
+        return data
+
+
+    def close(self):
+        pass
+
+
+class Decompressing_Reader(Chunked_Reader):
+    """ Decompresses ``fileobj`` as it is read. Concatenated streams (e.g. ``cat a.gz b.gz``) are
+    decompressed one after another.
+    """
+    def __init__(self, fileobj, compression, chunk_size=CHUNK_SIZE):
+        super(Decompressing_Reader, self).__init__()
+        self.fileobj      = fileobj
+        self.compression  = compression
+        self.chunk_size   = chunk_size
+        self.decompressor = decompressor(compression)
+
+
+    def read_chunk(self):
+        while True:
+            data = self.fileobj.read(self.chunk_size)
+            if not data:
+                return ""
+            chunk = self.decompress(data)
+            if chunk:
+                return chunk
+
+
+    def decompress(self, data):
+        chunks = []
+        while data:
+            try:
+                chunks.append(self.decompressor.decompress(data))
+            except EOFError:
+                # Python 2's bz2 raises once a stream has ended; start on the next stream
+                self.decompressor = decompressor(self.compression)
+                continue
+            data = self.decompressor.unused_data
+            if data:
+                self.decompressor = decompressor(self.compression)
+        return "".join(chunks)
+
+
+    def close(self):
+        self.fileobj.close()
+
+
+class Threaded_Reader(Chunked_Reader):
+    """ Reads chunks from ``reader`` in a background thread, keeping up to ``depth`` chunks ready,
+    so that decompression overlaps with parsing.
+    """
+    def __init__(self, reader, chunk_size=CHUNK_SIZE, depth=QUEUE_DEPTH):
+        super(Threaded_Reader, self).__init__()
+        self.reader     = reader
+        self.chunk_size = chunk_size
+        self.queue      = Queue.Queue(depth)
+        self.thread     = threading.Thread(target=self.run, name="decompress")
+        self.thread.daemon = True
+        self.thread.start()
+
+
+    def run(self):
+        try:
+            while True:
+                chunk = self.reader.read(self.chunk_size)
+                self.queue.put(chunk)
+                if not chunk:
+                    return
+        except Exception as error:
+            self.queue.put(error)
+
+
+    def read_chunk(self):
+        chunk = self.queue.get()
+        if isinstance(chunk, Exception):
+            raise Compression_Error("Reading the compressed input failed", [chunk])
+        return chunk
+
+
+    def close(self):
+        self.reader.close()
+
+
+class Compressing_Writer(object):
+    """ A write-only binary file object that compresses everything written to it into
+    ``fileobj``.
+    """
+    def __init__(self, fileobj, compression):
+        self.fileobj    = fileobj
+        self.compressor = compressor(compression)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def write(self, data):
+        chunk = self.compressor.compress(bytes(data) if isinstance(data, bytearray) else data)
+        if chunk:
+            self.fileobj.write(chunk)
+
+
+    def flush(self):
+        self.fileobj.flush()
+
+
+    def close(self):
+        self.fileobj.write(self.compressor.flush())
+        self.fileobj.close()
+
+
+class Threaded_Writer(object):
+    """ Hands writes to ``writer`` in a background thread, so that compression overlaps with
+    parsing. At most ``depth`` writes are queued.
+    """
+    def __init__(self, writer, depth=QUEUE_DEPTH):
+        self.writer = writer
+        self.error  = None
+        self.queue  = Queue.Queue(depth)
+        self.thread = threading.Thread(target=self.run, name="compress")
+        self.thread.daemon = True
+        self.thread.start()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def run(self):
+        while True:
+            data = self.queue.get()
+            if data is None:
+                return
+            if self.error is None:
+                try:
+                    self.writer.write(data)
+                except Exception as error:
+                    self.error = error
+
+
+    def check(self):
+        if self.error is not None:
+            raise Compression_Error("Writing the compressed output failed", [self.error])
+
+
+    def write(self, data):
+        self.check()
+        # The caller is free to reuse its buffer once write() returns, so queue a copy
+        self.queue.put(bytes(data))
+
+
+    def flush(self):
+        self.check()
+
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        try:
+            self.check()
+        finally:
+            self.writer.close()
+
+
+def open_input(fileobj, threaded=False):
+    """ Wraps ``fileobj`` so that it reads decompressed data if it is compressed. ``fileobj`` may
+    be a pipe (see :func:`lib.peek`).
+
+    :rtype:   file-like object
+    :returns: ``fileobj`` itself (or a :class:`lib.Pushback_Reader` around it) if it is not
+        compressed.
+    """
+    (magic, fileobj) = peek(fileobj, len(MAGIC_XZ))
+    compression      = detect_compression(magic)
+    if compression is None:
+        return fileobj
+    stream = Decompressing_Reader(fileobj, compression)
+    if threaded:
+        stream = Threaded_Reader(stream)
+    return stream
+
+
+def open_output(path, threaded=False, append=False):
+    """ Opens ``path`` for writing, compressing the output if the extension asks for it. With
+    ``append``, writes go to the end of the file; compressed output then starts a new stream, and
+    gzip, bz2 and xz all read concatenated streams back as one.
+
+    :rtype: file-like object
+    """
+    fileobj     = io.open(path, "ab" if append else "wb")
+    compression = compression_for_path(path)
+    if compression is None:
+        return fileobj
+    stream = Compressing_Writer(fileobj, compression)
+    if threaded:
+        stream = Threaded_Writer(stream)
+    return stream
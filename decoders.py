@@ -0,0 +1,367 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+A registry of protocol decoders, used to find the packet tunnelled inside a record. Decoders are
+looked up in plain dicts keyed by link type (``PCAP_Header.network``), EtherType, IP protocol number
+and UDP port, so dispatch costs one dict lookup per layer however many decoders are registered.
+
+Every decoder is a function ``decoder(registry, bytes, offset, end)`` that inspects the layer
+starting at ``offset`` (and ending before ``end``) and returns either an :data:`Inner_Packet`
+describing the tunnelled packet, or None when the layer is not a tunnel it understands. None is an
+ordinary answer rather than an error, so captures that mix tunnels with other traffic are
+decapsulated in a single pass and everything else is passed through untouched.
+
+Link type decoders describe the packet data itself: an Ethernet Frame is an :data:`Inner_Packet`
+with the ``ETHERTYPE_TEB`` EtherType, and a raw IP packet one with its IP EtherType.
+:meth:`Decoder_Registry.decapsulate` then peels tunnels off one layer at a time, so a tunnel
+inside a tunnel is decapsulated in the same pass.
+
+.. example::
+
+    ``` python
+    registry = REGISTRY.copy()
+    registry.register_udp_port(8472, decode_vxlan)     # The Linux kernel's original VXLAN port
+    ```
+"""
+
+##
+# Python Imports
+import collections
+
+##
+# Project Imports
+from codec          import UINT8, UINT16, IPV4_SUMMARY, IPV6_SUMMARY, UDP, GRE
+from frame_ethernet import FRAME_LENGTH_ETHERNET, ETHERTYPE_IPV4
+from frame_protocol import PROTO_ICMP, PROTO_UDP, FRAME_LENGTH_ICMP
+
+##
+# Global Variables
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW      = 101     # Raw IPv4 or IPv6, told apart by the version nibble
+LINKTYPE_IPV4     = 228
+LINKTYPE_IPV6     = 229
+
+ETHERTYPE_IPV6    = 0x86dd
+ETHERTYPE_TEB     = 0x6558  # Transparent Ethernet Bridging: the payload is a whole Ethernet Frame
+ETHERTYPE_VLAN    = (0x8100, 0x88a8, 0x9100)    # 802.1Q, 802.1ad and legacy QinQ tags
+VLAN_TAG_LENGTH   = 4
+
+PROTO_IPIP        = 4
+PROTO_GRE         = 47
+PROTO_IPV6        = 41
+
+PORT_GRE_UDP      = 4754
+PORT_VXLAN        = 4789
+
+IPV4_HEADER_MIN   = 20
+IPV4_FRAGMENT     = 0x3fff  # More Fragments flag and fragment offset
+IPV6_HEADER       = 40
+UDP_HEADER        = 8
+VXLAN_HEADER      = 8
+VXLAN_FLAG_VNI    = 0x08
+GRE_FLAG_CHECKSUM = 0x8000
+GRE_FLAG_ROUTING  = 0x4000
+GRE_FLAG_KEY      = 0x2000
+GRE_FLAG_SEQUENCE = 0x1000
+GRE_VERSION       = 0x0007
+
+DEFAULT_DEPTH     = 1       # Tunnels peeled off per packet; 0 peels every recognized tunnel
+
+# The packet found inside a tunnel: the EtherType of what it carries and where it lies
+Inner_Packet = collections.namedtuple("Inner_Packet", ["ether_type", "offset", "end"])
+
+
+class Decoder_Registry(object):
+    """ The decoders consulted for each layer of a record, keyed by the value the enclosing layer
+    uses to name its payload.
+
+    :type link_types: dict
+    :ivar link_types: Decoders keyed by ``PCAP_Header.network``.
+
+    :type ether_types: dict
+    :ivar ether_types: Decoders keyed by EtherType.
+
+    :type ip_protocols: dict
+    :ivar ip_protocols: Decoders keyed by IP protocol number (IPv4) or next header (IPv6).
+
+    :type udp_ports: dict
+    :ivar udp_ports: Decoders keyed by UDP destination port.
+    """
+    def __init__(self):
+        self.link_types   = {}
+        self.ether_types  = {}
+        self.ip_protocols = {}
+        self.udp_ports    = {}
+
+
+    def copy(self):
+        """ Returns an independent copy, so decoders can be added without affecting this registry.
+        """
+        registry = Decoder_Registry()
+        registry.link_types.update(self.link_types)
+        registry.ether_types.update(self.ether_types)
+        registry.ip_protocols.update(self.ip_protocols)
+        registry.udp_ports.update(self.udp_ports)
+        return registry
+
+
+    ##
+    # Registration
+    def register_link_type(self, link_type, decoder):
+        self.link_types[link_type] = decoder
+
+
+    def register_ether_type(self, ether_type, decoder):
+        self.ether_types[ether_type] = decoder
+
+
+    def register_ip_protocol(self, protocol, decoder):
+        self.ip_protocols[protocol] = decoder
+
+
+    def register_udp_port(self, port, decoder):
+        self.udp_ports[port] = decoder
+
+
+    ##
+    # Dispatch
+    def decode_ether_type(self, ether_type, bytes, offset, end):
+        decoder = self.ether_types.get(ether_type)
+        if decoder is None:
+            return None
+        return decoder(self, bytes, offset, end)
+
+
+    def decode_ip_protocol(self, protocol, bytes, offset, end):
+        decoder = self.ip_protocols.get(protocol)
+        if decoder is None:
+            return None
+        return decoder(self, bytes, offset, end)
+
+
+    def decode_udp_port(self, port, bytes, offset, end):
+        decoder = self.udp_ports.get(port)
+        if decoder is None:
+            return None
+        return decoder(self, bytes, offset, end)
+
+
+    def decapsulate(self, link_type, bytes, offset, end, depth=DEFAULT_DEPTH):
+        """ Decapsulates the packet data between ``offset`` and ``end``, peeling off up to
+        ``depth`` nested tunnels (or every recognized tunnel, if ``depth`` is 0). Nothing is copied
+        until the end, when the link-layer header for the innermost packet is built.
+
+        The Ethernet header kept in front of a tunnelled IP packet is the innermost one seen: the
+        capture's own, or that of the last Ethernet Frame peeled out of a tunnel (e.g. VXLAN). Its
+        EtherType is rewritten to match.
+
+        :rtype:   (**binary** string, ``buffer``, int) or None
+        :returns: The link-layer header of the decapsulated packet, a view of the tunnelled packet
+            that follows it and the number of tunnels peeled off, or None if the packet is not a
+            tunnel this registry decodes.
+        """
+        decoder = self.link_types.get(link_type)
+        packet  = decoder(self, bytes, offset, end) if decoder is not None else None
+        if packet is None:
+            return None
+        ethernet = packet.ether_type == ETHERTYPE_TEB
+        header   = ""
+        layers   = 0
+        while not depth or layers < depth:
+            if packet.ether_type == ETHERTYPE_TEB:
+                (header_end, ether_type) = ethernet_header(bytes, packet.offset, packet.end)
+                inner = self.decode_ether_type(ether_type, bytes, header_end, packet.end)
+                if inner is None:
+                    break
+                header = bytes[packet.offset:header_end]
+            else:
+                inner = self.decode_ether_type(packet.ether_type, bytes, packet.offset, packet.end)
+                if inner is None:
+                    break
+            packet  = inner
+            layers += 1
+        if not layers:
+            return None
+        if packet.ether_type == ETHERTYPE_TEB:
+            if ethernet:
+                return ("", buffer(bytes, packet.offset, packet.end - packet.offset), layers)
+            # Raw IP captures cannot hold an Ethernet Frame, but can hold the IP packet inside it
+            (header_end, ether_type) = ethernet_header(bytes, packet.offset, packet.end)
+            if ether_type not in (ETHERTYPE_IPV4, ETHERTYPE_IPV6):
+                return None
+            packet = Inner_Packet(ether_type, header_end, packet.end)
+        payload = buffer(bytes, packet.offset, packet.end - packet.offset)
+        if not ethernet:
+            return ("", payload, layers)
+        if UINT16.unpack_from(header, len(header) - 2)[0] != packet.ether_type:
+            header = header[:-2] + UINT16.pack(packet.ether_type)
+        return (header, payload, layers)
+
+
+def ethernet_header(bytes, offset, end):
+    """ Finds the end of the Ethernet header starting at ``offset``, skipping any VLAN tags.
+
+    :rtype:   (int, int)
+    :returns: The offset of the Ethernet payload and its EtherType, or ``(end, None)`` if the frame
+        is too short.
+    """
+    header_end = offset + FRAME_LENGTH_ETHERNET
+    if header_end > end:
+        return (end, None)
+    (ether_type,) = UINT16.unpack_from(bytes, header_end - 2)
+    while ether_type in ETHERTYPE_VLAN and header_end + VLAN_TAG_LENGTH <= end:
+        header_end   += VLAN_TAG_LENGTH
+        (ether_type,) = UINT16.unpack_from(bytes, header_end - 2)
+    return (header_end, ether_type)
+
+
+def ip_header(link_type, bytes, offset, end):
+    """ Finds the IP header of an Ethernet or raw IP packet.
+
+    :rtype:   (int, int)
+    :returns: The offset of the IP header and its EtherType (``ETHERTYPE_IPV4`` or
+        ``ETHERTYPE_IPV6``), or ``(end, None)`` if the packet is not IP.
+    """
+    if link_type == LINKTYPE_ETHERNET:
+        (offset, ether_type) = ethernet_header(bytes, offset, end)
+    elif link_type in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6) and offset < end:
+        (version,) = UINT8.unpack_from(bytes, offset)
+        ether_type = {4: ETHERTYPE_IPV4, 6: ETHERTYPE_IPV6}.get(version >> 4)
+    else:
+        return (end, None)
+    if ether_type not in (ETHERTYPE_IPV4, ETHERTYPE_IPV6):
+        return (end, None)
+    return (offset, ether_type)
+
+
+##
+# Link Type Decoders
+def decode_ethernet(registry, bytes, offset, end):
+    return Inner_Packet(ETHERTYPE_TEB, offset, end)
+
+
+def decode_raw(registry, bytes, offset, end):
+    """ Raw IP captures have no link-layer header; the IP version is told from the first nibble.
+    """
+    if offset >= end:
+        return None
+    (version,) = UINT8.unpack_from(bytes, offset)
+    ether_type = {4: ETHERTYPE_IPV4, 6: ETHERTYPE_IPV6}.get(version >> 4)
+    if ether_type is None:
+        return None
+    return Inner_Packet(ether_type, offset, end)
+
+
+##
+# EtherType Decoders
+def decode_ipv4(registry, bytes, offset, end):
+    """ Dispatches on the IP protocol. Fragments are left alone: only a whole datagram holds the
+    tunnelled packet.
+    """
+    if end - offset < IPV4_HEADER_MIN:
+        return None
+    (ver_head_len, total_len, flags, protocol) = IPV4_SUMMARY.unpack_from(bytes, offset)
+    header_length = (ver_head_len & 0x0f) * 4
+    if (ver_head_len >> 4 != 4 or header_length < IPV4_HEADER_MIN or total_len < header_length or
+            flags & IPV4_FRAGMENT):
+        return None
+    end = min(end, offset + total_len)
+    if offset + header_length > end:
+        return None
+    return registry.decode_ip_protocol(protocol, bytes, offset + header_length, end)
+
+
+def decode_ipv6(registry, bytes, offset, end):
+    """ Dispatches on the next header. Extension headers are not walked, so they are passed through.
+    """
+    if end - offset < IPV6_HEADER:
+        return None
+    (payload_len, next_header) = IPV6_SUMMARY.unpack_from(bytes, offset)
+    end = min(end, offset + IPV6_HEADER + payload_len)
+    return registry.decode_ip_protocol(next_header, bytes, offset + IPV6_HEADER, end)
+
+
+##
+# IP Protocol Decoders
+def decode_icmp(registry, bytes, offset, end):
+    """ ICMP tunnels carry an IPv4 packet after the 8 byte ICMP header. Any other ICMP message,
+    such as an ordinary ping, is not a tunnel: its data is only taken for a packet if it starts
+    with a plausible IPv4 header.
+    """
+    inner = offset + FRAME_LENGTH_ICMP
+    if end - inner < IPV4_HEADER_MIN:
+        return None
+    (ver_head_len, total_len, _, _) = IPV4_SUMMARY.unpack_from(bytes, inner)
+    if (ver_head_len >> 4 != 4 or (ver_head_len & 0x0f) * 4 < IPV4_HEADER_MIN or
+            not IPV4_HEADER_MIN <= total_len <= end - inner):
+        return None
+    return Inner_Packet(ETHERTYPE_IPV4, inner, end)
+
+
+def decode_udp(registry, bytes, offset, end):
+    """ Dispatches on the destination port.
+    """
+    if end - offset < UDP_HEADER:
+        return None
+    (_, dst_port, length, _) = UDP.unpack_from(bytes, offset)
+    if length < UDP_HEADER:
+        return None
+    return registry.decode_udp_port(dst_port, bytes, offset + UDP_HEADER,
+                                    min(end, offset + length))
+
+
+def decode_gre(registry, bytes, offset, end):
+    """ GRE (RFC 2784 and the key and sequence number extensions of RFC 2890). The deprecated
+    routing field and enhanced GRE (version 1, used by PPTP) are not decoded.
+    """
+    if end - offset < GRE.size:
+        return None
+    (flags, protocol_type) = GRE.unpack_from(bytes, offset)
+    if flags & (GRE_FLAG_ROUTING | GRE_VERSION):
+        return None
+    header_length = GRE.size
+    for flag in (GRE_FLAG_CHECKSUM, GRE_FLAG_KEY, GRE_FLAG_SEQUENCE):
+        if flags & flag:
+            header_length += 4
+    if offset + header_length > end:
+        return None
+    return Inner_Packet(protocol_type, offset + header_length, end)
+
+
+def decode_ipip(registry, bytes, offset, end):
+    return Inner_Packet(ETHERTYPE_IPV4, offset, end)
+
+
+def decode_ipv6_in_ip(registry, bytes, offset, end):
+    return Inner_Packet(ETHERTYPE_IPV6, offset, end)
+
+
+##
+# UDP Port Decoders
+def decode_vxlan(registry, bytes, offset, end):
+    """ VXLAN (RFC 7348) carries a whole Ethernet Frame after an 8 byte header.
+    """
+    if end - offset < VXLAN_HEADER:
+        return None
+    (flags,) = UINT8.unpack_from(bytes, offset)
+    if not flags & VXLAN_FLAG_VNI:
+        return None
+    return Inner_Packet(ETHERTYPE_TEB, offset + VXLAN_HEADER, end)
+
+
+# The built-in decoders
+REGISTRY = Decoder_Registry()
+REGISTRY.register_link_type(LINKTYPE_ETHERNET, decode_ethernet)
+REGISTRY.register_link_type(LINKTYPE_RAW, decode_raw)
+REGISTRY.register_link_type(LINKTYPE_IPV4, decode_raw)
+REGISTRY.register_link_type(LINKTYPE_IPV6, decode_raw)
+REGISTRY.register_ether_type(ETHERTYPE_IPV4, decode_ipv4)
+REGISTRY.register_ether_type(ETHERTYPE_IPV6, decode_ipv6)
+REGISTRY.register_ip_protocol(PROTO_ICMP, decode_icmp)
+REGISTRY.register_ip_protocol(PROTO_UDP, decode_udp)
+REGISTRY.register_ip_protocol(PROTO_GRE, decode_gre)
+REGISTRY.register_ip_protocol(PROTO_IPIP, decode_ipip)
+REGISTRY.register_ip_protocol(PROTO_IPV6, decode_ipv6_in_ip)
+REGISTRY.register_udp_port(PORT_VXLAN, decode_vxlan)
+REGISTRY.register_udp_port(PORT_GRE_UDP, decode_gre)
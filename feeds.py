@@ -0,0 +1,280 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+Decapsulates many live pcap streams (sensor feeds over local or TCP sockets) in one process, on one
+thread. Each feed is read without blocking through ``asyncore``, the standard library's event loop
+on Python 2, and its bytes are pushed into a :class:`PCAP_Stream_Parser`, which hands back every
+record that is complete so far. Decapsulated packets go to a sink per feed: a
+:class:`Record_Sender` streams them out over another socket without blocking, and a
+:class:`Capture_File` writes them to disk.
+
+.. example::
+
+    ``` python
+    def sink(peer, pcap_header):
+        return Capture_File("decap_feed_%d.pcap" % peer[1], pcap_header)
+
+    Feed_Server(("127.0.0.1", 5555), sink)
+    asyncore.loop(use_poll=True)
+    ```
+"""
+
+##
+# Python Imports
+import io
+import socket
+import asyncore
+
+##
+# Project Imports
+from header_pcap   import PCAP_Header, HEADER_LENGTH_PCAP
+from header_packet import HEADER_LENGTH_PACKET
+from packet_tunnel import Tunnel_Packet
+from reader        import MAX_RECORD_LENGTH
+from writer        import PCAP_Writer
+
+##
+# Error Handling
+from errors import GenericException
+class Feed_Error(GenericException):
+    """ Errors relating to live pcap feeds.
+    """
+    pass
+
+##
+# Global Variables
+RECV_SIZE  = 256 * 1024         # Bytes read from a feed at a time
+SEND_SIZE  = 256 * 1024         # Bytes sent to an output socket at a time
+HIGH_WATER = 4 * 1024 * 1024    # Bytes queued for a slow output before its feed stops being read
+
+
+class PCAP_Stream_Parser(object):
+    """ An incremental (push) parser for a pcap byte stream. Bytes are fed in as they arrive, in
+    pieces of any size, and each call returns the records completed by them. Only the bytes of the
+    record in progress are held on to.
+
+    :ivar packet_class: The class built for each record.
+
+    :type pcap_header: :class:`header_pcap.PCAP_Header` or None
+    :ivar pcap_header: The stream's PCAP Global Header, once it has arrived.
+
+    :ivar int packets: The number of records parsed so far.
+    """
+    def __init__(self, packet_class=Tunnel_Packet):
+        self.packet_class = packet_class
+        self.pcap_header  = None
+        self.buffer       = bytearray()
+        self.packets      = 0
+
+
+    def feed(self, data):
+        """ Adds ``data`` to the stream.
+
+        :rtype:   list
+        :returns: A ``packet_class`` for every record completed by ``data``.
+        :raises Feed_Error: If a Packet Header gives an impossible length.
+        """
+        self.buffer += data
+        offset       = 0
+        if self.pcap_header is None:
+            if len(self.buffer) < HEADER_LENGTH_PCAP:
+                return []
+            self.pcap_header = PCAP_Header(str(self.buffer[:HEADER_LENGTH_PCAP]))
+            offset           = HEADER_LENGTH_PCAP
+        packets    = []
+        unpack     = self.pcap_header.codec.packet_header.unpack_from
+        max_length = max(self.pcap_header.snaplen, MAX_RECORD_LENGTH)
+        while len(self.buffer) - offset >= HEADER_LENGTH_PACKET:
+            incl_len = unpack(self.buffer, offset)[2]
+            if incl_len > max_length:
+                raise Feed_Error("Record of " + str(incl_len) + " bytes is longer than the " +
+                                 "snaplen. Is the stream corrupt?")
+            end = offset + HEADER_LENGTH_PACKET + incl_len
+            if end > len(self.buffer):
+                break
+            packets.append(self.packet_class(self.pcap_header, str(self.buffer[offset:end])))
+            offset = end
+        del self.buffer[:offset]
+        self.packets += len(packets)
+        return packets
+
+
+    def close(self):
+        """ Ends the stream.
+
+        :raises Feed_Error: If the stream ended part way through a record.
+        """
+        if self.buffer:
+            raise Feed_Error("Stream ended " + str(len(self.buffer)) + " bytes into a record")
+
+
+class Capture_File(PCAP_Writer):
+    """ A :class:`~writer.PCAP_Writer` that opens, and on :meth:`close` closes, the file at
+    ``path``.
+    """
+    def __init__(self, path, pcap_header):
+        PCAP_Writer.__init__(self, io.open(path, "wb"), pcap_header)
+
+
+    def close(self):
+        if not self.closed:
+            PCAP_Writer.close(self)
+            self.fileobj.close()
+
+
+class Record_Sender(asyncore.dispatcher):
+    """ Streams a pcap (a PCAP Global Header, then decapsulated records) out over a connected socket
+    without blocking. Records are queued by :meth:`write_packet` and sent as the socket accepts
+    them.
+
+    :ivar bytearray queued: Bytes waiting to be sent.
+    :ivar int packet_count: The number of records queued so far.
+    """
+    def __init__(self, sock, pcap_header, map=None):
+        asyncore.dispatcher.__init__(self, sock, map)
+        self.queued       = bytearray(pcap_header.raw_bytes)
+        self.closing      = False
+        self.packet_count = 0
+
+
+    def write_packet(self, packet):
+        for part in packet.decapsulate_parts():
+            self.queued += part
+        self.packet_count += 1
+
+
+    def close(self):
+        """ Closes the socket once everything queued has been sent.
+        """
+        self.closing = True
+        if not self.queued:
+            asyncore.dispatcher.close(self)
+
+
+    @property
+    def backlog(self):
+        return len(self.queued)
+
+
+    def readable(self):
+        return False
+
+
+    def writable(self):
+        return bool(self.queued)
+
+
+    def handle_write(self):
+        sent = self.send(self.queued[:SEND_SIZE])
+        del self.queued[:sent]
+        if self.closing and not self.queued:
+            asyncore.dispatcher.close(self)
+
+
+class Feed_Reader(asyncore.dispatcher):
+    """ Reads one pcap feed from a connected socket without blocking, and writes each decapsulated
+    packet to a sink. The sink is made once the feed's PCAP Global Header has arrived, and closed
+    when the feed ends. Reading pauses while the sink has more than ``HIGH_WATER`` bytes queued,
+    so a slow output slows its own feed down rather than using up memory.
+
+    :ivar sink_factory: Called as ``sink_factory(peer, pcap_header)`` to make the sink, an object
+        with ``write_packet(packet)`` and ``close()`` (e.g. :class:`Record_Sender` or
+        :class:`Capture_File`).
+    :ivar peer: The address of the other end of the socket.
+    :ivar parser: The feed's :class:`PCAP_Stream_Parser`.
+    :ivar error: The error that ended the feed early, or None.
+    :ivar on_finish: Called as ``on_finish(feed)`` once the feed has ended, or None.
+    """
+    def __init__(self, sock, sink_factory, packet_class=Tunnel_Packet, map=None):
+        asyncore.dispatcher.__init__(self, sock, map)
+        self.sink_factory = sink_factory
+        try:
+            self.peer = sock.getpeername()
+        except socket.error:
+            self.peer = None
+        self.parser       = PCAP_Stream_Parser(packet_class)
+        self.sink         = None
+        self.error        = None
+        self.on_finish    = None
+
+
+    def readable(self):
+        return self.sink is None or getattr(self.sink, "backlog", 0) < HIGH_WATER
+
+
+    def writable(self):
+        return False
+
+
+    def handle_read(self):
+        data = self.recv(RECV_SIZE)
+        if not data:
+            return
+        try:
+            packets = self.parser.feed(data)
+        except GenericException as error:
+            self.finish(error)
+            return
+        if packets and self.sink is None:
+            self.sink = self.sink_factory(self.peer, self.parser.pcap_header)
+        for packet in packets:
+            self.sink.write_packet(packet)
+
+
+    def handle_close(self):
+        try:
+            self.parser.close()
+        except Feed_Error as error:
+            self.finish(error)
+            return
+        self.finish(None)
+
+
+    def finish(self, error):
+        """ Closes the feed and its sink. A feed that sent nothing but a header still gets an
+        (empty) output.
+        """
+        self.error = error
+        self.close()
+        if self.sink is None and self.parser.pcap_header is not None:
+            self.sink = self.sink_factory(self.peer, self.parser.pcap_header)
+        if self.sink is not None:
+            self.sink.close()
+        if self.on_finish is not None:
+            (on_finish, self.on_finish) = (self.on_finish, None)
+            on_finish(self)
+
+
+class Feed_Server(asyncore.dispatcher):
+    """ Listens for sensors connecting to ``address`` (a ``(host, port)`` tuple, or a path for a
+    UNIX socket) and reads every connection as a :class:`Feed_Reader`.
+
+    :ivar list feeds: The :class:`Feed_Reader` of every connection still open. A feed is removed
+        once it ends, so sensors can reconnect indefinitely.
+    :ivar int accepted: The number of connections accepted so far.
+    """
+    def __init__(self, address, sink_factory, packet_class=Tunnel_Packet, backlog=64, map=None):
+        asyncore.dispatcher.__init__(self, map=map)
+        family = socket.AF_UNIX if isinstance(address, basestring) else socket.AF_INET
+        self.create_socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self.set_reuse_addr()
+        self.bind(address)
+        self.listen(backlog)
+        self.sink_factory = sink_factory
+        self.packet_class = packet_class
+        self.feed_map     = map
+        self.feeds        = []
+        self.accepted     = 0
+
+
+    def handle_accept(self):
+        accepted = self.accept()
+        if accepted is None:
+            return
+        (sock, _)      = accepted
+        feed           = Feed_Reader(sock, self.sink_factory, self.packet_class, self.feed_map)
+        feed.on_finish = self.feeds.remove
+        self.feeds.append(feed)
+        self.accepted += 1
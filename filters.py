@@ -0,0 +1,358 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+A small filter language for picking out records before they are parsed. An expression is parsed
+once, then compiled (once per link type and timestamp resolution) into a Python function that reads
+the few fields it needs straight out of the raw record at a given offset, so records that do not
+match never become packet objects.
+
+Primitives, which combine with ``and``/``&&``, ``or``/``||``, ``not``/``!`` and parentheses:
+
+    ========================================== ==================================================
+    ``host ADDR[/LEN]``, ``net ADDR/LEN``      Either IP address in the address or subnet
+    ``src ...``, ``dst ...``                   Only the source or destination address, e.g.
+                                               ``src 10.0.0.1`` or ``dst net 2001:db8::/32``
+    ``ip``, ``ip6``                            IPv4 or IPv6 packets
+    ``proto P``, ``icmp``, ``tcp``, ``udp`` ...  The IP protocol (IPv4) or next header (IPv6), by
+                                               name or number
+    ``icmp-type T``                            ICMP (or ICMPv6) messages of type T, by name or
+                                               number, e.g. ``icmp-type echo-request``
+    ``len OP N``, ``len MIN-MAX``              The original length of the packet, with OP one of
+                                               ``< <= > >= == !=``
+    ``after SECONDS``, ``before SECONDS``      Captured at or after, or before, a UNIX timestamp
+    ========================================== ==================================================
+
+Only the outer headers are looked at. A filter such as
+``src net 192.0.2.0/24 and icmp and len >= 100`` keeps the ICMP tunnels from one subnet.
+
+.. example::
+
+    ``` python
+    packet_filter = Packet_Filter("host 192.0.2.1 and (gre or icmp)")
+    for (pcap_header, record) in packet_filter.select(reader.iter_classic_records()):
+        writer.write_packet(Tunnel_Packet(pcap_header, record))
+    ```
+"""
+
+##
+# Python Imports
+import re
+import socket
+import struct
+
+##
+# Project Imports
+from header_packet  import HEADER_LENGTH_PACKET
+from decoders       import ip_header, ETHERTYPE_IPV6
+from frame_ethernet import ETHERTYPE_IPV4
+from index          import parse_timestamp, Index_Error
+from tolerant       import Passthrough_Packet
+
+##
+# Error Handling
+from errors import GenericException
+class Filter_Error(GenericException):
+    """ Errors relating to filter expressions.
+    """
+    pass
+
+##
+# Global Variables
+TOKENS      = re.compile(r"\s*(\(|\)|&&|\|\||!=|<=|>=|==|<|>|!|[^\s()!<>=&|]+)")
+PROTOCOLS   = {"icmp": 1, "igmp": 2, "ipip": 4, "tcp": 6, "udp": 17, "ipv6": 41, "gre": 47,
+               "esp": 50, "ah": 51, "icmp6": 58, "sctp": 132}
+ICMP_TYPES  = {"echo-reply": 0, "unreachable": 3, "redirect": 5, "echo-request": 8,
+               "time-exceeded": 11}
+COMPARISONS = ("<", "<=", ">", ">=", "==", "!=")
+KEYWORDS    = ("and", "or", "not", "&&", "||", "!", "(", ")")
+ADDRESS_V4  = struct.Struct("!II")          # source and destination
+ADDRESS_V6  = struct.Struct("!QQQQ")        # source and destination, 64 bits at a time
+UINT8       = struct.Struct("!B")
+
+# The code computing each field, by field, in the order they depend on each other
+FIELDS = (
+    ("ip",        "(ip, ether_type) = ip_header(LINK_TYPE, bytes, offset + %d, end)" %
+                  HEADER_LENGTH_PACKET),
+    ("v4",        "v4 = ether_type == ETHERTYPE_IPV4 and end - ip >= 20"),
+    ("v6",        "v6 = ether_type == ETHERTYPE_IPV6 and end - ip >= 40"),
+    ("proto",     "proto = (UINT8(bytes, ip + 9)[0] if v4 else UINT8(bytes, ip + 6)[0] if v6 " +
+                  "else -1)"),
+    ("addr4",     "(src4, dst4) = ADDRESS_V4(bytes, ip + 12) if v4 else (-1, -1)"),
+    ("addr6",     "(src6, dst6) = ((lambda a, b, c, d: (a << 64 | b, c << 64 | d))" +
+                  "(*ADDRESS_V6(bytes, ip + 8)) if v6 else (-1, -1))"),
+    ("icmp_type", "payload = ip + (UINT8(bytes, ip)[0] & 0x0f) * 4 if v4 else ip + 40\n" +
+                  "    icmp_type = (UINT8(bytes, payload)[0] if payload < end and " +
+                  "((v4 and proto == 1) or (v6 and proto == 58)) else -1)"),
+)
+DEPENDS = {"v4": ["ip"], "v6": ["ip"], "proto": ["v4", "v6"], "addr4": ["v4"], "addr6": ["v6"],
+           "icmp_type": ["proto"]}
+
+
+def parse_address(value):
+    """ Parses ``ADDR`` or ``ADDR/LEN``.
+
+    :rtype:   (int, int, int)
+    :returns: The IP version, and the network and mask as integers.
+    """
+    (address, _, prefix) = value.partition("/")
+    for (version, family, bits) in ((4, socket.AF_INET, 32), (6, socket.AF_INET6, 128)):
+        try:
+            packed = socket.inet_pton(family, address)
+        except (socket.error, ValueError):
+            continue
+        length = int(prefix) if prefix.isdigit() else bits
+        if prefix and not prefix.isdigit() or length > bits:
+            break
+        mask    = ((1 << bits) - 1) ^ ((1 << (bits - length)) - 1)
+        network = int(packed.encode("hex"), 16) & mask
+        return (version, network, mask)
+    raise Filter_Error("Expected an IP address or subnet, received '" + value + "'")
+
+
+def parse_number(value, names, what):
+    """ Parses a number, or one of ``names``.
+
+    :rtype: int
+    """
+    if value in names:
+        return names[value]
+    if value.isdigit():
+        return int(value)
+    raise Filter_Error("Expected " + what + " (a number or one of " + ", ".join(sorted(names)) +
+                       "), received '" + value + "'")
+
+
+class Filter_Parser(object):
+    """ Parses an expression into a tree of tuples: ``("and", left, right)``, ``("or", left,
+    right)``, ``("not", operand)`` and a tuple per primitive.
+    """
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens     = []
+        position        = 0
+        expression      = expression.rstrip()
+        while position < len(expression):
+            match = TOKENS.match(expression, position)
+            if match is None:
+                raise Filter_Error("Cannot read the filter from '" + expression[position:] + "'")
+            self.tokens.append(match.group(1))
+            position = match.end()
+        self.position = 0
+
+
+    def parse(self):
+        if not self.tokens:
+            raise Filter_Error("The filter is empty")
+        tree = self.parse_or()
+        if self.peek() is not None:
+            raise Filter_Error("Unexpected '" + self.peek() + "' in filter '" + self.expression +
+                               "'")
+        return tree
+
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+
+    def take(self, what=None):
+        """ Consumes the next token, which must be ``what`` (a description, for the error) rather
+        than an operator, if given.
+        """
+        token = self.peek()
+        if token is None:
+            raise Filter_Error("Expected " + (what or "more") + " at the end of filter '" +
+                               self.expression + "'")
+        if what is not None and token in KEYWORDS and token != ")":
+            raise Filter_Error("Expected " + what + ", received '" + token + "'")
+        self.position += 1
+        return token
+
+
+    def parse_or(self):
+        tree = self.parse_and()
+        while self.peek() in ("or", "||"):
+            self.take()
+            tree = ("or", tree, self.parse_and())
+        return tree
+
+
+    def parse_and(self):
+        tree = self.parse_not()
+        while self.peek() in ("and", "&&"):
+            self.take()
+            tree = ("and", tree, self.parse_not())
+        return tree
+
+
+    def parse_not(self):
+        if self.peek() in ("not", "!"):
+            self.take()
+            return ("not", self.parse_not())
+        if self.peek() == "(":
+            self.take()
+            tree = self.parse_or()
+            if self.take("')'") != ")":
+                raise Filter_Error("Expected ')' in filter '" + self.expression + "'")
+            return tree
+        return self.parse_primitive()
+
+
+    def parse_primitive(self):
+        token = self.take("a filter primitive")
+        if token in ("src", "dst", "host", "net"):
+            direction = token if token in ("src", "dst") else "host"
+            if token in ("src", "dst") and self.peek() in ("host", "net"):
+                self.take()
+            return ("address", direction) + parse_address(self.take("an address"))
+        if token in ("ip", "ip6"):
+            return ("version", 4 if token == "ip" else 6)
+        if token == "proto":
+            return ("proto", parse_number(self.take("a protocol"), PROTOCOLS, "a protocol"))
+        if token in PROTOCOLS:
+            return ("proto", PROTOCOLS[token])
+        if token == "icmp-type":
+            return ("icmp_type", parse_number(self.take("an ICMP type"), ICMP_TYPES,
+                                              "an ICMP type"))
+        if token == "len":
+            value = self.take("a length")
+            if value in COMPARISONS:
+                return ("len", value, parse_number(self.take("a length"), {}, "a length"))
+            (low, _, high) = value.partition("-")
+            if high:
+                return ("len_range", parse_number(low, {}, "a length"),
+                        parse_number(high, {}, "a length"))
+            return ("len", "==", parse_number(value, {}, "a length"))
+        if token in ("after", "before"):
+            value = self.take("a timestamp")
+            try:
+                parse_timestamp(value)
+            except Index_Error as error:
+                raise Filter_Error(str(error))
+            return ("time", token, value)
+        raise Filter_Error("Unknown filter primitive '" + token + "'")
+
+
+def generate(tree, nanosecond, fields):
+    """ Generates the Python expression for ``tree``, adding the fields it reads to ``fields``.
+
+    :rtype: str
+    """
+    kind = tree[0]
+    if kind in ("and", "or"):
+        return "(%s %s %s)" % (generate(tree[1], nanosecond, fields), kind,
+                               generate(tree[2], nanosecond, fields))
+    if kind == "not":
+        return "(not %s)" % generate(tree[1], nanosecond, fields)
+    if kind == "address":
+        (_, direction, version, network, mask) = tree
+        suffix = "4" if version == 4 else "6"
+        fields.add("addr" + suffix)
+        tests  = ["(%s%s & %d) == %d" % (end, suffix, mask, network)
+                  for end in (("src", "dst") if direction == "host" else (direction,))]
+        return "(v%s and (%s))" % (suffix, " or ".join(tests))
+    if kind == "version":
+        fields.add("v%d" % tree[1])
+        return "v%d" % tree[1]
+    if kind == "proto":
+        fields.add("proto")
+        return "(proto == %d)" % tree[1]
+    if kind == "icmp_type":
+        fields.add("icmp_type")
+        return "(icmp_type == %d)" % tree[1]
+    if kind == "len":
+        return "(orig_len %s %d)" % (tree[1], tree[2])
+    if kind == "len_range":
+        return "(%d <= orig_len <= %d)" % (tree[1], tree[2])
+    if kind == "time":
+        operator = ">=" if tree[1] == "after" else "<"
+        return "((ts_sec, ts_frac) %s %r)" % (operator, parse_timestamp(tree[2], nanosecond))
+    raise Filter_Error("Unknown filter node " + str(kind))
+
+
+def compile_predicate(tree, pcap_header):
+    """ Compiles ``tree`` into ``predicate(bytes, offset)``, which is true if the record whose
+    Packet Header starts at ``offset`` of ``bytes`` matches.
+
+    :rtype: callable
+    """
+    fields     = set()
+    expression = generate(tree, pcap_header.codec.nanosecond, fields)
+    # Pull in the fields that the requested ones are computed from
+    pending = list(fields)
+    while pending:
+        for field in DEPENDS.get(pending.pop(), []):
+            if field not in fields:
+                fields.add(field)
+                pending.append(field)
+    lines = ["def predicate(bytes, offset):",
+             "    (ts_sec, ts_frac, incl_len, orig_len) = PACKET_HEADER(bytes, offset)",
+             "    end = min(offset + %d + incl_len, len(bytes))" % HEADER_LENGTH_PACKET]
+    lines.extend("    " + code for (field, code) in FIELDS if field in fields)
+    lines.append("    return bool(%s)" % expression)
+    namespace = {"PACKET_HEADER":  pcap_header.codec.packet_header.unpack_from,
+                 "LINK_TYPE":      pcap_header.network,
+                 "ETHERTYPE_IPV4": ETHERTYPE_IPV4,
+                 "ETHERTYPE_IPV6": ETHERTYPE_IPV6,
+                 "ADDRESS_V4":     ADDRESS_V4.unpack_from,
+                 "ADDRESS_V6":     ADDRESS_V6.unpack_from,
+                 "UINT8":          UINT8.unpack_from,
+                 "ip_header":      ip_header}
+    exec compile("\n".join(lines) + "\n", "<filter>", "exec") in namespace
+    return namespace["predicate"]
+
+
+class Packet_Filter(object):
+    """ A parsed filter expression, compiled for each capture (or pcapng interface) it is used on.
+
+    :ivar str expression: The filter, as written.
+    :ivar int matched: Records that matched.
+    :ivar int rejected: Records that did not.
+    """
+    def __init__(self, expression):
+        self.expression = expression
+        self.tree       = Filter_Parser(expression).parse()
+        self.predicates = {}
+        self.matched    = 0
+        self.rejected   = 0
+
+
+    def predicate(self, pcap_header):
+        """ Returns ``predicate(bytes, offset)`` for records under ``pcap_header``, compiling it
+        the first time.
+        """
+        predicate = self.predicates.get(pcap_header)
+        if predicate is None:
+            predicate = self.predicates[pcap_header] = compile_predicate(self.tree, pcap_header)
+        return predicate
+
+
+    def matches(self, pcap_header, bytes, offset=0):
+        if self.predicate(pcap_header)(bytes, offset):
+            self.matched += 1
+            return True
+        self.rejected += 1
+        return False
+
+
+    def select(self, records):
+        """ Yields the ``(pcap_header, record)`` of ``records`` that match, dropping the rest.
+
+        :rtype: generator of (:class:`header_pcap.PCAP_Header`, **binary** string)
+        """
+        for (pcap_header, record) in records:
+            if self.matches(pcap_header, record):
+                yield (pcap_header, record)
+
+
+    def packet_class(self, packet_class):
+        """ Wraps ``packet_class`` so that records that do not match are passed through untouched
+        (as a :class:`~tolerant.Passthrough_Packet`) instead of being parsed.
+
+        :rtype: callable
+        """
+        def filtered_packet(pcap_header, raw_bytes, offset=0):
+            if self.matches(pcap_header, raw_bytes, offset):
+                return packet_class(pcap_header, raw_bytes, offset)
+            return Passthrough_Packet(pcap_header, raw_bytes, offset)
+        return filtered_packet
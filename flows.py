@@ -0,0 +1,267 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+Per-flow accounting of decapsulated traffic. Every packet is counted against its flow, the outer
+5-tuple together with the 5-tuple of the packet tunnelled inside it, so the heaviest tunnels (and
+what they carry) can be read straight off the output instead of rescanning the capture.
+
+The table is array backed: the keys live in one ``bytearray`` and each counter in its own
+``array``, indexed by row, with an open-addressed index of rows in front of them. A flow costs a
+fixed number of bytes rather than a Python object per flow and per counter.
+"""
+
+##
+# Python Imports
+import csv
+import json
+import array
+import socket
+import struct
+
+##
+# Project Imports
+from codec          import INTERNET, IPV6_SUMMARY, ICMP
+from decoders       import ip_header, LINKTYPE_RAW
+from frame_ethernet import ETHERTYPE_IPV4
+from frame_internet import FRAME_LENGTH_INTERNET
+from frame_protocol import PROTO_ICMP, PROTO_TCP, PROTO_UDP, FRAME_LENGTH_ICMP
+from fragments      import timestamp
+
+##
+# Error Handling
+from errors import GenericException
+class Flow_Error(GenericException):
+    """ Errors relating to flow accounting.
+    """
+    pass
+
+##
+# Global Variables
+TUPLE            = struct.Struct("!B16s16sBHH")    # version, src_ip, dst_ip, protocol, ports
+PORTS            = struct.Struct("!HH")
+KEY_LENGTH       = TUPLE.size * 2                  # The outer then the inner 5-tuple
+NO_TUPLE         = TUPLE.pack(0, "", "", 0, 0, 0)  # The inner 5-tuple of a packet passed through
+IPV6_HEADER      = 40
+PORT_PROTOCOLS   = (PROTO_TCP, PROTO_UDP, 132)     # 132 is SCTP
+ICMP_ECHO_TYPES  = (0, 8)
+INITIAL_CAPACITY = 1024
+EMPTY            = -1
+FIELDS           = ("outer_src", "outer_dst", "outer_protocol", "outer_src_port",
+                    "outer_dst_port", "inner_src", "inner_dst", "inner_protocol", "inner_src_port",
+                    "inner_dst_port", "packets", "bytes", "inner_bytes", "overhead", "first",
+                    "last")
+
+
+def five_tuple(link_type, bytes, offset, end):
+    """ Packs the 5-tuple of the IP packet at ``offset``. ICMP echo flows use the echo identifier as
+    their source port, as that is what tells ICMP tunnels apart.
+
+    :rtype:   **Binary** string or None
+    :returns: The packed ``TUPLE``, or None if the packet is not IP.
+    """
+    (offset, ether_type) = ip_header(link_type, bytes, offset, end)
+    if ether_type is None:
+        return None
+    if ether_type == ETHERTYPE_IPV4:
+        if end - offset < FRAME_LENGTH_INTERNET:
+            return None
+        (ver_head_len, _, _, _, _, _, protocol, _, src_ip,
+         dst_ip) = INTERNET.unpack_from(bytes, offset)
+        (version, payload) = (4, offset + (ver_head_len & 0x0f) * 4)
+    else:
+        if end - offset < IPV6_HEADER:
+            return None
+        (_, protocol)      = IPV6_SUMMARY.unpack_from(bytes, offset)
+        src_ip             = str(bytes[offset + 8:offset + 24])
+        dst_ip             = str(bytes[offset + 24:offset + 40])
+        (version, payload) = (6, offset + IPV6_HEADER)
+    (src_port, dst_port) = (0, 0)
+    if protocol in PORT_PROTOCOLS and end - payload >= PORTS.size:
+        (src_port, dst_port) = PORTS.unpack_from(bytes, payload)
+    elif protocol == PROTO_ICMP and version == 4 and end - payload >= FRAME_LENGTH_ICMP:
+        (icmp_type, _, _, identifier, _) = ICMP.unpack_from(bytes, payload)
+        if icmp_type in ICMP_ECHO_TYPES:
+            src_port = identifier
+    return TUPLE.pack(version, src_ip, dst_ip, protocol, src_port, dst_port)
+
+
+def format_tuple(packed):
+    """ Unpacks a ``TUPLE`` into printable values.
+
+    :rtype:   (str, str, int, int, int)
+    :returns: The source and destination addresses, protocol and ports, with empty addresses if
+        there is no 5-tuple.
+    """
+    (version, src_ip, dst_ip, protocol, src_port, dst_port) = TUPLE.unpack(packed)
+    if version == 4:
+        (src_ip, dst_ip) = (socket.inet_ntoa(src_ip[:4]), socket.inet_ntoa(dst_ip[:4]))
+    elif version == 6:
+        (src_ip, dst_ip) = (socket.inet_ntop(socket.AF_INET6, src_ip),
+                            socket.inet_ntop(socket.AF_INET6, dst_ip))
+    else:
+        (src_ip, dst_ip) = ("", "")
+    return (src_ip, dst_ip, protocol, src_port, dst_port)
+
+
+def inner_tuple(packet):
+    """ Packs the 5-tuple of the packet tunnelled inside ``packet``.
+
+    :rtype:   **Binary** string or None
+    :returns: The packed ``TUPLE``, or None if ``packet`` was not tunnelled or carries no IP.
+    """
+    if packet.tunnel is None:
+        return None
+    # A link-layer header ends right at the IP header; without one, the tunnelled packet is framed
+    # as the capture's link type
+    (link_header, payload) = packet.tunnel
+    link_type = LINKTYPE_RAW if link_header else packet.packet_header.pcap_header.network
+    return five_tuple(link_type, payload, 0, len(payload))
+
+
+class Flow_Table(object):
+    """ Sits between a reader and the writer, counting every packet against its flow.
+
+    .. example::
+
+        ``` python
+        flows = Flow_Table()
+        for packet in flows.account(reader.iter_packets(Tunnel_Packet)):
+            writer.write_packet(packet)
+        with open("flows.csv", "wb") as out_file:
+            flows.write_csv(out_file)
+        ```
+
+    :ivar bytearray keys: Each flow's outer and inner ``TUPLE``, ``KEY_LENGTH`` bytes per row.
+    :ivar array hashes: Each row's key hash, so the index can be rebuilt without rehashing.
+    :ivar array index: Open-addressed (linear probing) slots holding row numbers, or ``EMPTY``.
+    :ivar array packets: Each flow's packet count.
+    :ivar array bytes: Each flow's captured bytes, as read.
+    :ivar array inner_bytes: Each tunnelled flow's captured bytes once decapsulated, so
+        ``1 - inner_bytes / bytes`` is the share taken up by tunnel headers.
+    :ivar array first: Each flow's first capture time.
+    :ivar array last: Each flow's latest capture time.
+    :ivar int skipped: Packets that are not IP, so belong to no flow.
+    """
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        if capacity < 1 or capacity & (capacity - 1):
+            raise Flow_Error("capacity must be a power of 2, received " + str(capacity))
+        self.keys        = bytearray()
+        self.hashes      = array.array("l")
+        self.index       = array.array("l", [EMPTY]) * capacity
+        self.packets     = array.array("L")
+        self.bytes       = array.array("d")
+        self.inner_bytes = array.array("d")
+        self.first       = array.array("d")
+        self.last        = array.array("d")
+        self.skipped     = 0
+
+
+    def __len__(self):
+        return len(self.packets)
+
+
+    def account(self, packets):
+        """ Yields every packet of ``packets`` unchanged, counting each one against its flow.
+
+        :rtype: generator of :class:`~packet_tunnel.Tunnel_Packet`
+        """
+        for packet in packets:
+            self.add(packet)
+            yield packet
+
+
+    def add(self, packet):
+        """ Counts one packet against its flow.
+        """
+        data  = packet.data
+        outer = five_tuple(packet.packet_header.pcap_header.network, data, 0, len(data))
+        if outer is None:
+            self.skipped += 1
+            return
+        inner       = NO_TUPLE
+        inner_bytes = 0
+        if packet.tunnel is not None:
+            inner       = inner_tuple(packet) or NO_TUPLE
+            inner_bytes = packet.decap_length
+        now = timestamp(packet)
+        row = self.row(outer + inner)
+        self.packets[row]     += 1
+        self.bytes[row]       += len(data)
+        self.inner_bytes[row] += inner_bytes
+        self.first[row]        = min(self.first[row], now)
+        self.last[row]         = max(self.last[row], now)
+
+
+    def row(self, key):
+        """ Finds the row of ``key``, adding an empty flow if it has not been seen.
+
+        :rtype: int
+        """
+        key_hash = hash(key)
+        mask     = len(self.index) - 1
+        slot     = key_hash & mask
+        while True:
+            row = self.index[slot]
+            if row == EMPTY:
+                break
+            if (self.hashes[row] == key_hash and
+                    self.keys[row * KEY_LENGTH:(row + 1) * KEY_LENGTH] == key):
+                return row
+            slot = (slot + 1) & mask
+        row              = len(self.packets)
+        self.index[slot] = row
+        self.keys.extend(key)
+        self.hashes.append(key_hash)
+        self.packets.append(0)
+        self.bytes.append(0)
+        self.inner_bytes.append(0)
+        self.first.append(float("inf"))
+        self.last.append(float("-inf"))
+        # Keep the index at most half full, so probes stay short
+        if len(self.packets) * 2 > len(self.index):
+            self.grow()
+        return row
+
+
+    def grow(self):
+        """ Doubles the index and re-slots every row.
+        """
+        self.index = array.array("l", [EMPTY]) * (len(self.index) * 2)
+        mask       = len(self.index) - 1
+        for (row, key_hash) in enumerate(self.hashes):
+            slot = key_hash & mask
+            while self.index[slot] != EMPTY:
+                slot = (slot + 1) & mask
+            self.index[slot] = row
+
+
+    def rows(self):
+        """ Yields every flow, heaviest (by captured bytes) first.
+
+        :rtype: generator of tuples, in the order of ``FIELDS``
+        """
+        for row in sorted(xrange(len(self)), key=self.bytes.__getitem__, reverse=True):
+            key         = str(self.keys[row * KEY_LENGTH:(row + 1) * KEY_LENGTH])
+            inner_bytes = self.inner_bytes[row]
+            overhead    = (1 - inner_bytes / self.bytes[row]) if inner_bytes else 0.0
+            yield (format_tuple(key[:TUPLE.size]) + format_tuple(key[TUPLE.size:]) +
+                   (self.packets[row], int(self.bytes[row]), int(inner_bytes),
+                    round(overhead, 4), self.first[row], self.last[row]))
+
+
+    def write_csv(self, fileobj):
+        """ Writes every flow to ``fileobj`` as CSV, with a header row of ``FIELDS``.
+        """
+        out = csv.writer(fileobj)
+        out.writerow(FIELDS)
+        for flow in self.rows():
+            out.writerow(flow)
+
+
+    def write_json(self, fileobj):
+        """ Writes every flow to ``fileobj`` as a JSON list of objects keyed by ``FIELDS``.
+        """
+        json.dump([dict(zip(FIELDS, flow)) for flow in self.rows()], fileobj, indent=1,
+                  separators=(",", ": "), sort_keys=True)
+        fileobj.write("\n")
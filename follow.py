@@ -0,0 +1,238 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+Follows a capture that is still being written, as ``tail -f`` does, and moves on to the next file
+when the capture is rotated (``tcpdump -C``/``-G``, or the file being replaced under the same name).
+
+Each file is opened once and read through a :class:`Growing_File`, whose ``read()`` waits for bytes
+that have not been written yet. The readers therefore handle a partly written trailing record by
+waiting for the rest of it, and keep their ``PCAP_Header`` for as long as the file is followed.
+"""
+
+##
+# Python Imports
+import io
+import os
+import re
+import time
+import fnmatch
+
+##
+# Project Imports
+from index  import INDEX_SUFFIX
+from batch  import OUTPUT_PREFIXES
+from shards import shard_path
+
+##
+# Error Handling
+from errors import GenericException
+class Follow_Error(GenericException):
+    """ Errors relating to following a growing capture.
+    """
+    pass
+
+##
+# Global Variables
+DEFAULT_POLL_INTERVAL = 0.2     # Seconds between looks for new data, so also the output latency
+
+
+def rotation_pattern(filename):
+    """ Guesses the glob that the rotated files of ``filename`` match: each run of digits (the
+    counter or timestamp rotation changes) becomes a wildcard that must start with a digit, or,
+    with no digits, anything may follow it (``tcpdump -C`` appends a counter).
+
+    :rtype: str
+    """
+    if re.search(r"\d", filename):
+        return re.sub(r"\d+", "[0-9]*", filename)
+    return filename + "*"
+
+
+def natural_key(filename):
+    """ Sorts ``capture.pcap9`` before ``capture.pcap10``.
+    """
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", filename)]
+
+
+class Growing_File(object):
+    """ A file object over a file that is still being written. A short ``read()`` only happens once
+    the :class:`Follower` has given up on the file (it was rotated, or stopped).
+
+    :ivar fileobj: The underlying (binary) file object.
+    :ivar follower: The :class:`Follower` that decides how long to wait for more data.
+    """
+    def __init__(self, fileobj, follower):
+        self.fileobj  = fileobj
+        self.follower = follower
+
+
+    def read(self, num_bytes=-1):
+        if num_bytes is None or num_bytes < 0:
+            return self.fileobj.read()
+        chunks    = []
+        remaining = num_bytes
+        while remaining > 0:
+            chunk = self.fileobj.read(remaining)
+            if not chunk:
+                if self.follower.wait():
+                    continue
+                # Finished with, but take anything written just before it was rotated away
+                chunk = self.fileobj.read(remaining)
+                if not chunk:
+                    break
+            chunks.append(chunk)
+            remaining                -= len(chunk)
+            self.follower.idle_since  = None
+        return "".join(chunks)
+
+
+    def tell(self):
+        return self.fileobj.tell()
+
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self.fileobj.seek(offset, whence)
+
+
+class Follower(object):
+    """ Yields a :class:`Growing_File` for the followed capture, and then for each file it is
+    rotated to.
+
+    .. example::
+
+        ``` python
+        follower = Follower("/var/captures/tunnel.pcap")
+        for growing_file in follower.files():
+            for packet in PCAP_Reader(growing_file).iter_packets(Tunnel_Packet):
+                writer.write_packet(packet)
+        ```
+
+    :type path: str
+    :ivar path: The file currently followed.
+
+    :type pattern: str
+    :ivar pattern: The glob (matched against names in the same directory) rotated files match.
+
+    :type poll_interval: float
+    :ivar poll_interval: Seconds to sleep while there is no new data.
+
+    :type idle_timeout: float or None
+    :ivar idle_timeout: Stop after this many seconds without new data. None follows forever.
+
+    :type exclude: list of str
+    :ivar exclude: Paths that are never followed, however they are named, e.g. the output, along
+        with their shards.
+
+    :ivar on_idle: Called with no arguments before each sleep, e.g. to flush output, or None.
+    :ivar int rotations: The number of times the capture was rotated.
+    """
+    def __init__(self, path, pattern=None, poll_interval=DEFAULT_POLL_INTERVAL, idle_timeout=None,
+                 on_idle=None, exclude=()):
+        if not os.path.isfile(path):
+            raise Follow_Error("Cannot follow " + path + ": no such file")
+        self.path          = path
+        self.directory     = os.path.dirname(path) or "."
+        self.pattern       = pattern or rotation_pattern(os.path.basename(path))
+        self.poll_interval = poll_interval
+        self.idle_timeout  = idle_timeout
+        self.on_idle       = on_idle
+        self.exclude       = [os.path.abspath(excluded) for excluded in exclude]
+        self.rotations     = 0
+        self.next_path     = None
+        self.stopped       = False
+        self.idle_since    = None
+        self.inode         = None
+        # Rotated files from before the one we start on have already been dealt with
+        start_key          = self.sort_key(os.path.basename(path))
+        self.seen          = set(name for name in self.candidates()
+                                 if self.sort_key(name) <= start_key)
+
+
+    def files(self):
+        """ Yields a :class:`Growing_File` per file, opening the next one only once the previous
+        one has been read to its end.
+
+        :rtype: generator of :class:`Growing_File`
+        """
+        while True:
+            with io.open(self.path, "rb") as fileobj:
+                self.inode      = os.fstat(fileobj.fileno()).st_ino
+                self.next_path  = None
+                self.idle_since = None
+                yield Growing_File(fileobj, self)
+            if self.next_path is None:
+                return
+            self.path       = self.next_path
+            self.rotations += 1
+            self.seen.add(os.path.basename(self.path))
+
+
+    def wait(self):
+        """ Called when the current file has no more data. Sleeps for ``poll_interval``, unless the
+        file has been rotated or the follower has stopped.
+
+        :rtype:   bool
+        :returns: True to look for more data, or False if the current file is finished.
+        """
+        if self.stopped:
+            return False
+        if self.on_idle is not None:
+            self.on_idle()
+        self.next_path = self.find_next()
+        if self.next_path is not None:
+            return False
+        now = time.time()
+        if self.idle_since is None:
+            self.idle_since = now
+        elif self.idle_timeout is not None and now - self.idle_since >= self.idle_timeout:
+            self.stopped = True
+            return False
+        time.sleep(self.poll_interval)
+        return True
+
+
+    def find_next(self):
+        """ Returns the path of the file the capture was rotated to, or None if it has not been.
+        A file replaced under the same name counts as a rotation to it.
+
+        :rtype: str or None
+        """
+        try:
+            if os.stat(self.path).st_ino != self.inode:
+                return self.path
+        except OSError:
+            pass
+        names = [name for name in self.candidates() if name not in self.seen]
+        if not names:
+            return None
+        return os.path.join(self.directory, min(names, key=self.sort_key))
+
+
+    def candidates(self):
+        """ The names in ``directory`` that look like rotated files of the capture. Our own output
+        (decap_ and quarantine_ files, sidecar indexes, and ``exclude`` and its shards) never is,
+        or a capture next to its output would be followed onto it and read back into it.
+
+        :rtype: list of str
+        """
+        return [name for name in os.listdir(self.directory)
+                if fnmatch.fnmatch(name, self.pattern) and not self.excluded(name)]
+
+
+    def excluded(self, name):
+        if name.startswith(OUTPUT_PREFIXES) or name.endswith(INDEX_SUFFIX):
+            return True
+        path = os.path.abspath(os.path.join(self.directory, name))
+        return any(path == excluded or fnmatch.fnmatch(path, shard_path(excluded, "*"))
+                   for excluded in self.exclude)
+
+
+    def sort_key(self, name):
+        """ Orders rotated files by modification time, then by name.
+        """
+        try:
+            mtime = os.stat(os.path.join(self.directory, name)).st_mtime
+        except OSError:
+            mtime = 0
+        return (mtime, natural_key(name))
@@ -0,0 +1,280 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+Reassembles fragmented IPv4 tunnel packets before they are decapsulated. Fragments are collected
+per datagram, keyed on ``(src_ip, dst_ip, ident, protocol)``, and a complete datagram is
+re-framed as a single record and decapsulated in place of the fragment that completed it.
+
+Buffering is bounded: datagrams not completed within ``timeout`` seconds of capture time are given
+up on, and once the buffered fragments exceed ``max_memory`` bytes the least recently updated
+datagrams are evicted. The fragments of a datagram that is given up on, or that turns out not to
+be a tunnel, or that would be longer than the capture's snaplen once reassembled, are written out
+unchanged, so nothing is lost.
+"""
+
+##
+# Python Imports
+import collections
+
+##
+# Project Imports
+from lib            import internet_checksum
+from codec          import INTERNET
+from decoders       import ip_header, IPV4_FRAGMENT
+from frame_ethernet import ETHERTYPE_IPV4
+from frame_internet import FRAME_LENGTH_INTERNET
+from packet_tunnel  import Tunnel_Packet
+
+##
+# Error Handling
+from errors import GenericException
+class Fragment_Error(GenericException):
+    """ Errors relating to IPv4 fragment reassembly.
+    """
+    pass
+
+##
+# Global Variables
+DEFAULT_MAX_MEMORY = 64 * 1024 * 1024   # Bytes of buffered fragment records
+DEFAULT_TIMEOUT    = 30.0               # Seconds, as Linux's ipfrag_time
+MAX_DATAGRAM       = 65535
+FLAG_DONT_FRAGMENT = 0x4000
+FLAG_MORE          = 0x2000
+OFFSET_MASK        = 0x1fff
+
+
+def parse_fragment(packet):
+    """ Decodes the IPv4 header of ``packet`` if it is a fragment.
+
+    :type packet: :class:`~packet_tunnel.Tunnel_Packet`
+
+    :rtype:   tuple or None
+    :returns: ``(key, ip_offset, header_length, fragment_offset, more_fragments, payload_length)``
+        where the offsets are relative to ``packet.data``, or None if the packet is not a usable
+        IPv4 fragment.
+    """
+    data                 = packet.data
+    (offset, ether_type) = ip_header(packet.packet_header.pcap_header.network, data, 0, len(data))
+    if ether_type != ETHERTYPE_IPV4 or len(data) - offset < FRAME_LENGTH_INTERNET:
+        return None
+    (ver_head_len, _, total_len, ident, flags, _, protocol, _, src_ip,
+     dst_ip) = INTERNET.unpack_from(data, offset)
+    header_length = (ver_head_len & 0x0f) * 4
+    if (not flags & IPV4_FRAGMENT or ver_head_len >> 4 != 4 or
+            header_length < FRAME_LENGTH_INTERNET or total_len <= header_length or
+            offset + total_len > len(data)):
+        return None
+    payload_length  = total_len - header_length
+    fragment_offset = (flags & OFFSET_MASK) * 8
+    more_fragments  = bool(flags & FLAG_MORE)
+    if fragment_offset + payload_length > MAX_DATAGRAM or (more_fragments and payload_length % 8):
+        return None
+    return ((src_ip, dst_ip, ident, protocol), offset, header_length, fragment_offset,
+            more_fragments, payload_length)
+
+
+def timestamp(packet):
+    """ Returns the capture time of ``packet`` in seconds.
+
+    :rtype: float
+    """
+    packet_header = packet.packet_header
+    units         = 1e9 if packet_header.codec.nanosecond else 1e6
+    return packet_header.ts_sec + packet_header.ts_usec / units
+
+
+class Datagram(object):
+    """ The fragments of one IPv4 datagram seen so far.
+
+    :ivar list packets: The fragments' packets, in capture order.
+    :ivar dict pieces: Each fragment's payload (a ``buffer``), keyed by its offset in the datagram.
+    :ivar int total_length: The length of the reassembled payload, once the last fragment is seen.
+    :ivar first: The packet holding the first fragment (offset 0), once seen.
+    :ivar tuple first_ip: ``(ip_offset, header_length)`` of the first fragment's IPv4 header.
+    :ivar int memory: The number of record bytes held.
+    :ivar float last_seen: The capture time of the latest fragment.
+    """
+    __slots__ = ("packets", "pieces", "total_length", "first", "first_ip", "memory", "last_seen")
+
+
+    def __init__(self):
+        self.packets      = []
+        self.pieces       = {}
+        self.total_length = None
+        self.first        = None
+        self.first_ip     = None
+        self.memory       = 0
+        self.last_seen    = 0.0
+
+
+    @property
+    def complete(self):
+        if self.total_length is None or self.first is None:
+            return False
+        covered = 0
+        for offset in sorted(self.pieces):
+            if offset > covered:
+                return False
+            covered = max(covered, offset + len(self.pieces[offset]))
+        return covered >= self.total_length
+
+
+class Fragment_Reassembler(object):
+    """ Sits between a reader and the writer, replacing the fragments of each tunnelled datagram
+    with the decapsulated, reassembled datagram.
+
+    .. example::
+
+        ``` python
+        reassembler = Fragment_Reassembler()
+        for packet in reassembler.reassemble(reader.iter_packets(Tunnel_Packet)):
+            writer.write_packet(packet)
+        ```
+
+    :ivar packet_class: The class (e.g. a ``functools.partial`` of
+        :class:`~packet_tunnel.Tunnel_Packet`) used to decapsulate reassembled datagrams.
+
+    :type max_memory: int
+    :ivar max_memory: The most record bytes buffered across all incomplete datagrams.
+
+    :type timeout: float
+    :ivar timeout: Seconds of capture time an incomplete datagram is kept after its last fragment.
+
+    :ivar int fragments: Fragments seen.
+    :ivar int reassembled: Datagrams reassembled and decapsulated.
+    :ivar int evicted: Incomplete datagrams evicted to stay within ``max_memory``.
+    :ivar int timed_out: Incomplete datagrams given up on after ``timeout``.
+    :ivar int incomplete: Datagrams still incomplete at the end of the capture.
+    :ivar int oversized: Complete datagrams written as fragments because they are longer than the
+        snaplen.
+    """
+    def __init__(self, packet_class=Tunnel_Packet, max_memory=DEFAULT_MAX_MEMORY,
+                 timeout=DEFAULT_TIMEOUT):
+        if max_memory < 0 or timeout < 0:
+            raise Fragment_Error("max_memory and timeout cannot be negative")
+        self.packet_class = packet_class
+        self.max_memory   = max_memory
+        self.timeout      = timeout
+        # Least recently updated first, so both kinds of eviction pop from the front
+        self.datagrams    = collections.OrderedDict()
+        self.memory       = 0
+        self.fragments    = 0
+        self.reassembled  = 0
+        self.evicted      = 0
+        self.timed_out    = 0
+        self.incomplete   = 0
+        self.oversized    = 0
+
+
+    def reassemble(self, packets):
+        """ Yields every packet of ``packets``, except that fragments are held back until their
+        datagram is complete (or given up on).
+
+        :rtype: generator of :class:`~packet_tunnel.Tunnel_Packet`
+        """
+        for packet in packets:
+            if self.datagrams:
+                for expired in self.expire(timestamp(packet)):
+                    yield expired
+            fragment = parse_fragment(packet)
+            if fragment is None:
+                yield packet
+                continue
+            for done in self.add(packet, fragment):
+                yield done
+        for key in self.datagrams.keys():
+            self.incomplete += 1
+            for original in self.drop(key):
+                yield original
+
+
+    def add(self, packet, fragment):
+        """ Buffers one fragment, returning the packets it releases.
+
+        :rtype: list
+        """
+        (key, ip_offset, header_length, fragment_offset, more_fragments,
+         payload_length) = fragment
+        self.fragments += 1
+        datagram = self.datagrams.pop(key, None) or Datagram()
+        self.datagrams[key] = datagram
+        datagram.packets.append(packet)
+        datagram.pieces.setdefault(fragment_offset,
+                                   buffer(packet.data, ip_offset + header_length, payload_length))
+        datagram.memory   += len(packet.bytes)
+        datagram.last_seen = timestamp(packet)
+        self.memory       += len(packet.bytes)
+        if not more_fragments:
+            datagram.total_length = fragment_offset + payload_length
+        if fragment_offset == 0:
+            (datagram.first, datagram.first_ip) = (packet, (ip_offset, header_length))
+        if datagram.complete:
+            return self.complete(key, packet)
+        released = []
+        while self.memory > self.max_memory and self.datagrams:
+            self.evicted += 1
+            released.extend(self.drop(next(iter(self.datagrams))))
+        return released
+
+
+    def expire(self, now):
+        """ Gives up on the datagrams whose latest fragment is more than ``timeout`` seconds old.
+
+        :rtype: list
+        """
+        released = []
+        while self.datagrams:
+            (key, datagram) = next(self.datagrams.iteritems())
+            if now - datagram.last_seen <= self.timeout:
+                break
+            self.timed_out += 1
+            released.extend(self.drop(key))
+        return released
+
+
+    def drop(self, key):
+        """ Forgets a datagram, returning its fragments unchanged.
+        """
+        datagram     = self.datagrams.pop(key)
+        self.memory -= datagram.memory
+        return datagram.packets
+
+
+    def complete(self, key, last):
+        """ Re-frames a complete datagram as one record, timestamped with the fragment ``last`` that
+        completed it, and decapsulates it.
+
+        :rtype:   list
+        :returns: The decapsulated datagram, or its fragments unchanged if it is not a tunnel or
+            would not fit in a record.
+        """
+        datagram      = self.datagrams[key]
+        packet_header = last.packet_header
+        (ip_offset, header_length) = datagram.first_ip
+        if (ip_offset + header_length + datagram.total_length >
+                packet_header.pcap_header.snaplen):
+            self.oversized += 1
+            return self.drop(key)
+        payload  = bytearray(datagram.total_length)
+        for offset in sorted(datagram.pieces):
+            piece = datagram.pieces[offset][:datagram.total_length - offset]
+            payload[offset:offset + len(piece)] = piece
+        # The first fragment's header (options included), describing the whole datagram
+        data       = datagram.first.data
+        options    = data[ip_offset + FRAME_LENGTH_INTERNET:ip_offset + header_length]
+        fields     = list(INTERNET.unpack_from(data, ip_offset))
+        fields[2]  = header_length + datagram.total_length     # total_len
+        fields[4] &= FLAG_DONT_FRAGMENT                         # flags and fragment offset
+        fields[7]  = 0                                          # checksum
+        fields[7]  = internet_checksum(INTERNET.pack(*fields) + options)
+        frame      = data[:ip_offset] + INTERNET.pack(*fields) + options + str(payload)
+        record        = packet_header.codec.packet_header.pack(packet_header.ts_sec,
+                                                               packet_header.ts_usec, len(frame),
+                                                               len(frame)) + frame
+        reassembled   = self.packet_class(packet_header.pcap_header, record)
+        packets     = self.drop(key)
+        if not reassembled.decapsulated:
+            return packets
+        self.reassembled += 1
+        return [reassembled]
@@ -5,12 +5,12 @@
 
 ##
 # Python Imports
-import sys
 import binascii
 import collections
 
 ##
 # Project Imports
+from codec import ETHERNET
 
 ##
 # Error Handling
@@ -22,8 +22,8 @@ class Ethernet_Error(GenericException):
 
 ##
 # Global Variables
-DEBUG = False
 FRAME_LENGTH_ETHERNET = 14
+ETHERTYPE_IPV4        = 0x0800
 
 class Ethernet_Frame(object):
     """ Abstracts the handling of a LibPCAP's Ethernet Frame for easier manipulation.
@@ -34,8 +34,11 @@ class Ethernet_Frame(object):
     :ivar str src_mac:
         A **binary string** containing the MAC address of the sending machine.
 
-    :ivar str type:
-        A **binary string** containing the type of packet.
+    :ivar int type:
+        The EtherType of the packet (e.g. ``0x0800`` for IPv4).
+
+    The frame may be built from any buffer (such as an ``mmap``) and the ``offset`` it starts at;
+    only the MAC addresses are copied out of it.
     """
     length = FRAME_LENGTH_ETHERNET
 
@@ -46,28 +49,20 @@ class Ethernet_Frame(object):
         return (obj, bytes[FRAME_LENGTH_ETHERNET:],)
 
 
-    def __init__(self, bytes):
+    def __init__(self, bytes, offset=0):
         # Ensure the Frame is long enough to process
-        if len(bytes) < FRAME_LENGTH_ETHERNET:
-            raise Packet_Header_Error("Expected at least " + str(FRAME_LENGTH_ETHERNET) + " bytes." +
-                                    " Received " + len(bytes) + " bytes", [binascii.hexifly(bytes)])
+        if len(bytes) - offset < FRAME_LENGTH_ETHERNET:
+            raise Ethernet_Error("Expected at least " + str(FRAME_LENGTH_ETHERNET) + " bytes." +
+                                 " Received " + str(len(bytes) - offset) + " bytes",
+                                 [binascii.hexlify(bytes[offset:])])
         ##
         # Parse Bytes
-        self.dst_mac = bytes[0:6]
-        self.src_mac = bytes[6:12]
-        self.type    = bytes[12:14]
+        (self.dst_mac,
+         self.src_mac,
+         self.type) = ETHERNET.unpack_from(bytes, offset)
         # Sanity Check type
-        if binascii.hexlify(self.type) != "0800":
+        if self.type != ETHERTYPE_IPV4:
             raise Ethernet_Error("IPv4 Packets ONLY (type = 0x0800)", [dict(self)])
-        # If in Debug Mode - Print this object
-        if DEBUG:
-            print str(self.__class__)
-            for byte in bytes[:FRAME_LENGTH_ETHERNET]:
-                sys.stdout.write(binascii.hexlify(byte) + " ")
-            print ""
-            for key, value in collections.OrderedDict(self).iteritems():
-                print str(key) + " " + str(value)
-            print ""
 
 
     def __iter__(self):
@@ -75,7 +70,7 @@ class Ethernet_Frame(object):
         me["bytes  "] = binascii.hexlify(self.raw_bytes)
         me["dst_mac"] = binascii.hexlify(self.dst_mac)
         me["src_mac"] = binascii.hexlify(self.src_mac)
-        me["type   "] = binascii.hexlify(self.type)
+        me["type   "] = "%04x" % self.type
         return me.iteritems()
 
 
@@ -83,5 +78,5 @@ class Ethernet_Frame(object):
     def raw_bytes(self):
         """ Returns the "raw bytes" **binary string** that comprise the Ethernet Frame.
         """
-        return self.dst_mac + self.src_mac + self.type
+        return ETHERNET.pack(self.dst_mac, self.src_mac, self.type)
 
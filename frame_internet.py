@@ -5,14 +5,13 @@
 
 ##
 # Python Imports
-import sys
 import struct
 import binascii
 import collections
 
 ##
 # Project Imports
-from lib import int_into_bytes
+from codec import INTERNET
 
 ##
 # Error Handling
@@ -24,44 +23,47 @@ class Internet_Frame_Error(GenericException):
 
 ##
 # Global Variables
-DEBUG = False
 FRAME_LENGTH_INTERNET = 20
+VER_HEAD_LEN_IPV4     = 0x45
 
 
 class Internet_Frame(object):
     """ Abstracts the handling of a LibPCAP's Internet Protocol Frame for easier manipulation.
 
-    :ivar str ver_head_len:
-        A **binary string** containing ***BOTH*** the IP Version and Header Length values.
+    :ivar int ver_head_len:
+        The byte containing ***BOTH*** the IP Version and Header Length values.
         .. ToDo::
             Make this less lazy and actually split up the byte into two nibbles.
 
-    :ivar str diff_serv:
-        A **binary string** containing the Differentiated Services Field.
+    :ivar int diff_serv:
+        The Differentiated Services Field.
 
-    :ivar str total_len:
+    :ivar int total_len:
         The length of the IP Packet.
 
-    :ivar str ident:
-        A **binary string** containing the packet's identification.
+    :ivar int ident:
+        The packet's identification.
 
-    :ivar str flags:
-        A **binary string** containing the packet's IP flags.
+    :ivar int flags:
+        The packet's IP flags and fragment offset.
 
-    :ivar str ttl:
+    :ivar int ttl:
         The number of hops this packet can make.
 
-    :ivar str protocol:
+    :ivar int protocol:
         The packet's protocol as a decimal number.
 
-    :ivar str checksum:
-        A **binary string** containing the packet's checksum
+    :ivar int checksum:
+        The packet's checksum
 
     :ivar str src_ip:
         A **binary string** containing the packet's source IP address.
 
     :ivar str dst_ip:
         A **binary string** containing the packet's destination IP address.
+
+    The frame may be built from any buffer (such as an ``mmap``) and the ``offset`` it starts at;
+    only the IP addresses are copied out of it.
     """
     length = FRAME_LENGTH_INTERNET
 
@@ -72,45 +74,37 @@ class Internet_Frame(object):
         return (obj, bytes[FRAME_LENGTH_INTERNET:],)
 
 
-    def __init__(self, bytes):
-        if len(bytes) < FRAME_LENGTH_INTERNET:
-            raise Internet_Frame_Error("Expected at least 20 bytes, received " + len(bytes) +
-                                       " bytes.", [binascii.hexlify(bytes)])
-        self.ver_head_len = bytes[0]
-        if self.ver_head_len != binascii.unhexlify("45"):
+    def __init__(self, bytes, offset=0):
+        if len(bytes) - offset < FRAME_LENGTH_INTERNET:
+            raise Internet_Frame_Error("Expected at least 20 bytes, received " +
+                                       str(len(bytes) - offset) + " bytes.",
+                                       [binascii.hexlify(bytes[offset:])])
+        (self.ver_head_len,
+         self.diff_serv,
+         self.total_len,
+         self.ident,
+         self.flags,
+         self.ttl,
+         self.protocol,
+         self.checksum,
+         self.src_ip,
+         self.dst_ip) = INTERNET.unpack_from(bytes, offset)
+        if self.ver_head_len != VER_HEAD_LEN_IPV4:
             raise Internet_Frame_Error("IPv4 20-byte headers only (0x45)",
-                                       [binascii.hexlify(bytes[0])])
-        self.diff_serv   = bytes[1]
-        self.total_len   = bytes[2:4]
-        self.ident       = bytes[4:6]
-        self.flags       = bytes[6:8]
-        self.ttl         = bytes[8]
-        self.protocol    = bytes[9]
-        self.checksum    = bytes[10:12]
-        self.src_ip      = bytes[12:16]
-        self.dst_ip      = bytes[16:20]
-        # If in Debug Mode - Print this object
-        if DEBUG:
-            print str(self.__class__)
-            for byte in bytes[:FRAME_LENGTH_INTERNET]:
-                sys.stdout.write(binascii.hexlify(byte) + " ")
-            print ""
-            for key, value in collections.OrderedDict(self).iteritems():
-                print str(key) + " " + str(value)
-            print ""
+                                       ["%02x" % self.ver_head_len])
 
 
     def __iter__(self):
         me = collections.OrderedDict()
         me["bytes        "] = binascii.hexlify(self.raw_bytes)
-        me["ver_head_len "] = binascii.hexlify(self.ver_head_len)
-        me["diff_serv    "] = binascii.hexlify(self.diff_serv)
-        me["total_len    "] = binascii.hexlify(self.total_len)
-        me["ident        "] = binascii.hexlify(self.ident)
-        me["flags        "] = binascii.hexlify(self.flags)
-        me["ttl          "] = binascii.hexlify(self.ttl)
-        me["protocol     "] = binascii.hexlify(self.protocol)
-        me["checksum     "] = binascii.hexlify(self.checksum)
+        me["ver_head_len "] = "%02x" % self.ver_head_len
+        me["diff_serv    "] = "%02x" % self.diff_serv
+        me["total_len    "] = self.total_len
+        me["ident        "] = "%04x" % self.ident
+        me["flags        "] = "%04x" % self.flags
+        me["ttl          "] = self.ttl
+        me["protocol     "] = self.protocol
+        me["checksum     "] = "%04x" % self.checksum
         me["src_ip       "] = binascii.hexlify(self.src_ip)
         me["dst_ip       "] = binascii.hexlify(self.dst_ip)
         return me.iteritems()
@@ -120,5 +114,6 @@ class Internet_Frame(object):
     def raw_bytes(self):
         """ Returns the "raw bytes" **binary string** that comprise the Ethernet Frame.
         """
-        return (self.ver_head_len + self.diff_serv + self.total_len + self.ident  + self.flags +
-                self.ttl          + self.protocol  + self.checksum  + self.src_ip + self.dst_ip)
+        return INTERNET.pack(self.ver_head_len, self.diff_serv, self.total_len, self.ident,
+                             self.flags, self.ttl, self.protocol, self.checksum, self.src_ip,
+                             self.dst_ip)
@@ -5,7 +5,6 @@
 
 ##
 # Python Imports
-import sys
 import binascii
 import collections
 
@@ -22,7 +21,6 @@ class Protocol_Frame_Error(GenericException):
 
 ##
 # Global Variables
-DEBUG = False
 
 PROTO_ICMP        = 1
 FRAME_LENGTH_ICMP = 8
@@ -40,6 +38,13 @@ class Protocol_Frame(object):
     Not yet implemented:
         * ``TCP``
         * ``UDP``
+
+    :ivar str header:
+        A **binary string** containing the protocol header.
+
+    :ivar buffer payload:
+        A read-only ``buffer`` over the protocol payload. No payload bytes are copied until the
+        buffer is written out (or converted with ``str()``).
     """
     @classmethod
     def parse_Protocol_Frame(cls, internet_frame, bytes):
@@ -47,23 +52,19 @@ class Protocol_Frame(object):
         return (obj, bytes[len(obj.raw_bytes):],)
 
 
-    def __init__(self, internet_frame, bytes):
+    def __init__(self, internet_frame, bytes, offset=0, end=None):
+        # Never read past the end of the record (or the end of the given bytes)
+        if end is None:
+            end = len(bytes)
         # Ensure Supported Protocol
-        if PROTO_ICMP == int(binascii.hexlify(internet_frame.protocol), 16):
-            total_bytes  = int(binascii.hexlify(internet_frame.total_len), 16)
-            self.header  = bytes[:FRAME_LENGTH_ICMP]
-            self.payload = bytes[FRAME_LENGTH_ICMP:total_bytes - FRAME_LENGTH_INTERNET]
+        if PROTO_ICMP == internet_frame.protocol:
+            total_bytes  = internet_frame.total_len
+            payload_end  = min(offset + total_bytes - FRAME_LENGTH_INTERNET, end)
+            self.header  = bytes[offset:offset + FRAME_LENGTH_ICMP]
+            self.payload = buffer(bytes, offset + FRAME_LENGTH_ICMP,
+                                  max(payload_end - offset - FRAME_LENGTH_ICMP, 0))
         else:
             raise Protocol_Frame_Error("Only ICMP is implemented")
-        # If in Debug Mode - Print this object
-        if DEBUG:
-            print str(self.__class__)
-            for byte in bytes[:total_bytes - FRAME_LENGTH_INTERNET]:
-                sys.stdout.write(binascii.hexlify(byte) + " ")
-            print ""
-            for key, value in collections.OrderedDict(self).iteritems():
-                print str(key) + " " + str(value)
-            print ""
 
 
     def __iter__(self):
@@ -78,7 +79,7 @@ class Protocol_Frame(object):
     def raw_bytes(self):
         """ Returns the "raw bytes" **binary string** that comprises the Protocol Frame.
         """
-        return self.header + self.payload
+        return self.header + str(self.payload)
     @property
     def length(self):
         return len(self.header)
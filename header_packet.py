@@ -6,13 +6,11 @@
 
 ##
 # Python Imports
-import sys
 import binascii
 import collections
 
 ##
 # Project Imports
-from lib import int_into_bytes
 
 ##
 # Error Handling
@@ -24,7 +22,6 @@ class Packet_Header_Error(GenericException):
 
 ##
 # Global Variables
-DEBUG = False
 HEADER_LENGTH_PACKET = 16
 
 class Packet_Header(object):
@@ -64,10 +61,17 @@ class Packet_Header(object):
         The length of the packet as it appeared on the network when it was captured. If ``incl_len``
         and ``orig_len`` differ, the actually saved packet size was limited by ``snaplen``.
 
+    :type pcap_header: :class:`header_pcap.PCAP_Header`
+    :ivar pcap_header:
+        The PCAP Global Header (or pcapng interface) this packet was captured on.
+
     :ivar str bytes:
-        A **binary** string containing the Packet Header as defined above starting at position 0.
-        There may be additional bytes after (typically the packet as defined by the header) but that
-        is not required. MUST be at least 16 bytes.
+        A **binary** string containing the Packet Header as defined above. The constructor accepts
+        any buffer (such as an ``mmap``) along with the ``offset`` the header starts at; only the
+        16 header bytes are kept.
+
+    :ivar int offset:
+        The position of the Packet Header within the given bytes. Defaults to 0.
     """
     length = HEADER_LENGTH_PACKET
 
@@ -78,43 +82,36 @@ class Packet_Header(object):
         return (obj, bytes[HEADER_LENGTH_PACKET:],)
 
 
-    def __init__(self, pcap_header, bytes):
+    def __init__(self, pcap_header, bytes, offset=0):
         # Ensure the header is long enough to process
-        if len(bytes) < HEADER_LENGTH_PACKET:
+        if len(bytes) - offset < HEADER_LENGTH_PACKET:
             raise Packet_Header_Error("Expected at least " + str(HEADER_LENGTH_PACKET) + " bytes." +
-                                      " Received " + str(len(bytes)) + " bytes",
-                                      [binascii.hexlify(bytes)])
-        self.flip_bytes = pcap_header.flip_bytes
+                                      " Received " + str(len(bytes) - offset) + " bytes",
+                                      [binascii.hexlify(bytes[offset:])])
+        self.pcap_header = pcap_header
+        self.flip_bytes  = pcap_header.flip_bytes
+        self.codec       = pcap_header.codec
         ##
         # Parse Bytes
-        self.bytes    = bytes[:HEADER_LENGTH_PACKET]
-        self.ts_sec   = pcap_header.flip_bytes(bytes[0:4])
-        self.ts_usec  = pcap_header.flip_bytes(bytes[4:8])
-        self.incl_len = pcap_header.flip_bytes(bytes[8:12])
-        self.orig_len = pcap_header.flip_bytes(bytes[12:16])
+        self.bytes    = bytes[offset:offset + HEADER_LENGTH_PACKET]
+        (self.ts_sec,
+         self.ts_usec,
+         self.incl_len,
+         self.orig_len) = self.codec.packet_header.unpack_from(bytes, offset)
         # Sanity Check Lengths
         if self.incl_len > self.orig_len:
             raise Packet_Header_Error("Packet length cannot be greater than the original length")
         if self.incl_len > pcap_header.snaplen:
             raise Packet_Header_Error("Packet length cannot be greater than snaplen")
-        # If in Debug Mode - Print this object
-        if DEBUG:
-            print str(self.__class__)
-            for byte in self.bytes[:HEADER_LENGTH_PACKET]:
-                sys.stdout.write(binascii.hexlify(byte) + " ")
-            print ""
-            for key, value in collections.OrderedDict(self).iteritems():
-                print str(key) + " " + str(value)
-            print ""
 
 
     def __iter__(self):
         me = collections.OrderedDict()
         me["raw_bytes"] = binascii.hexlify(self.bytes[:HEADER_LENGTH_PACKET])
-        me["ts_sec   "] = binascii.hexlify(self.ts_sec)
-        me["ts_usec  "] = binascii.hexlify(self.ts_usec)
-        me["incl_len "] = binascii.hexlify(self.incl_len)
-        me["orig_len "] = binascii.hexlify(self.orig_len)
+        me["ts_sec   "] = self.ts_sec
+        me["ts_usec  "] = self.ts_usec
+        me["incl_len "] = self.incl_len
+        me["orig_len "] = self.orig_len
         return me.iteritems()
 
 
@@ -124,14 +121,11 @@ class Packet_Header(object):
         :param new_length: The new packet length, which will be written to ``incl_len`` and
             ``origin_len`` byte locations.
         """
-        return (self.flip_bytes(self.ts_sec) +
-                self.flip_bytes(self.ts_usec) +
-                self.flip_bytes(int_into_bytes(new_length, 4))+
-                self.flip_bytes(int_into_bytes(new_length, 4)))
+        return self.codec.packet_header.pack(self.ts_sec, self.ts_usec, new_length, new_length)
 
 
     @property
     def packet_raw_bytes(self):
         """ Returns the "remaining" bytes, after the packet header.
         """
-        return self.bytes[HEADER_LENGTH_PACKET:int(binascii.hexlify(self.incl_len, 16))]
+        return self.bytes[HEADER_LENGTH_PACKET:HEADER_LENGTH_PACKET + self.incl_len]
@@ -6,12 +6,12 @@
 
 ##
 # Python Imports
-import sys
 import binascii
 import collections
 
 ##
 # Project Imports
+from codec import codec_for_magic, Codec_Error
 
 ##
 # Error Handling
@@ -23,7 +23,6 @@ class PCAP_Header_Error(GenericException):
 
 ##
 # Global Variables
-DEBUG = False
 HEADER_LENGTH_PCAP  = 24
 MAGIC_NUMBER        = "a1b2c3d4"    # Identical
 MAGIC_SWAP          = "d4c3b2a1"    # Swapped
@@ -78,16 +77,25 @@ class PCAP_Header(object):
         The "snapshot length" for the capture (typically ``65535`` or even more, but might be
         limited by the user).
 
-    :ivar str network:
+    :ivar int network:
         The link-layer header type, specifying the type of headers at the beginning of the packet
         (e.g. 1 for Ethernet, see tcpdump.org's link-layer header types page for details); this can
         be various types such as 802.11, 802.11 with various radio information, PPP, Token Ring,
         FDDI, etc.
 
+    :type codec: :class:`codec.PCAP_Codec`
+    :ivar codec:
+        The precompiled structures, chosen from the magic number, used to decode and encode every
+        header in this file.
+
     :ivar str bytes:
-        A **binary** string containing the PCAP Global Header as defined above starting at position
-        0. There may be additional bytes after (typically the packet as defined by the header) but
-        that is not required. MUST be at least 24 bytes.
+        A **binary** string (or any buffer, such as an ``mmap``) containing the PCAP Global Header
+        as defined above starting at position ``offset``. There may be additional bytes after
+        (typically the packet as defined by the header) but that is not required. MUST be at least
+        24 bytes.
+
+    :ivar int offset:
+        The position of the PCAP Global Header within ``bytes``. Defaults to 0.
     """
     length = HEADER_LENGTH_PCAP
 
@@ -98,63 +106,56 @@ class PCAP_Header(object):
         return (obj, bytes[HEADER_LENGTH_PCAP:],)
 
 
-    def __init__(self, bytes):
+    def __init__(self, bytes, offset=0):
         # Ensure the header is long enough to process
-        if len(bytes) < HEADER_LENGTH_PCAP:
+        if len(bytes) - offset < HEADER_LENGTH_PCAP:
             raise PCAP_Header_Error("Expected at least " + str(HEADER_LENGTH_PCAP) + " bytes." +
-                                    " Received " + len(bytes) + " bytes", [binascii.hexifly(bytes)])
+                                    " Received " + str(len(bytes) - offset) + " bytes",
+                                    [binascii.hexlify(bytes[offset:])])
         ##
         # Parse Bytes
-        self.magic_number  = bytes[0:4]
-        # Sanity Check Magic Number
-        if binascii.hexlify(self.magic_number) not in VALID_MAGIC_NUMBERS:
+        self.magic_number  = bytes[offset:offset + 4]
+        # Sanity Check Magic Number - this also picks the codec for every header in the file
+        try:
+            self.codec = codec_for_magic(self.magic_number)
+        except Codec_Error:
             raise PCAP_Header_Error("Magic Number not recoganized. Is this is a PCAP file?",
                                     [self.magic_number])
-        self.version_major = self.flip_bytes(bytes[4:6])
-        self.version_minor = self.flip_bytes(bytes[6:8])
-        self.thiszone      = self.flip_bytes(bytes[8:12])
-        self.sigfigs       = self.flip_bytes(bytes[12:16])
-        self.snaplen       = self.flip_bytes(bytes[16:20])
-        self.network       = self.flip_bytes(bytes[20:24])
-        # If in Debug Mode - Print this object
-        if DEBUG:
-            print str(self.__class__)
-            for byte in bytes[:HEADER_LENGTH_PCAP]:
-                sys.stdout.write(binascii.hexlify(byte) + " ")
-            print ""
-            for key, value in collections.OrderedDict(self).iteritems():
-                print str(key) + " " + str(value)
-            print ""
+        (_,
+         self.version_major,
+         self.version_minor,
+         self.thiszone,
+         self.sigfigs,
+         self.snaplen,
+         self.network) = self.codec.pcap_header.unpack_from(bytes, offset)
 
 
     def __iter__(self):
         me = collections.OrderedDict()
         me["raw_bytes    "] = binascii.hexlify(self.raw_bytes)
         me["magic_number "] = binascii.hexlify(self.magic_number)
-        me["version_major"] = binascii.hexlify(self.version_major)
-        me["version_minor"] = binascii.hexlify(self.version_minor)
-        me["thiszone     "] = binascii.hexlify(self.thiszone)
-        me["sigfigs      "] = binascii.hexlify(self.sigfigs)
-        me["snaplen      "] = binascii.hexlify(self.snaplen)
-        me["network      "] = binascii.hexlify(self.network)
+        me["version_major"] = self.version_major
+        me["version_minor"] = self.version_minor
+        me["thiszone     "] = self.thiszone
+        me["sigfigs      "] = self.sigfigs
+        me["snaplen      "] = self.snaplen
+        me["network      "] = self.network
         return me.iteritems()
 
 
     def flip_bytes(self, bytes):
         """ Flips the bytes from Little to Big Endian, if required.
         """
-        byte_list = list(bytes)
-        if binascii.hexlify(self.magic_number) in [MAGIC_SWAP, MAGIC_SWAP_NANO]:
-            byte_list.reverse()
-        return ''.join(byte_list)
+        if self.codec.swapped:
+            return str(bytes)[::-1]
+        return str(bytes)
 
 
     @property
     def raw_bytes(self):
-        return (self.magic_number                   + self.flip_bytes(self.version_major) +
-                self.flip_bytes(self.version_minor) + self.flip_bytes(self.thiszone     ) +
-                self.flip_bytes(self.sigfigs      ) + self.flip_bytes(self.snaplen      ) +
-                self.flip_bytes(self.network      ))
+        return self.codec.pcap_header.pack(self.codec.magic_number, self.version_major,
+                                           self.version_minor, self.thiszone, self.sigfigs,
+                                           self.snaplen, self.network)
 
 
 
@@ -0,0 +1,287 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+A persistent sidecar index of the records in a capture. For every packet it stores the file offset,
+``ts_sec``/``ts_usec``, ``incl_len`` and the IP protocol in flat :mod:`array` columns, so a single
+packet or a window of time can be found by seeking rather than by re-parsing the whole file.
+
+An index is rebuilt when its capture's size or modification time has changed, or when the capture no
+longer starts with the same global header and first record, so a capture rewritten at the same size
+is never read with the old offsets.
+"""
+
+##
+# Python Imports
+import os
+import zlib
+import array
+import struct
+
+##
+# Project Imports
+from codec          import UINT8
+from header_pcap    import HEADER_LENGTH_PCAP
+from header_packet  import HEADER_LENGTH_PACKET
+from packet         import Packet
+from decoders       import ip_header, ETHERTYPE_IPV4, ETHERTYPE_IPV6
+
+##
+# Error Handling
+from errors import GenericException
+class Index_Error(GenericException):
+    """ Errors relating to building, loading or searching a record index.
+    """
+    pass
+
+##
+# Global Variables
+INDEX_SUFFIX   = ".idx"
+INDEX_MAGIC    = "DECAPIDX"
+INDEX_VERSION  = 3
+# magic, version, item size of the offsets and of the "L" columns, record count, and the indexed
+# pcap's size, modification time (nanoseconds) and fingerprint
+INDEX_HEADER   = struct.Struct("<8sHHHQQqI")
+NO_PROTOCOL    = 0xff       # IANA reserved; used for records that are not IP
+PROTOCOL_AT    = {ETHERTYPE_IPV4: 9, ETHERTYPE_IPV6: 6}    # Offset of the protocol/next header
+
+# Offsets need 64 bits for captures over 4 GB, which "L" is not everywhere; "Q" is not in every
+# version of array, and where it is missing build() checks the capture fits in "L"
+try:
+    OFFSET_TYPECODE = array.array("Q").typecode
+except ValueError:
+    OFFSET_TYPECODE = "L"
+
+
+def index_path(pcap_path):
+    """ Returns the path of the sidecar index for ``pcap_path``.
+    """
+    return pcap_path + INDEX_SUFFIX
+
+
+def fingerprint(reader):
+    """ A CRC-32 of the capture's PCAP Global Header and first record, which tells a capture
+    rewritten at the same size from the one that was indexed.
+
+    :type reader: :class:`reader.PCAP_MMap_Reader`
+
+    :rtype: int
+    """
+    mmap = reader.mmap
+    end  = HEADER_LENGTH_PCAP
+    if len(mmap) >= HEADER_LENGTH_PCAP + HEADER_LENGTH_PACKET:
+        incl_len = reader.pcap_header.codec.packet_header.unpack_from(mmap, end)[2]
+        end      = min(end + HEADER_LENGTH_PACKET + incl_len, len(mmap))
+    return zlib.crc32(mmap[:end]) & 0xffffffff
+
+
+def modified_time(path):
+    """ The modification time of ``path`` in nanoseconds.
+
+    :rtype: int
+    """
+    return int(os.stat(path).st_mtime * 1e9)
+
+
+def parse_timestamp(value, nanosecond=False):
+    """ Converts a ``"<seconds>[.<fraction>]"`` string into ``(ts_sec, ts_usec)``, in the
+    resolution of the capture. The fraction is parsed as digits, so no precision is lost to floats.
+
+    .. example::
+
+        ``` python
+        parse_timestamp("1546646400.25")
+        >>> (1546646400, 250000)
+        ```
+    """
+    digits = 9 if nanosecond else 6
+    (seconds, _, fraction) = value.partition(".")
+    try:
+        return (int(seconds), int((fraction + "0" * digits)[:digits] or "0"))
+    except ValueError:
+        raise Index_Error("Expected a timestamp in seconds (e.g. 1546646400.25), received '" +
+                          value + "'")
+
+
+class Record_Index(object):
+    """ Column-oriented index of every record in a capture.
+
+    :type offsets: array.array
+    :ivar offsets: The file offset of each record's Packet Header.
+
+    :type ts_sec: array.array
+    :ivar ts_sec: Each record's ``ts_sec``.
+
+    :type ts_usec: array.array
+    :ivar ts_usec: Each record's ``ts_usec`` (nanoseconds for nanosecond-resolution captures).
+
+    :type incl_len: array.array
+    :ivar incl_len: Each record's ``incl_len``.
+
+    :type protocol: array.array
+    :ivar protocol: Each record's IP protocol number (IPv4) or next header (IPv6), or
+        ``NO_PROTOCOL`` for records that are not IP.
+
+    :ivar int pcap_size: The size of the indexed capture.
+    :ivar int pcap_mtime: The modification time of the indexed capture, in nanoseconds.
+    :ivar int fingerprint: The :func:`fingerprint` of the indexed capture.
+
+    The last three are compared with the capture's to detect a stale index.
+    """
+    def __init__(self, pcap_size=0, pcap_mtime=0, fingerprint=0):
+        self.offsets     = array.array(OFFSET_TYPECODE)
+        self.ts_sec      = array.array("L")
+        self.ts_usec     = array.array("L")
+        self.incl_len    = array.array("L")
+        self.protocol    = array.array("B")
+        self.pcap_size   = pcap_size
+        self.pcap_mtime  = pcap_mtime
+        self.fingerprint = fingerprint
+
+
+    def __len__(self):
+        return len(self.offsets)
+
+
+    @classmethod
+    def build(cls, reader, pcap_mtime=0):
+        """ Indexes every record of a memory-mapped capture.
+
+        :type reader: :class:`reader.PCAP_MMap_Reader`
+        :param int pcap_mtime: The capture's modification time (see :func:`modified_time`).
+        """
+        index   = cls(len(reader.mmap), pcap_mtime, fingerprint(reader))
+        mmap    = reader.mmap
+        unpack  = reader.pcap_header.codec.packet_header.unpack_from
+        network = reader.pcap_header.network
+        if index.pcap_size >> (8 * index.offsets.itemsize):
+            raise Index_Error("The capture is too large to index on this platform: " +
+                              str(index.pcap_size) + " bytes")
+        for offset in reader.iter_offsets():
+            (ts_sec, ts_usec, incl_len, _) = unpack(mmap, offset)
+            data_start             = offset + HEADER_LENGTH_PACKET
+            end                    = data_start + incl_len
+            (ip_start, ether_type) = ip_header(network, mmap, data_start, end)
+            protocol               = NO_PROTOCOL
+            if ether_type is not None and ip_start + PROTOCOL_AT[ether_type] < end:
+                (protocol,) = UINT8.unpack_from(mmap, ip_start + PROTOCOL_AT[ether_type])
+            index.offsets.append(offset)
+            index.ts_sec.append(ts_sec)
+            index.ts_usec.append(ts_usec)
+            index.incl_len.append(incl_len)
+            index.protocol.append(protocol)
+        return index
+
+
+    @classmethod
+    def load(cls, path):
+        """ Reads an index previously written by :meth:`save`.
+        """
+        with open(path, "rb") as file:
+            header = file.read(INDEX_HEADER.size)
+            if len(header) < INDEX_HEADER.size:
+                raise Index_Error("Truncated index header in " + path)
+            (magic, version, offset_size, item_size, count, pcap_size, pcap_mtime,
+             pcap_fingerprint) = INDEX_HEADER.unpack(header)
+            if magic != INDEX_MAGIC or version != INDEX_VERSION:
+                raise Index_Error("Not a version " + str(INDEX_VERSION) + " record index: " + path)
+            index = cls(pcap_size, pcap_mtime, pcap_fingerprint)
+            if (offset_size, item_size) != (index.offsets.itemsize, index.ts_sec.itemsize):
+                raise Index_Error("Index was written on a platform with " + str(offset_size) +
+                                  " byte offsets and " + str(item_size) + " byte integers: " +
+                                  path)
+            try:
+                for column in index.columns:
+                    column.fromfile(file, count)
+            except EOFError as error:
+                raise Index_Error("Truncated index " + path, [error])
+        return index
+
+
+    def save(self, path):
+        """ Writes the index to ``path``. The columns are written in native byte order.
+        """
+        with open(path, "wb") as file:
+            file.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, self.offsets.itemsize,
+                                         self.ts_sec.itemsize, len(self), self.pcap_size,
+                                         self.pcap_mtime, self.fingerprint))
+            for column in self.columns:
+                column.tofile(file)
+
+
+    @classmethod
+    def for_capture(cls, reader, pcap_path, rebuild=False):
+        """ Loads the sidecar index of ``pcap_path``, building and saving it first if it is missing,
+        stale or ``rebuild`` is set.
+
+        :type reader: :class:`reader.PCAP_MMap_Reader`
+        :param reader: An open reader over ``pcap_path``.
+        """
+        path       = index_path(pcap_path)
+        pcap_mtime = modified_time(pcap_path)
+        if not rebuild and os.path.exists(path):
+            try:
+                index = cls.load(path)
+                if (index.pcap_size == len(reader.mmap) and index.pcap_mtime == pcap_mtime and
+                        index.fingerprint == fingerprint(reader)):
+                    return index
+            except Index_Error:
+                pass
+        index = cls.build(reader, pcap_mtime)
+        index.save(path)
+        return index
+
+
+    @property
+    def columns(self):
+        return (self.offsets, self.ts_sec, self.ts_usec, self.incl_len, self.protocol)
+
+
+    ##
+    # Searching
+    def bisect_time(self, ts_sec, ts_usec=0):
+        """ Returns the position of the first record captured at or after ``ts_sec``/``ts_usec``.
+        Captures are expected to be in timestamp order, as written by capture tools.
+
+        :rtype: int
+        """
+        (low, high) = (0, len(self))
+        while low < high:
+            middle = (low + high) // 2
+            if (self.ts_sec[middle], self.ts_usec[middle]) < (ts_sec, ts_usec):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+
+    def time_range(self, start, end):
+        """ Finds the records captured within ``[start, end)``.
+
+        :type  start: (int, int)
+        :param start: ``(ts_sec, ts_usec)`` of the start of the window.
+
+        :type  end: (int, int)
+        :param end: ``(ts_sec, ts_usec)`` of the end of the window.
+
+        :rtype:   (int, int)
+        :returns: The ``[first, last)`` record positions within the window.
+        """
+        return (self.bisect_time(*start), self.bisect_time(*end))
+
+
+    def iter_packets(self, reader, first=0, last=None, packet_class=Packet, predicate=None):
+        """ Yields a :class:`~packet.Packet` (or ``packet_class``) for records ``first`` up to (not
+        including) ``last``, seeking straight to each one.
+
+        :type reader: :class:`reader.PCAP_MMap_Reader`
+
+        :param predicate: Called as ``predicate(reader.mmap, offset)`` before a record is parsed;
+            records it returns False for are skipped. None keeps every record.
+        """
+        if first < 0 or first > len(self):
+            raise Index_Error("Packet " + str(first) + " is out of range. The capture has " +
+                              str(len(self)) + " packets")
+        for offset in self.offsets[first:last]:
+            if predicate is None or predicate(reader.mmap, offset):
+                yield packet_class(reader.pcap_header, reader.mmap, offset)
@@ -13,10 +13,21 @@ import collections
 import struct
 import binascii
 
+##
+# Project Imports
+from codec import UINT8, UINT16, UINT32, UINT64
+
+##
+# Global Variables
+UNSIGNED_CODECS = {1: UINT8, 2: UINT16, 4: UINT32, 8: UINT64}
+
 
 def bytes_to_int(bytes):
     """ Converts the given ``binary string`` to a decimal integer.
     """
+    codec = UNSIGNED_CODECS.get(len(bytes))
+    if codec is not None:
+        return codec.unpack(bytes)[0]
     return int(binascii.hexlify(bytes), 16)
 
 
@@ -34,6 +45,13 @@ def int_into_bytes(integer, num_bytes):
     :rtype:   binary string
     :returns: The given integer as binary data.
     """
+    # Common widths are packed in one call by a precompiled struct
+    codec = UNSIGNED_CODECS.get(num_bytes)
+    if codec is not None:
+        try:
+            return codec.pack(integer)
+        except struct.error:
+            raise Exception("'" + str(integer) + " does not fit into " + str(num_bytes) + " bytes.")
     # int_to_bytes(85, 2) --> "0055"
     hex_str  = ("{:0" + str(num_bytes*2) + "x}").format(integer)
     # ["00", "55"]
@@ -45,3 +63,103 @@ def int_into_bytes(integer, num_bytes):
     for byte_string in hex_str_by_byte:
         bytes += struct.pack("B", int(byte_string, 16))
     return bytes
+
+
+def read_exactly(fileobj, num_bytes):
+    """ Reads exactly ``num_bytes`` from ``fileobj``, looping over short reads (pipes, sockets).
+
+    :rtype:   binary string
+    :returns: The bytes read. This will be shorter than ``num_bytes`` only if EOF was reached.
+    """
+    chunk = fileobj.read(num_bytes)
+    if len(chunk) == num_bytes or not chunk:
+        return chunk
+    chunks = [chunk]
+    remaining = num_bytes - len(chunk)
+    while remaining > 0:
+        chunk = fileobj.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return ''.join(chunks)
+
+
+def peek(fileobj, num_bytes):
+    """ Returns the first ``num_bytes`` of ``fileobj`` without consuming them. Buffered file objects
+    (``io.open``) are peeked and anything else seekable is read and seeked back. A pipe whose
+    buffer holds fewer bytes than asked for is read from instead, and the bytes are pushed back in
+    front of it with a :class:`Pushback_Reader`.
+
+    :rtype:   (**binary** string, file-like object)
+    :returns: The bytes, and the file object to read on from: ``fileobj``, or a
+        :class:`Pushback_Reader` around it.
+    """
+    if hasattr(fileobj, "peek"):
+        # peek() may return less than asked for (or more)
+        data = fileobj.peek(num_bytes)
+        if len(data) >= num_bytes or not data:
+            return (data[:num_bytes], fileobj)
+    seekable = getattr(fileobj, "seekable", None)
+    if hasattr(fileobj, "seek") and (seekable is None or seekable()):
+        position = fileobj.tell()
+        data     = read_exactly(fileobj, num_bytes)
+        fileobj.seek(position)
+        return (data, fileobj)
+    data = read_exactly(fileobj, num_bytes)
+    return (data, Pushback_Reader(fileobj, data))
+
+
+class Pushback_Reader(object):
+    """ A read-only binary file object that returns ``data`` before reading on from ``fileobj``,
+    for bytes read ahead from a stream that cannot seek back. Anything other than ``read()`` and
+    ``peek()`` is passed through to ``fileobj``.
+    """
+    def __init__(self, fileobj, data):
+        self.fileobj = fileobj
+        self.pending = data
+
+
+    def __getattr__(self, name):
+        return getattr(self.fileobj, name)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.fileobj.close()
+
+
+    def peek(self, num_bytes=1):
+        if len(self.pending) < num_bytes:
+            self.pending += read_exactly(self.fileobj, num_bytes - len(self.pending))
+        return self.pending[:num_bytes]
+
+
+    def read(self, num_bytes=-1):
+        if not self.pending:
+            return self.fileobj.read(num_bytes)
+        if num_bytes is None or num_bytes < 0:
+            (data, self.pending) = (self.pending, "")
+            return data + self.fileobj.read()
+        (data, self.pending) = (self.pending[:num_bytes], self.pending[num_bytes:])
+        if len(data) < num_bytes:
+            data += self.fileobj.read(num_bytes - len(data))
+        return data
+
+
+def internet_checksum(bytes):
+    """ Computes the RFC 1071 ones' complement checksum of ``bytes`` (e.g. an IPv4 header with its
+    checksum field zeroed).
+
+    :rtype: int
+    """
+    bytes = str(bytes)
+    if len(bytes) % 2:
+        bytes += "\x00"
+    total = sum(struct.unpack("!%dH" % (len(bytes) // 2), bytes))
+    while total >> 16:
+        total = (total & 0xffff) + (total >> 16)
+    return ~total & 0xffff
@@ -0,0 +1,209 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+An optional, batched decapsulation engine built on NumPy. The fields decapsulation depends on are
+gathered for a whole chunk of records into one structured array, validated with vectorized masks,
+and every new Packet Header is computed in one shot. The only per-packet Python work left is
+handing the Ethernet Frame and payload slices to the writer.
+
+The vectorized path covers ICMP tunnels over untagged Ethernet. Any other record is handed to
+:class:`~packet_tunnel.Tunnel_Packet` and the full decoder registry, so the output always matches
+the streaming path.
+
+Requires ``numpy``; everything else in this package works without it.
+"""
+
+##
+# Python Imports
+import itertools
+
+##
+# Project Imports
+from header_packet  import HEADER_LENGTH_PACKET
+from frame_ethernet import FRAME_LENGTH_ETHERNET, ETHERTYPE_IPV4
+from frame_internet import FRAME_LENGTH_INTERNET, VER_HEAD_LEN_IPV4
+from frame_protocol import PROTO_ICMP, FRAME_LENGTH_ICMP
+from packet_tunnel  import Tunnel_Packet
+from decoders       import DEFAULT_DEPTH, LINKTYPE_ETHERNET, IPV4_FRAGMENT
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+##
+# Error Handling
+from errors import GenericException
+class NumPy_Engine_Error(GenericException):
+    """ Errors relating to the batched NumPy engine.
+    """
+    pass
+
+##
+# Global Variables
+DEFAULT_BATCH_SIZE = 65536
+ETHERNET_OFFSET    = HEADER_LENGTH_PACKET
+PAYLOAD_OFFSET     = (HEADER_LENGTH_PACKET + FRAME_LENGTH_ETHERNET + FRAME_LENGTH_INTERNET +
+                      FRAME_LENGTH_ICMP)
+MINIMUM_INCL_LEN   = FRAME_LENGTH_ETHERNET + FRAME_LENGTH_INTERNET + FRAME_LENGTH_ICMP
+
+
+def record_dtype(byte_order):
+    """ The structured dtype of the first 50 bytes of a record: the Packet Header (in the capture's
+    byte order), the Ethernet Frame and the IPv4 header (network byte order). Fields decapsulation
+    does not need are left as opaque padding.
+    """
+    return numpy.dtype([("ts_sec",       byte_order + "u4"),
+                        ("ts_usec",      byte_order + "u4"),
+                        ("incl_len",     byte_order + "u4"),
+                        ("orig_len",     byte_order + "u4"),
+                        ("macs",         "V12"),
+                        ("type",         ">u2"),
+                        ("ver_head_len", "u1"),
+                        ("diff_serv",    "V1"),
+                        ("total_len",    ">u2"),
+                        ("ident",        "V2"),
+                        ("flags",        ">u2"),
+                        ("ttl",          "V1"),
+                        ("protocol",     "u1"),
+                        ("check_ips",    "V10")])
+
+
+def header_dtype(byte_order):
+    """ The structured dtype of a Packet Header, in the capture's byte order.
+    """
+    return numpy.dtype([("ts_sec",   byte_order + "u4"),
+                        ("ts_usec",  byte_order + "u4"),
+                        ("incl_len", byte_order + "u4"),
+                        ("orig_len", byte_order + "u4")])
+
+
+class NumPy_Decapsulator(object):
+    """ Decapsulates a memory-mapped capture in batches of ``batch_size`` records. The output is
+    byte-for-byte identical to decapsulating each :class:`~packet_tunnel.Tunnel_Packet` in turn.
+
+    :type reader: :class:`reader.PCAP_MMap_Reader`
+    :ivar reader: The capture being decapsulated.
+
+    :type batch_size: int
+    :ivar batch_size: The number of records decoded per batch.
+
+    :type depth: int
+    :ivar depth: The most tunnels peeled off per packet (see :meth:`decoders.Decoder_Registry
+        .decapsulate`). Beyond 1, a packet whose ICMP payload is itself a tunnel is handed to
+        :class:`~packet_tunnel.Tunnel_Packet`.
+    """
+    def __init__(self, reader, batch_size=DEFAULT_BATCH_SIZE, depth=DEFAULT_DEPTH):
+        if numpy is None:
+            raise NumPy_Engine_Error("The batched engine requires numpy (pip install numpy)")
+        self.reader        = reader
+        self.batch_size    = batch_size
+        self.depth         = depth
+        self.buffer        = numpy.frombuffer(reader.mmap, dtype=numpy.uint8)
+        byte_order         = reader.pcap_header.codec.byte_order
+        self.record_dtype  = record_dtype(byte_order)
+        self.header_dtype  = header_dtype(byte_order)
+        self.record_window = numpy.arange(self.record_dtype.itemsize)
+
+
+    def iter_batches(self, offsets=None):
+        """ Yields arrays of up to ``batch_size`` record offsets.
+
+        :param offsets: Record offsets to use instead of scanning the capture (e.g. the ``offsets``
+            column of a :class:`index.Record_Index`).
+        """
+        if offsets is None:
+            offsets = self.reader.iter_offsets()
+        offsets = iter(offsets)
+        while True:
+            batch = numpy.fromiter(itertools.islice(offsets, self.batch_size), dtype=numpy.int64)
+            if not len(batch):
+                return
+            yield batch
+
+
+    def decode(self, offsets):
+        """ Gathers the first 50 bytes of every record in ``offsets`` into a structured array.
+        Bytes past the end of the capture are read as the final byte; such records are always
+        rejected by :meth:`valid` because of their ``incl_len``.
+        """
+        positions = offsets[:, None] + self.record_window
+        numpy.minimum(positions, len(self.buffer) - 1, out=positions)
+        return self.buffer[positions].view(self.record_dtype).ravel()
+
+
+    def valid(self, records):
+        """ Finds the records the vectorized path can decapsulate: sane Packet Headers around whole
+        (unfragmented) ICMP datagrams with a complete ICMP header, over untagged Ethernet.
+
+        :rtype:   numpy.ndarray of bool
+        """
+        if self.reader.pcap_header.network != LINKTYPE_ETHERNET:
+            return numpy.zeros(len(records), dtype=bool)
+        incl_len = records["incl_len"]
+        return ((incl_len <= records["orig_len"]) &
+                (incl_len <= self.reader.pcap_header.snaplen) &
+                (incl_len >= MINIMUM_INCL_LEN) &
+                (records["type"] == ETHERTYPE_IPV4) &
+                (records["ver_head_len"] == VER_HEAD_LEN_IPV4) &
+                (records["total_len"] >= FRAME_LENGTH_INTERNET + FRAME_LENGTH_ICMP) &
+                (records["flags"] & IPV4_FRAGMENT == 0) &
+                (records["protocol"] == PROTO_ICMP))
+
+
+    def decapsulate_batch(self, offsets):
+        """ Computes the decapsulated form of every record in ``offsets``. The headers and lengths
+        of records the vectorized path cannot handle are meaningless.
+
+        :rtype:   (**binary** string, list of int, list of bool)
+        :returns: The new Packet Headers for the whole batch, concatenated, each record's payload
+            length, and whether each record was handled (see :meth:`valid`).
+        """
+        records = self.decode(offsets)
+        valid   = self.valid(records)
+        # Mirrors decoders.decode_icmp: the payload ends at total_len or at the end of the record
+        ip_length      = numpy.minimum(records["total_len"].astype(numpy.int64),
+                                       records["incl_len"].astype(numpy.int64) -
+                                       FRAME_LENGTH_ETHERNET)
+        payload_length = numpy.maximum(ip_length - FRAME_LENGTH_INTERNET - FRAME_LENGTH_ICMP, 0)
+        headers             = numpy.empty(len(records), dtype=self.header_dtype)
+        headers["ts_sec"]   = records["ts_sec"]
+        headers["ts_usec"]  = records["ts_usec"]
+        headers["incl_len"] = payload_length + FRAME_LENGTH_ETHERNET
+        headers["orig_len"] = headers["incl_len"]
+        return (headers.tostring(), payload_length.tolist(), valid.tolist())
+
+
+    def write(self, writer, offsets=None):
+        """ Decapsulates the whole capture (or just ``offsets``) into ``writer``.
+
+        :type writer: :class:`writer.PCAP_Writer`
+
+        :rtype:   int
+        :returns: The number of packets written.
+        """
+        mmap        = self.reader.mmap
+        pcap_header = self.reader.pcap_header
+        nested      = self.depth != 1
+        registry    = Tunnel_Packet.registry
+        count       = 0
+        for batch in self.iter_batches(offsets):
+            (headers, payload_lengths, valid) = self.decapsulate_batch(batch)
+            header_start = 0
+            for (offset, payload_length, ok) in itertools.izip(batch.tolist(), payload_lengths,
+                                                               valid):
+                payload_offset = offset + PAYLOAD_OFFSET
+                if ok and nested:
+                    ok = registry.decode_ether_type(ETHERTYPE_IPV4, mmap, payload_offset,
+                                                    payload_offset + payload_length) is None
+                if ok:
+                    writer.write_record(
+                        buffer(headers, header_start, HEADER_LENGTH_PACKET),
+                        buffer(mmap, offset + ETHERNET_OFFSET, FRAME_LENGTH_ETHERNET),
+                        buffer(mmap, payload_offset, payload_length))
+                else:
+                    writer.write_packet(Tunnel_Packet(pcap_header, mmap, offset, self.depth))
+                header_start += HEADER_LENGTH_PACKET
+            count += len(batch)
+        return count
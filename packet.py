@@ -30,8 +30,8 @@ class Packet_Error(GenericException):
 class Packet(object):
     """ Abstracts the handling of a LibPCAP packet for easier manipulation.
 
-    :type bytes: **Binary String**
-    :ivar bytes: The original Raw_Bytes that apply to this packet.
+    :type bytes: ``buffer``
+    :ivar bytes: A read-only view of the original Raw_Bytes that apply to this packet.
 
     :type header: :class:`header_packet.Packet_Header`
     :ivar header: The packet header (defined in LibPCAP) that precedes this packet.
@@ -60,13 +60,24 @@ class Packet(object):
         return (obj, bytes[obj.packet_header.length + obj.length:],)
 
 
-    def __init__(self, pcap_header, raw_bytes):
-        # Build the frames out
-        (self.packet_header, bytes) = Packet_Header.parse_Packet_Header(pcap_header, raw_bytes)
-        (self.ethernet,      bytes) = Ethernet_Frame.parse_Ethernet_Frame(bytes)
-        (self.internet,      bytes) = Internet_Frame.parse_Internet_Frame(bytes)
-        (self.protocol,      bytes) = Protocol_Frame.parse_Protocol_Frame(self.internet, bytes)
-        self.bytes                  = raw_bytes[:self.packet_header.length + self.length]
+    def __init__(self, pcap_header, raw_bytes, offset=0):
+        """
+        :param pcap_header: The :class:`header_pcap.PCAP_Header` of the capture.
+        :param raw_bytes:   A **binary** string, or any buffer (such as an ``mmap``), holding the
+            record.
+        :param offset:      The position of the record's Packet Header within ``raw_bytes``.
+        """
+        # Build the frames out, walking an offset through ``raw_bytes`` rather than slicing it
+        start              = offset
+        self.packet_header = Packet_Header(pcap_header, raw_bytes, offset)
+        offset            += self.packet_header.length
+        record_end         = offset + self.packet_header.incl_len
+        self.ethernet      = Ethernet_Frame(raw_bytes, offset)
+        offset            += self.ethernet.length
+        self.internet      = Internet_Frame(raw_bytes, offset)
+        offset            += self.internet.length
+        self.protocol      = Protocol_Frame(self.internet, raw_bytes, offset, record_end)
+        self.bytes         = buffer(raw_bytes, start, self.total_length)
 
 
     def __str__(self):
@@ -84,15 +95,24 @@ class Packet(object):
         :rtype:   **Binary** string
         :returns: The binary string for the decapsulated packet.
         """
-        decap_bytes  = self.packet_header.decapsulate(self.decap_length)
-        decap_bytes += self.ethernet.raw_bytes
-        decap_bytes += self.protocol.payload
-        return decap_bytes
+        return ''.join([str(part) for part in self.decapsulate_parts()])
+
+
+    def decapsulate_parts(self):
+        """ The same as :meth:`decapsulate`, but without joining the pieces of the new record
+        together, so they can be written out without an intermediate copy.
+
+        :rtype:   (**binary** string, **binary** string, ``buffer``)
+        :returns: The new Packet Header, the Ethernet Frame and a view of the Protocol's payload.
+        """
+        return (self.packet_header.decapsulate(self.decap_length),
+                self.ethernet.raw_bytes,
+                self.protocol.payload)
 
 
     @property
     def length(self):
-        return self.ethernet.length + int(binascii.hexlify(self.internet.total_len), 16)
+        return self.ethernet.length + self.internet.total_len
     @property
     def total_length(self):
         return self.packet_header.length + self.length
@@ -0,0 +1,110 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+"""
+
+##
+# Python Imports
+
+##
+# Project Imports
+from header_packet import Packet_Header
+from decoders      import REGISTRY, DEFAULT_DEPTH
+
+##
+# Global Variables
+
+
+class Tunnel_Packet(object):
+    """ A record decapsulated through a :class:`~decoders.Decoder_Registry`, rather than the fixed
+    Ethernet/IPv4/ICMP frames of :class:`~packet.Packet`. Any tunnel the registry knows is
+    decapsulated; anything else is passed through unchanged instead of raising, so a capture that
+    mixes tunnels with other traffic can be handled in one pass.
+
+    Tunnel packets can be used wherever a :class:`~packet.Packet` is written out (they have the same
+    constructor, ``packet_header``, ``decapsulate()`` and ``decapsulate_parts()``), and give the
+    same output for the ICMP tunnels :class:`~packet.Packet` handles.
+
+    Nested tunnels are peeled off in the same pass, up to ``depth`` of them, and the Packet Header
+    lengths are only rewritten once, for the innermost packet. Pass ``depth`` through
+    ``functools.partial`` where a reader expects a ``packet_class``.
+
+    :type registry: :class:`decoders.Decoder_Registry`
+    :cvar registry: The decoders used. Override it in a subclass to add or replace decoders.
+
+    :type packet_header: :class:`header_packet.Packet_Header`
+    :ivar packet_header: The packet header (defined in LibPCAP) that precedes this packet.
+
+    :type bytes: ``buffer``
+    :ivar bytes: A read-only view of the whole record.
+
+    :type data: ``buffer``
+    :ivar data: A read-only view of the packet data that follows the Packet Header.
+
+    :type tunnel: (**binary** string, ``buffer``) or None
+    :ivar tunnel: The link-layer header and tunnelled packet that replace the packet data, or None
+        if the packet is passed through.
+
+    :type layers: int
+    :ivar layers: The number of tunnels peeled off.
+    """
+    registry = REGISTRY
+
+
+    def __init__(self, pcap_header, raw_bytes, offset=0, depth=DEFAULT_DEPTH):
+        """
+        :param depth: The most tunnels to peel off; 0 peels off every tunnel the registry knows.
+        """
+        self.packet_header = Packet_Header(pcap_header, raw_bytes, offset)
+        start              = offset + self.packet_header.length
+        end                = min(start + self.packet_header.incl_len, len(raw_bytes))
+        self.bytes         = buffer(raw_bytes, offset, end - offset)
+        self.data          = buffer(raw_bytes, start, end - start)
+        self.tunnel        = None
+        self.layers        = 0
+        decapsulated       = self.registry.decapsulate(pcap_header.network, raw_bytes, start, end,
+                                                       depth)
+        if decapsulated is not None:
+            self.tunnel = decapsulated[:2]
+            self.layers = decapsulated[2]
+
+
+    def decapsulate(self):
+        """ Returns the decapsulated record, or the original record if the packet is not a tunnel.
+
+        :rtype: **Binary** string
+        """
+        return ''.join([str(part) for part in self.decapsulate_parts()])
+
+
+    def decapsulate_parts(self):
+        """ The same as :meth:`decapsulate`, but without joining the pieces of the new record
+        together.
+
+        :rtype:   tuple of **binary** strings and ``buffer`` objects
+        :returns: The new Packet Header, the link-layer header and a view of the tunnelled packet,
+            or the original Packet Header and packet data.
+        """
+        if self.tunnel is None:
+            return (self.packet_header.bytes, self.data)
+        (link_header, payload) = self.tunnel
+        return (self.packet_header.decapsulate(len(link_header) + len(payload)), link_header,
+                payload)
+
+
+    @property
+    def decapsulated(self):
+        """ True if the packet is a tunnel that is being decapsulated.
+        """
+        return self.tunnel is not None
+    @property
+    def length(self):
+        return len(self.data)
+    @property
+    def total_length(self):
+        return len(self.bytes)
+    @property
+    def decap_length(self):
+        if self.tunnel is None:
+            return len(self.data)
+        return len(self.tunnel[0]) + len(self.tunnel[1])
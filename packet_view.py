@@ -0,0 +1,207 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+A lazily decoded, ``__slots__`` stand-in for :class:`~packet.Packet`, for holding millions of
+records in memory. Like :class:`~packet.Packet` it only understands ICMP tunnels over IPv4 with a
+20-byte header on Ethernet; every other record raises as :class:`~packet.Packet` would. It does not
+use the :class:`~decoders.Decoder_Registry`, so UDP, GRE, IP-in-IP and VXLAN tunnels and nested
+tunnels need :class:`~packet_tunnel.Tunnel_Packet`.
+"""
+
+##
+# Python Imports
+
+##
+# Project Imports
+from codec          import FRAME_SUMMARY
+from header_packet  import Packet_Header, Packet_Header_Error, HEADER_LENGTH_PACKET
+from frame_ethernet import Ethernet_Frame, Ethernet_Error, FRAME_LENGTH_ETHERNET, ETHERTYPE_IPV4
+from frame_internet import (Internet_Frame, Internet_Frame_Error, FRAME_LENGTH_INTERNET,
+                            VER_HEAD_LEN_IPV4)
+from frame_protocol import Protocol_Frame, Protocol_Frame_Error, PROTO_ICMP, FRAME_LENGTH_ICMP
+from packet         import Packet
+
+##
+# Global Variables
+# Offsets within a record, relative to the start of its Packet Header
+SUMMARY_OFFSET = HEADER_LENGTH_PACKET + 12
+PAYLOAD_OFFSET = HEADER_LENGTH_PACKET + FRAME_LENGTH_ETHERNET + FRAME_LENGTH_INTERNET + \
+                 FRAME_LENGTH_ICMP
+
+
+class Packet_View(object):
+    """ A compact, lazily decoded stand-in for :class:`~packet.Packet`. A view only stores where its
+    record starts; each field is decoded on first access and cached, and the frame objects are only
+    built if something asks for them. Decapsulating a view never builds a frame object at all.
+
+    The attribute names of :class:`~packet.Packet` (``packet_header``, ``ethernet``,
+    ``internet``, ``protocol``, ``bytes``, ``length``, ...) are all available as properties, so a
+    view can be used anywhere a :class:`~packet.Packet` is expected. It is limited to ICMP over
+    IPv4 on Ethernet, as :class:`~packet.Packet` is: :attr:`summary` raises for anything else.
+
+    .. Note::
+        A view keeps a reference to ``raw_bytes`` rather than copying out of it. Views over an
+        ``mmap`` must not be used after the map is closed.
+
+    :type pcap_header: :class:`header_pcap.PCAP_Header`
+    :ivar pcap_header: The PCAP Global Header of the capture.
+
+    :ivar raw_bytes: The **binary** string, or buffer (such as an ``mmap``), holding the record.
+
+    :type offset: int
+    :ivar offset: The position of the record's Packet Header within ``raw_bytes``.
+    """
+    __slots__ = ("pcap_header", "raw_bytes", "offset", "_record", "_summary", "_packet_header",
+                 "_ethernet", "_internet", "_protocol")
+
+
+    def __init__(self, pcap_header, raw_bytes, offset=0):
+        self.pcap_header    = pcap_header
+        self.raw_bytes      = raw_bytes
+        self.offset         = offset
+        self._record        = None
+        self._summary       = None
+        self._packet_header = None
+        self._ethernet      = None
+        self._internet      = None
+        self._protocol      = None
+
+
+    def __str__(self):
+        return str(Packet(self.pcap_header, self.raw_bytes, self.offset))
+
+
+    ##
+    # Decoding
+    @property
+    def record(self):
+        """ The decoded Packet Header fields.
+
+        :rtype: (ts_sec, ts_usec, incl_len, orig_len)
+        """
+        if self._record is None:
+            if len(self.raw_bytes) - self.offset < HEADER_LENGTH_PACKET:
+                raise Packet_Header_Error("Expected at least " + str(HEADER_LENGTH_PACKET) +
+                                          " bytes. Received " +
+                                          str(len(self.raw_bytes) - self.offset) + " bytes")
+            record = self.pcap_header.codec.packet_header.unpack_from(self.raw_bytes, self.offset)
+            if record[2] > record[3]:
+                raise Packet_Header_Error("Packet length cannot be greater than the original " +
+                                          "length")
+            if record[2] > self.pcap_header.snaplen:
+                raise Packet_Header_Error("Packet length cannot be greater than snaplen")
+            self._record = record
+        return self._record
+
+
+    @property
+    def summary(self):
+        """ The decoded Ethernet type, IPv4 ver_head_len, total_len and protocol. These are
+        validated the same way the frame objects validate them.
+
+        :rtype: (type, ver_head_len, total_len, protocol)
+        """
+        if self._summary is None:
+            incl_len = self.record[2]
+            if incl_len < FRAME_LENGTH_ETHERNET:
+                raise Ethernet_Error("Expected at least " + str(FRAME_LENGTH_ETHERNET) +
+                                     " bytes. Received " + str(incl_len) + " bytes")
+            if incl_len < FRAME_LENGTH_ETHERNET + FRAME_LENGTH_INTERNET:
+                raise Internet_Frame_Error("Expected at least 20 bytes, received " +
+                                           str(incl_len - FRAME_LENGTH_ETHERNET) + " bytes.")
+            summary = FRAME_SUMMARY.unpack_from(self.raw_bytes, self.offset + SUMMARY_OFFSET)
+            if summary[0] != ETHERTYPE_IPV4:
+                raise Ethernet_Error("IPv4 Packets ONLY (type = 0x0800)", ["%04x" % summary[0]])
+            if summary[1] != VER_HEAD_LEN_IPV4:
+                raise Internet_Frame_Error("IPv4 20-byte headers only (0x45)",
+                                           ["%02x" % summary[1]])
+            if summary[3] != PROTO_ICMP:
+                raise Protocol_Frame_Error("Only ICMP is implemented")
+            self._summary = summary
+        return self._summary
+
+
+    @property
+    def ts_sec(self):
+        return self.record[0]
+    @property
+    def ts_usec(self):
+        return self.record[1]
+    @property
+    def incl_len(self):
+        return self.record[2]
+    @property
+    def orig_len(self):
+        return self.record[3]
+
+
+    ##
+    # Packet Attributes
+    @property
+    def packet_header(self):
+        if self._packet_header is None:
+            self._packet_header = Packet_Header(self.pcap_header, self.raw_bytes, self.offset)
+        return self._packet_header
+    @property
+    def ethernet(self):
+        if self._ethernet is None:
+            self._ethernet = Ethernet_Frame(self.raw_bytes, self.offset + HEADER_LENGTH_PACKET)
+        return self._ethernet
+    @property
+    def internet(self):
+        if self._internet is None:
+            self._internet = Internet_Frame(self.raw_bytes, self.offset + HEADER_LENGTH_PACKET +
+                                                            FRAME_LENGTH_ETHERNET)
+        return self._internet
+    @property
+    def protocol(self):
+        if self._protocol is None:
+            self._protocol = Protocol_Frame(self.internet, self.raw_bytes,
+                                            self.offset + PAYLOAD_OFFSET - FRAME_LENGTH_ICMP,
+                                            self.record_end)
+        return self._protocol
+    @property
+    def bytes(self):
+        return buffer(self.raw_bytes, self.offset, self.total_length)
+
+
+    @property
+    def record_end(self):
+        return self.offset + HEADER_LENGTH_PACKET + self.record[2]
+    @property
+    def length(self):
+        return FRAME_LENGTH_ETHERNET + self.summary[2]
+    @property
+    def total_length(self):
+        return HEADER_LENGTH_PACKET + self.length
+    @property
+    def payload_length(self):
+        payload_start = self.offset + PAYLOAD_OFFSET
+        payload_end   = min(payload_start - FRAME_LENGTH_ICMP + self.summary[2] -
+                            FRAME_LENGTH_INTERNET, self.record_end)
+        return max(payload_end - payload_start, 0)
+    @property
+    def decap_length(self):
+        return FRAME_LENGTH_ETHERNET + self.payload_length
+
+
+    ##
+    # Decapsulation
+    def decapsulate(self):
+        """ See :meth:`packet.Packet.decapsulate`.
+        """
+        return ''.join([str(part) for part in self.decapsulate_parts()])
+
+
+    def decapsulate_parts(self):
+        """ See :meth:`packet.Packet.decapsulate_parts`. Only the Packet Header and the four fields
+        in :attr:`summary` are decoded; no frame objects are built.
+        """
+        (ts_sec, ts_usec, _, _) = self.record
+        decap_length            = self.decap_length
+        ethernet_start          = self.offset + HEADER_LENGTH_PACKET
+        return (self.pcap_header.codec.packet_header.pack(ts_sec, ts_usec, decap_length,
+                                                          decap_length),
+                buffer(self.raw_bytes, ethernet_start, FRAME_LENGTH_ETHERNET),
+                buffer(self.raw_bytes, self.offset + PAYLOAD_OFFSET, self.payload_length))
@@ -0,0 +1,134 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+Decapsulates a single capture across several processes. A cheap pass over the Packet Headers finds
+the record boundaries, the file is split into shards of whole records, each shard is decapsulated
+by a worker, and the shard outputs are merged back in their original order behind one PCAP Global
+Header. pcapng shard outputs are concatenated as they are, each one a section of the merged file.
+The merged output is compressed as it is written if its extension asks for it.
+"""
+
+##
+# Python Imports
+import os
+import shutil
+import tempfile
+import multiprocessing
+
+##
+# Project Imports
+from header_pcap   import HEADER_LENGTH_PCAP
+from reader        import PCAP_MMap_Reader
+from writer        import PCAP_Writer
+from compression   import open_output
+from packet_tunnel import Tunnel_Packet
+from decoders      import DEFAULT_DEPTH
+
+##
+# Error Handling
+from errors import GenericException
+class Parallel_Error(GenericException):
+    """ Errors relating to parallel decapsulation.
+    """
+    pass
+
+##
+# Global Variables
+SHARDS_PER_JOB   = 4                    # More shards than workers evens out uneven shards
+MIN_SHARD_LENGTH = 4 * 1024 * 1024      # Not worth a worker below this many bytes
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def plan_shards(reader, num_shards, min_shard_length=MIN_SHARD_LENGTH):
+    """ Splits the records of ``reader`` into at most ``num_shards`` contiguous, roughly equally
+    sized byte ranges. Every range starts and ends on a record boundary.
+
+    :type reader: :class:`reader.PCAP_MMap_Reader`
+
+    :rtype:   list of (int, int)
+    :returns: ``(start, end)`` offsets of each shard, in file order.
+    """
+    size         = len(reader.mmap)
+    shard_length = max((size - HEADER_LENGTH_PCAP) // max(num_shards, 1), min_shard_length, 1)
+    shards       = []
+    start        = HEADER_LENGTH_PCAP
+    for offset in reader.iter_offsets():
+        if offset - start >= shard_length:
+            shards.append((start, offset))
+            start = offset
+    if start < size:
+        shards.append((start, size))
+    return shards
+
+
+def decapsulate_shard(args):
+    """ Worker: decapsulates the records between ``start`` and ``end`` of ``in_path`` into a
+    complete PCAP file at ``out_path``.
+
+    :type  args: (str, int, int, str, int, class)
+    :param args: ``(in_path, start, end, out_path, depth, writer_class)``, packed into one tuple
+        for ``Pool.imap``.
+
+    :rtype:   (str, int)
+    :returns: ``out_path`` and the number of packets written.
+    """
+    (in_path, start, end, out_path, depth, writer_class) = args
+    with open(in_path, "rb") as in_file:
+        with PCAP_MMap_Reader(in_file) as reader:
+            with open(out_path, "wb") as out_file:
+                with writer_class(out_file, reader.pcap_header) as writer:
+                    for offset in reader.iter_offsets(start, end):
+                        writer.write_packet(Tunnel_Packet(reader.pcap_header, reader.mmap, offset,
+                                                          depth))
+    return (out_path, writer.packet_count)
+
+
+def decapsulate_parallel(in_path, out_path, jobs, shards_per_job=SHARDS_PER_JOB,
+                         depth=DEFAULT_DEPTH, writer_class=PCAP_Writer, threaded=False):
+    """ Decapsulates ``in_path`` into ``out_path`` using ``jobs`` worker processes, peeling off up
+    to ``depth`` tunnels per packet. Classic pcap output is byte-for-byte identical to a single
+    process run.
+
+    :param writer_class: :class:`~writer.PCAP_Writer` or :class:`~pcapng.PCAPNG_Writer`.
+    :param threaded:     Compress the output in a background thread.
+
+    :rtype:   int
+    :returns: The number of packets written.
+    """
+    if jobs < 1:
+        raise Parallel_Error("jobs must be at least 1, received " + str(jobs))
+    with open(in_path, "rb") as in_file:
+        with PCAP_MMap_Reader(in_file) as reader:
+            pcap_header = reader.pcap_header
+            shards      = plan_shards(reader, jobs * shards_per_job)
+    # Shard outputs live next to the final output, so the merge never crosses file systems
+    shard_dir = tempfile.mkdtemp(prefix=".decap_shards_",
+                                 dir=os.path.dirname(os.path.abspath(out_path)))
+    try:
+        tasks = [(in_path, start, end, os.path.join(shard_dir, "%06d.pcap" % index), depth,
+                  writer_class) for (index, (start, end)) in enumerate(shards)]
+        # pcapng has no global header to strip: every shard is a section of its own
+        skip  = HEADER_LENGTH_PCAP if writer_class is PCAP_Writer else 0
+        pool  = multiprocessing.Pool(min(jobs, max(len(tasks), 1)))
+        try:
+            packet_count = 0
+            with open_output(out_path, threaded) as out_file:
+                if skip:
+                    out_file.write(pcap_header.raw_bytes)
+                # imap hands results back in task order, so shards are merged as they finish
+                for (shard_path, shard_count) in pool.imap(decapsulate_shard, tasks):
+                    with open(shard_path, "rb") as shard_file:
+                        shard_file.seek(skip)
+                        shutil.copyfileobj(shard_file, out_file, COPY_BUFFER_SIZE)
+                    os.remove(shard_path)
+                    packet_count += shard_count
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    finally:
+        shutil.rmtree(shard_dir, ignore_errors=True)
+    return packet_count
@@ -0,0 +1,374 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+:ref:    https://www.ietf.org/archive/id/draft-ietf-opsawg-pcapng-02.html
+
+Streams pcapng captures straight into the decapsulation pipeline, and writes pcapng back out.
+
+Each Interface Description Block is presented as a :class:`PCAPNG_Interface`, a
+:class:`~header_pcap.PCAP_Header` describing that interface, and each Enhanced/Simple Packet
+Block is re-framed as a classic LibPCAP record for it. Everything downstream (``Packet``,
+``PCAP_Writer``, ...) therefore works on pcapng input unchanged, in a single read pass.
+"""
+
+##
+# Python Imports
+import struct
+
+##
+# Project Imports
+from lib         import read_exactly
+from header_pcap import PCAP_Header
+from writer      import PCAP_Writer, DEFAULT_FLUSH_SIZE
+from packet      import Packet
+
+##
+# Error Handling
+from errors import GenericException
+class PCAPNG_Error(GenericException):
+    """ Errors relating to reading or writing pcapng.
+    """
+    pass
+
+##
+# Global Variables
+BLOCK_SHB           = 0x0A0D0D0A    # Section Header Block
+BLOCK_IDB           = 0x00000001    # Interface Description Block
+BLOCK_SPB           = 0x00000003    # Simple Packet Block
+BLOCK_EPB           = 0x00000006    # Enhanced Packet Block
+BYTE_ORDER_MAGIC    = 0x1A2B3C4D
+SHB_MAGIC           = "\x0a\x0d\x0d\x0a"
+OPTION_END          = 0
+OPTION_IF_TSRESOL   = 9
+DEFAULT_TSRESOL     = 6             # Microseconds
+DEFAULT_SNAPLEN     = 262144        # Used when an interface reports "no limit" (0)
+MICRO_PER_SECOND    = 10 ** 6
+NANO_PER_SECOND     = 10 ** 9
+BLOCK_HEADER_LENGTH = 8
+BLOCK_FOOTER_LENGTH = 4
+
+# Block layouts, without the byte order character (which is chosen per section)
+FORMAT_BLOCK_HEADER = "II"          # type, total length
+FORMAT_SHB          = "IHHq"        # byte order magic, major, minor, section length
+FORMAT_IDB          = "HHI"         # link type, reserved, snaplen
+FORMAT_EPB          = "IIIII"       # interface id, timestamp high/low, cap_len, orig_len
+FORMAT_SPB          = "I"           # orig_len
+FORMAT_OPTION       = "HH"          # code, length
+
+
+def padding(length):
+    """ The number of bytes needed to pad ``length`` to a 32-bit boundary.
+    """
+    return -length % 4
+
+
+class PCAPNG_Interface(PCAP_Header):
+    """ A pcapng interface, described as the classic PCAP Global Header its packets are re-framed
+    under. Interfaces with a microsecond ``if_tsresol`` map to a microsecond header, and every
+    other resolution to a nanosecond header.
+
+    :type interface_id: int
+    :ivar interface_id: The interface's position within its section.
+
+    :type section: int
+    :ivar section: The position of the interface's section within the file.
+
+    :type units_per_second: int
+    :ivar units_per_second: The interface's timestamp resolution (``if_tsresol``).
+    """
+    def __init__(self, interface_id, section, link_type, snaplen, units_per_second):
+        magic = "\xd4\xc3\xb2\xa1" if units_per_second == MICRO_PER_SECOND else "\x4d\x3c\xb2\xa1"
+        super(PCAPNG_Interface, self).__init__(magic + struct.pack("<HHiIII", 2, 4, 0, 0,
+                                                                   snaplen or DEFAULT_SNAPLEN,
+                                                                   link_type))
+        self.interface_id     = interface_id
+        self.section          = section
+        self.units_per_second = units_per_second
+
+
+    def record(self, timestamp, cap_len, orig_len, data):
+        """ Re-frames packet data as a classic LibPCAP record for this interface.
+
+        :type  timestamp: int
+        :param timestamp: The packet's timestamp, in ``units_per_second``.
+        """
+        (ts_sec, units) = divmod(timestamp, self.units_per_second)
+        if self.codec.nanosecond:
+            units = units * NANO_PER_SECOND // self.units_per_second
+        return self.codec.packet_header.pack(ts_sec, units, cap_len, orig_len) + str(data)
+
+
+def parse_tsresol(value):
+    """ Converts an ``if_tsresol`` option byte into timestamp units per second.
+    """
+    if value & 0x80:
+        return 2 ** (value & 0x7f)
+    return 10 ** value
+
+
+class PCAPNG_Reader(object):
+    """ Streams the blocks of a pcapng file from a file object, yielding a :class:`~packet.Packet`
+    for every Enhanced or Simple Packet Block. Sections may change byte order, and every section's
+    interfaces are tracked separately. Blocks other than SHB/IDB/EPB/SPB are skipped.
+
+    :type fileobj: file
+    :ivar fileobj: The (binary) file object being read from. Only ``read()`` is used.
+
+    :type interfaces: list of :class:`PCAPNG_Interface`
+    :ivar interfaces: The interfaces of the current section.
+
+    :type pcap_header: :class:`PCAPNG_Interface`
+    :ivar pcap_header: The first interface in the file. This is the PCAP Global Header to use
+        when writing the packets out as classic pcap.
+    """
+    format = "pcapng"
+
+
+    def __init__(self, fileobj):
+        self.fileobj     = fileobj
+        self.section     = -1
+        self.interfaces  = []
+        self.byte_order  = "<"
+        self.pending     = []
+        self.pcap_header = None
+        block = self.read_block()
+        if block is None or block[0] != BLOCK_SHB:
+            raise PCAPNG_Error("Expected a pcapng Section Header Block. Is this a pcapng file?")
+        # Read ahead to the first interface, so that pcap_header is known before any packets
+        while self.pcap_header is None:
+            block = self.read_block()
+            if block is None:
+                break
+            self.pending.append(block)
+
+
+    def __iter__(self):
+        return self.iter_packets()
+
+
+    def read_block(self):
+        """ Reads the next block, handling Section Header and Interface Description Blocks as they
+        are seen.
+
+        :rtype:   (int, str) or None
+        :returns: The block type and body, or None at the end of the file.
+        """
+        header = read_exactly(self.fileobj, BLOCK_HEADER_LENGTH)
+        if not header:
+            return None
+        if len(header) < BLOCK_HEADER_LENGTH:
+            raise PCAPNG_Error("Truncated block header at end of file")
+        if header[:4] == SHB_MAGIC:
+            # The byte order of a section (including this block's length) comes from its SHB
+            magic = read_exactly(self.fileobj, 4)
+            if magic == struct.pack("<I", BYTE_ORDER_MAGIC):
+                self.byte_order = "<"
+            elif magic == struct.pack(">I", BYTE_ORDER_MAGIC):
+                self.byte_order = ">"
+            else:
+                raise PCAPNG_Error("Section Header Block has an unknown byte order magic",
+                                   [magic])
+            header += magic
+        (block_type, length) = struct.unpack(self.byte_order + FORMAT_BLOCK_HEADER, header[:8])
+        if length < BLOCK_HEADER_LENGTH + BLOCK_FOOTER_LENGTH or length % 4:
+            raise PCAPNG_Error("Invalid block length " + str(length) + " for block type " +
+                               hex(block_type))
+        body = header[8:] + read_exactly(self.fileobj, length - len(header) - BLOCK_FOOTER_LENGTH)
+        if len(read_exactly(self.fileobj, BLOCK_FOOTER_LENGTH)) < BLOCK_FOOTER_LENGTH:
+            raise PCAPNG_Error("Truncated block at end of file")
+        if block_type == BLOCK_SHB:
+            self.section   += 1
+            self.interfaces = []
+        elif block_type == BLOCK_IDB:
+            self.interfaces.append(self.parse_interface(body))
+            if self.pcap_header is None:
+                self.pcap_header = self.interfaces[-1]
+        return (block_type, body)
+
+
+    def parse_interface(self, body):
+        """ Builds a :class:`PCAPNG_Interface` from an Interface Description Block body.
+        """
+        layout = struct.Struct(self.byte_order + FORMAT_IDB)
+        (link_type, _, snaplen) = layout.unpack_from(body, 0)
+        units_per_second = 10 ** DEFAULT_TSRESOL
+        for (code, value) in self.iter_options(body, layout.size):
+            if code == OPTION_IF_TSRESOL and value:
+                units_per_second = parse_tsresol(ord(value[0]))
+        return PCAPNG_Interface(len(self.interfaces), self.section, link_type, snaplen,
+                                units_per_second)
+
+
+    def iter_options(self, body, offset):
+        """ Yields the ``(code, value)`` of every option in ``body`` from ``offset`` onwards.
+        """
+        layout = struct.Struct(self.byte_order + FORMAT_OPTION)
+        while offset + layout.size <= len(body):
+            (code, length) = layout.unpack_from(body, offset)
+            if code == OPTION_END:
+                return
+            offset += layout.size
+            yield (code, body[offset:offset + length])
+            offset += length + padding(length)
+
+
+    def interface(self, interface_id):
+        try:
+            return self.interfaces[interface_id]
+        except IndexError:
+            raise PCAPNG_Error("Packet refers to interface " + str(interface_id) +
+                               ", but only " + str(len(self.interfaces)) +
+                               " interfaces have been described")
+
+
+    def iter_blocks(self):
+        """ Yields every ``(block_type, body)`` in the file, starting after the first SHB.
+        """
+        while self.pending:
+            yield self.pending.pop(0)
+        while True:
+            block = self.read_block()
+            if block is None:
+                return
+            yield block
+
+
+    def iter_records(self):
+        """ Yields ``(interface, record)`` for every packet block, where ``record`` is a classic
+        LibPCAP record (Packet Header and data) for ``interface``.
+
+        :raises PCAPNG_Error: If a packet block's captured length runs past the end of the block.
+        """
+        epb_length = struct.calcsize("<" + FORMAT_EPB)
+        for (block_type, body) in self.iter_blocks():
+            if block_type == BLOCK_EPB:
+                if len(body) < epb_length:
+                    raise PCAPNG_Error("Enhanced Packet Block of " + str(len(body)) + " bytes is " +
+                                       "too short for its fixed fields")
+                (interface_id, ts_high, ts_low, cap_len, orig_len) = struct.unpack_from(
+                    self.byte_order + FORMAT_EPB, body, 0)
+                if cap_len > len(body) - epb_length:
+                    raise PCAPNG_Error("Enhanced Packet Block captured length " + str(cap_len) +
+                                       " is longer than the " + str(len(body) - epb_length) +
+                                       " bytes of packet data in the block")
+                interface = self.interface(interface_id)
+                data      = buffer(body, epb_length, cap_len)
+                yield (interface, interface.record((ts_high << 32) | ts_low, cap_len, orig_len,
+                                                   data))
+            elif block_type == BLOCK_SPB:
+                interface  = self.interface(0)
+                if len(body) < 4:
+                    raise PCAPNG_Error("Simple Packet Block of " + str(len(body)) + " bytes is " +
+                                       "too short for its fixed fields")
+                (orig_len,) = struct.unpack_from(self.byte_order + FORMAT_SPB, body, 0)
+                cap_len    = min(orig_len, len(body) - 4, interface.snaplen)
+                yield (interface, interface.record(0, cap_len, orig_len, buffer(body, 4, cap_len)))
+
+
+    def iter_packets(self, packet_class=Packet):
+        """ Yields a :class:`~packet.Packet` (or ``packet_class``) for every packet block.
+        ``packet.packet_header.pcap_header`` is the :class:`PCAPNG_Interface` it was captured on.
+        """
+        for (interface, record) in self.iter_records():
+            yield packet_class(interface, record)
+
+
+    def iter_classic_packets(self, packet_class=Packet):
+        """ The same as :meth:`iter_packets`, but ensures every interface can share the single
+        PCAP Global Header of a classic pcap file (:attr:`pcap_header`).
+
+        :raises PCAPNG_Error: If an interface's link type or timestamp resolution differs from the
+            first interface's.
+        """
+        for (interface, record) in self.iter_classic_records():
+            yield packet_class(interface, record)
+
+
+    def iter_classic_records(self):
+        """ The records of :meth:`iter_classic_packets`, as ``(interface, record)``.
+        """
+        compatible = set()
+        for (interface, record) in self.iter_records():
+            if interface not in compatible:
+                if (interface.network != self.pcap_header.network or
+                        interface.codec is not self.pcap_header.codec):
+                    raise PCAPNG_Error("Interface " + str(interface.interface_id) + " of section " +
+                                       str(interface.section) + " has a different link type or " +
+                                       "timestamp resolution to the first interface, so they " +
+                                       "cannot share a classic pcap header. Write pcapng instead.")
+                compatible.add(interface)
+            yield (interface, record)
+
+
+class PCAPNG_Writer(PCAP_Writer):
+    """ Writes decapsulated packets as pcapng, through the same bounded buffer as
+    :class:`~writer.PCAP_Writer`. A Section Header Block is written for every input section and an
+    Interface Description Block the first time each interface is used, so packets from classic pcap
+    and pcapng input can both be written. Appending to a pcapng file (``header`` False) starts a new
+    section, which is itself valid pcapng.
+    """
+    def __init__(self, fileobj, pcap_header=None, flush_size=DEFAULT_FLUSH_SIZE, header=True):
+        self.section      = None
+        self.interface_id = {}
+        self.epb          = struct.Struct("<" + FORMAT_BLOCK_HEADER + FORMAT_EPB)
+        super(PCAPNG_Writer, self).__init__(fileobj, pcap_header, flush_size, header)
+
+
+    def write_header(self, pcap_header):
+        """ pcapng has no global header; sections and interfaces are written as packets need them.
+        """
+        pass
+
+
+    def write_block(self, block_type, body):
+        length = BLOCK_HEADER_LENGTH + len(body) + padding(len(body)) + BLOCK_FOOTER_LENGTH
+        self.buffer += struct.pack("<II", block_type, length)
+        self.buffer += body
+        self.buffer += "\x00" * padding(len(body))
+        self.buffer += struct.pack("<I", length)
+
+
+    def write_interface(self, pcap_header):
+        """ Starts a new section if ``pcap_header`` belongs to one, then describes it.
+
+        :rtype:   int
+        :returns: The interface's id within the output section.
+        """
+        section = getattr(pcap_header, "section", 0)
+        if section != self.section:
+            self.write_block(BLOCK_SHB, struct.pack("<" + FORMAT_SHB, BYTE_ORDER_MAGIC, 1, 0, -1))
+            self.section      = section
+            self.interface_id = {}
+        options = ""
+        if pcap_header.codec.nanosecond:
+            options = (struct.pack("<" + FORMAT_OPTION, OPTION_IF_TSRESOL, 1) + "\x09\x00\x00\x00" +
+                       struct.pack("<" + FORMAT_OPTION, OPTION_END, 0))
+        self.write_block(BLOCK_IDB, struct.pack("<" + FORMAT_IDB, pcap_header.network, 0,
+                                                pcap_header.snaplen) + options)
+        self.interface_id[pcap_header] = len(self.interface_id)
+        return self.interface_id[pcap_header]
+
+
+    def write_packet(self, packet):
+        """ Appends the decapsulated form of ``packet`` as an Enhanced Packet Block. The original
+        length keeps whatever the capture cut off, less the headers that were stripped, so a packet
+        passed through untouched keeps its own, as it does in a classic capture.
+
+        :type packet: :class:`~packet.Packet`
+        """
+        packet_header = packet.packet_header
+        pcap_header   = packet_header.pcap_header
+        interface_id  = self.interface_id.get(pcap_header)
+        if interface_id is None or getattr(pcap_header, "section", 0) != self.section:
+            interface_id = self.write_interface(pcap_header)
+        units_per_second = NANO_PER_SECOND if pcap_header.codec.nanosecond else MICRO_PER_SECOND
+        timestamp        = packet_header.ts_sec * units_per_second + packet_header.ts_usec
+        decap_length     = packet.decap_length
+        stripped         = packet_header.incl_len - decap_length
+        orig_len         = max(packet_header.orig_len - stripped, decap_length)
+        pad              = padding(decap_length)
+        block_length     = self.epb.size + decap_length + pad + BLOCK_FOOTER_LENGTH
+        parts            = packet.decapsulate_parts()[1:]
+        self.write_record(self.epb.pack(BLOCK_EPB, block_length, interface_id, timestamp >> 32,
+                                        timestamp & 0xffffffff, decap_length, orig_len),
+                          *(parts + ("\x00" * pad, struct.pack("<I", block_length))))
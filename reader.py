@@ -0,0 +1,326 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+Streams packets out of a LibPCAP file one record at a time, so that a capture never has to be
+held in memory in full. Files on disk may instead be memory-mapped and parsed in place.
+"""
+
+##
+# Python Imports
+import os
+import mmap
+
+##
+# Project Imports
+from lib           import read_exactly, peek
+from header_pcap   import PCAP_Header, HEADER_LENGTH_PCAP
+from header_packet import Packet_Header, HEADER_LENGTH_PACKET
+from packet        import Packet
+from packet_view   import Packet_View
+from pcapng        import PCAPNG_Reader, SHB_MAGIC
+
+##
+# Error Handling
+from errors import GenericException
+class Reader_Error(GenericException):
+    """ Errors relating to reading a PCAP stream.
+    """
+    pass
+
+##
+# Global Variables
+MAX_RECORD_LENGTH = 262144      # The largest snaplen tcpdump and dumpcap write
+RESYNC_CHUNK      = 65536       # Bytes read at a time while looking for the next record
+RESYNC_WINDOW     = 86400       # Seconds a record's timestamp may stray from the last good one
+
+
+class PCAP_Reader(object):
+    """ Reads the PCAP Global Header from a file object, then yields one :class:`~packet.Packet`
+    per record. Each record is read using its ``incl_len``, so memory use is bounded by the
+    largest single record and the total work is linear in the size of the capture.
+
+    :type fileobj: file
+    :ivar fileobj: The (binary) file object being read from. Only ``read()`` is used.
+
+    :type pcap_header: :class:`header_pcap.PCAP_Header`
+    :ivar pcap_header: The PCAP Global Header read from the start of ``fileobj``.
+
+    :type resync: bool
+    :ivar resync: If True, a Packet Header that does not look like one (a corrupted length, say)
+        is skipped over by scanning ahead for the next plausible record, instead of raising. A
+        record is plausible if its lengths and timestamp make sense and the record after it does
+        too. A truncated last record is dropped.
+
+    :ivar int resyncs: The number of times the reader had to resync.
+    :ivar int skipped_bytes: The number of bytes skipped over while resyncing.
+    """
+    format = "pcap"
+
+
+    def __init__(self, fileobj, resync=False):
+        self.fileobj       = fileobj
+        self.resync        = resync
+        self.resyncs       = 0
+        self.skipped_bytes = 0
+        # Bytes read ahead while resyncing, to be read again before the file
+        self.backlog       = ""
+        self.last_ts       = None
+        header_bytes       = read_exactly(fileobj, HEADER_LENGTH_PCAP)
+        if len(header_bytes) < HEADER_LENGTH_PCAP:
+            raise Reader_Error("Expected a " + str(HEADER_LENGTH_PCAP) + " byte PCAP header." +
+                               " Received " + str(len(header_bytes)) + " bytes")
+        self.pcap_header = PCAP_Header(header_bytes)
+
+
+    def __iter__(self):
+        return self.iter_packets()
+
+
+    def iter_records(self):
+        """ Yields the raw bytes of each record (Packet Header and packet data) in the file.
+
+        :rtype:   generator of **binary** strings
+        """
+        while True:
+            header_bytes = self.read(HEADER_LENGTH_PACKET)
+            if not header_bytes:
+                return
+            if len(header_bytes) < HEADER_LENGTH_PACKET:
+                if self.resync:
+                    self.skipped_bytes += len(header_bytes)
+                    return
+                raise Reader_Error("Truncated Packet Header at end of file. Received " +
+                                   str(len(header_bytes)) + " bytes")
+            if self.resync and not self.plausible(header_bytes, 0):
+                header_bytes = self.find_record(header_bytes)
+                if header_bytes is None:
+                    return
+            packet_header = Packet_Header(self.pcap_header, header_bytes)
+            incl_len      = packet_header.incl_len
+            data          = self.read(incl_len)
+            if len(data) < incl_len:
+                if self.resync:
+                    self.skipped_bytes += len(header_bytes) + len(data)
+                    return
+                raise Reader_Error("Truncated packet at end of file. Expected " + str(incl_len) +
+                                   " bytes, received " + str(len(data)) + " bytes")
+            self.last_ts = packet_header.ts_sec
+            yield header_bytes + data
+
+
+    def iter_classic_records(self):
+        """ Yields ``(pcap_header, record)`` for every record, as
+        :meth:`pcapng.PCAPNG_Reader.iter_classic_records` does.
+        """
+        for record in self.iter_records():
+            yield (self.pcap_header, record)
+
+
+    def read(self, num_bytes):
+        """ Reads ``num_bytes`` from the backlog left by :meth:`find_record`, then the file.
+
+        :rtype: **Binary** string
+        """
+        if not self.backlog:
+            return read_exactly(self.fileobj, num_bytes)
+        (data, self.backlog) = (self.backlog[:num_bytes], self.backlog[num_bytes:])
+        if len(data) < num_bytes:
+            data += read_exactly(self.fileobj, num_bytes - len(data))
+        return data
+
+
+    def plausible(self, bytes, offset):
+        """ True if the 16 bytes at ``offset`` look like a Packet Header in this file.
+
+        :rtype: bool
+        """
+        codec = self.pcap_header.codec
+        (ts_sec, ts_usec, incl_len, orig_len) = codec.packet_header.unpack_from(bytes, offset)
+        snaplen = self.pcap_header.snaplen or MAX_RECORD_LENGTH
+        return (ts_usec < (1000000000 if codec.nanosecond else 1000000) and
+                incl_len <= orig_len <= MAX_RECORD_LENGTH and incl_len <= snaplen and
+                (self.last_ts is None or abs(ts_sec - self.last_ts) <= RESYNC_WINDOW))
+
+
+    def find_record(self, bytes):
+        """ Scans forward from the implausible Packet Header at the start of ``bytes`` to the next
+        plausible record (one whose following record is plausible too, or which ends the file).
+
+        :rtype:   **Binary** string or None
+        :returns: The Packet Header found, with the bytes after it put back to be read, or None if
+            the rest of the file holds no plausible record.
+        """
+        self.resyncs += 1
+        window        = bytearray(bytes)
+        offset        = 1
+        eof           = False
+        unpack        = self.pcap_header.codec.packet_header.unpack_from
+        while True:
+            # Make sure the candidate header and the header after it are both in the window
+            need = offset + HEADER_LENGTH_PACKET
+            if need <= len(window) and self.plausible(window, offset):
+                need += unpack(window, offset)[2] + HEADER_LENGTH_PACKET
+            if need > len(window) and not eof:
+                chunk = self.read(max(RESYNC_CHUNK, need - len(window)))
+                eof   = not chunk
+                window.extend(chunk)
+                continue
+            if offset + HEADER_LENGTH_PACKET > len(window):
+                self.skipped_bytes += len(window)
+                return None
+            if self.plausible(window, offset):
+                next_offset = offset + HEADER_LENGTH_PACKET + unpack(window, offset)[2]
+                if (next_offset == len(window) or
+                        (next_offset + HEADER_LENGTH_PACKET <= len(window) and
+                         self.plausible(window, next_offset))):
+                    self.skipped_bytes += offset
+                    self.backlog        = str(window[offset + HEADER_LENGTH_PACKET:]) + self.backlog
+                    return str(window[offset:offset + HEADER_LENGTH_PACKET])
+            offset += 1
+            # Let go of what has been scanned past, so a long run of garbage stays in one chunk
+            if offset > RESYNC_CHUNK:
+                del window[:offset]
+                self.skipped_bytes += offset
+                offset              = 0
+
+
+    def iter_packets(self, packet_class=Packet):
+        """ Yields a :class:`~packet.Packet` for each record in the file.
+
+        :param packet_class: The class built for each record, e.g.
+            :class:`~packet_tunnel.Tunnel_Packet`.
+
+        :rtype:   generator of :class:`~packet.Packet`
+        """
+        for record in self.iter_records():
+            yield packet_class(self.pcap_header, record)
+
+
+    def iter_classic_packets(self, packet_class=Packet):
+        """ Classic pcap can always be written back out under its own header; see
+        :meth:`pcapng.PCAPNG_Reader.iter_classic_packets`.
+        """
+        return self.iter_packets(packet_class)
+
+
+    def iter_views(self):
+        """ Yields a lazily decoded :class:`~packet_view.Packet_View` for each record in the file.
+
+        Views only decapsulate ICMP tunnels over IPv4 on Ethernet.
+
+        :rtype:   generator of :class:`~packet_view.Packet_View`
+        """
+        for record in self.iter_records():
+            yield Packet_View(self.pcap_header, record)
+
+
+class PCAP_MMap_Reader(object):
+    """ Memory-maps a PCAP file and yields one :class:`~packet.Packet` per record. Every header and
+    frame is constructed from the shared map plus an offset, so no packet bytes are copied until
+    the payload is actually written out. For captures that sit in the page cache this avoids all
+    read() copies.
+
+    .. Note::
+        Python 2's ``mmap`` does not export a ``memoryview``, so zero-copy windows into the map are
+        read-only ``buffer`` objects. Packets must not be used after :meth:`close`.
+
+    :type mmap: mmap.mmap
+    :ivar mmap: The read-only map of the whole file.
+
+    :type pcap_header: :class:`header_pcap.PCAP_Header`
+    :ivar pcap_header: The PCAP Global Header at the start of the file.
+    """
+    def __init__(self, fileobj):
+        # Checked before mapping, as an empty file cannot be mapped at all
+        size = os.fstat(fileobj.fileno()).st_size
+        if size < HEADER_LENGTH_PCAP:
+            raise Reader_Error("Expected a " + str(HEADER_LENGTH_PCAP) + " byte PCAP header." +
+                               " Received " + str(size) + " bytes")
+        self.mmap        = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        self.pcap_header = PCAP_Header(self.mmap)
+
+
+    def __iter__(self):
+        return self.iter_packets()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def close(self):
+        self.mmap.close()
+
+
+    def iter_offsets(self, start=HEADER_LENGTH_PCAP, end=None):
+        """ Yields the offset of each record's Packet Header within the map. Only ``incl_len`` is
+        decoded, so this is a cheap pass over the 16-byte Packet Headers.
+
+        :type  start: int
+        :param start: The offset of the first record to yield. MUST be a record boundary.
+
+        :type  end: int
+        :param end: Stop before this offset (a record boundary). Defaults to the end of the map.
+
+        :rtype:   generator of int
+        """
+        offset = start
+        size   = len(self.mmap)
+        end    = size if end is None else min(end, size)
+        unpack = self.pcap_header.codec.packet_header.unpack_from
+        while offset < end:
+            if size - offset < HEADER_LENGTH_PACKET:
+                raise Reader_Error("Truncated Packet Header at offset " + str(offset))
+            record_end = offset + HEADER_LENGTH_PACKET + unpack(self.mmap, offset)[2]
+            if record_end > size:
+                raise Reader_Error("Truncated packet at offset " + str(offset) + ". Expected " +
+                                   str(record_end - offset) + " bytes, received " +
+                                   str(size - offset) + " bytes")
+            yield offset
+            offset = record_end
+
+
+    def iter_packets(self, start=HEADER_LENGTH_PCAP, end=None, packet_class=Packet):
+        """ Yields a :class:`~packet.Packet` (or ``packet_class``) for each record in the map,
+        optionally limited to the records between the ``start`` and ``end`` offsets (see
+        :meth:`iter_offsets`).
+
+        :rtype:   generator of :class:`~packet.Packet`
+        """
+        for offset in self.iter_offsets(start, end):
+            yield packet_class(self.pcap_header, self.mmap, offset)
+
+
+    def iter_views(self, start=HEADER_LENGTH_PCAP, end=None):
+        """ Yields a lazily decoded :class:`~packet_view.Packet_View` for each record in the map.
+        A view holds little more than its offset, so millions of them can be kept in memory. As
+        with :meth:`PCAP_Reader.iter_views`, only ICMP tunnels over IPv4 on Ethernet are understood.
+
+        :rtype:   generator of :class:`~packet_view.Packet_View`
+        """
+        for offset in self.iter_offsets(start, end):
+            yield Packet_View(self.pcap_header, self.mmap, offset)
+
+
+def open_reader(fileobj, resync=False):
+    """ Returns a :class:`PCAP_Reader` or a :class:`~pcapng.PCAPNG_Reader`, depending on the
+    format of ``fileobj``. ``resync`` (see :class:`PCAP_Reader`) only applies to classic pcap.
+    """
+    (magic, fileobj) = peek(fileobj, 4)
+    if magic == SHB_MAGIC:
+        return PCAPNG_Reader(fileobj)
+    return PCAP_Reader(fileobj, resync)
+
+
+def iter_packets(fileobj):
+    """ Convenience wrapper around :func:`open_reader` for callers that only need the packets.
+
+    :rtype:   generator of :class:`~packet.Packet`
+    """
+    for packet in open_reader(fileobj):
+        yield packet
@@ -0,0 +1,309 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+Puts the packets of ICMP tunnels back in order. ICMP tunnels carry their session in the echo
+identifier and sequence number, so every ``(src_ip, dst_ip, identifier)`` is treated as one tunnel
+and its packets are released in sequence number order, starting from the first packet seen. Packets
+that arrive early are held within a window, duplicates are dropped, and a gap that is not filled
+within ``timeout`` seconds of capture time is skipped over. Packets that turn up more than a window
+late cannot be told from duplicates, so they are passed through as they came.
+
+Each tunnel is a handful of integers plus the packets it is holding, and tunnels that fall idle are
+dropped, so thousands of concurrent tunnels need no more memory than their windows.
+"""
+
+##
+# Python Imports
+import collections
+
+##
+# Project Imports
+from codec          import ICMP
+from decoders       import ip_header, IPV4_FRAGMENT
+from frame_ethernet import ETHERTYPE_IPV4
+from frame_internet import FRAME_LENGTH_INTERNET
+from frame_protocol import PROTO_ICMP, FRAME_LENGTH_ICMP
+from fragments      import timestamp
+
+##
+# Error Handling
+from errors import GenericException
+class Reorder_Error(GenericException):
+    """ Errors relating to reordering ICMP tunnels.
+    """
+    pass
+
+##
+# Global Variables
+DEFAULT_WINDOW      = 64        # Sequence numbers a packet may arrive ahead of its turn
+DEFAULT_TIMEOUT     = 2.0       # Seconds of capture time to wait for a missing packet
+DEFAULT_IDLE        = 60.0      # Seconds of capture time before an idle tunnel is forgotten
+DEFAULT_MAX_TUNNELS = 65536
+SEQ_MODULO          = 2 ** 16
+ICMP_ECHO_TYPES     = (0, 8)    # Echo Reply and Echo Request
+
+
+def parse_echo(packet):
+    """ Decodes the ICMP echo header of a decapsulated ICMP tunnel packet.
+
+    :rtype:   ((str, int), int) or None
+    :returns: The tunnel's key (``(src_ip + dst_ip, identifier)``) and the packet's sequence
+        number, or None if ``packet`` is not an ICMP echo tunnel packet.
+    """
+    if not packet.decapsulated:
+        return None
+    data                    = packet.data
+    (ip_offset, ether_type) = ip_header(packet.packet_header.pcap_header.network, data, 0,
+                                        len(data))
+    if ether_type != ETHERTYPE_IPV4 or len(data) - ip_offset < FRAME_LENGTH_INTERNET:
+        return None
+    header_length = (ord(data[ip_offset]) & 0x0f) * 4
+    icmp          = ip_offset + header_length
+    if ord(data[ip_offset + 9]) != PROTO_ICMP or len(data) - icmp < FRAME_LENGTH_ICMP:
+        return None
+    if (ord(data[ip_offset + 6]) << 8 | ord(data[ip_offset + 7])) & IPV4_FRAGMENT:
+        return None
+    (icmp_type, _, _, identifier, sequence) = ICMP.unpack_from(data, icmp)
+    if icmp_type not in ICMP_ECHO_TYPES:
+        return None
+    return ((data[ip_offset + 12:ip_offset + 20], identifier), sequence)
+
+
+class ICMP_Tunnel(object):
+    """ The reordering state of one ICMP tunnel.
+
+    :ivar int next_seq: The sequence number due next.
+    :ivar int first_seq: The sequence number of the first packet seen, until a packet from before it
+        turns up. Packets from up to a window before it are then let through (once each), as the
+        capture may have started mid-reorder.
+    :ivar dict pending: Early packets keyed by sequence number, or None if there are none.
+    :ivar set skipped: Sequence numbers given up on, which are still let through if they turn up
+        late, or None if there are none.
+    :ivar float held_since: The capture time the oldest held packet arrived.
+    :ivar float last_seen: The capture time of the latest packet.
+    """
+    __slots__ = ("next_seq", "first_seq", "pending", "skipped", "held_since", "last_seen")
+
+
+    def __init__(self, next_seq, now):
+        self.next_seq   = next_seq
+        self.first_seq  = next_seq
+        self.pending    = None
+        self.skipped    = None
+        self.held_since = now
+        self.last_seen  = now
+
+
+class ICMP_Reorderer(object):
+    """ Sits between a reader and the writer, releasing the packets of each ICMP tunnel in sequence
+    number order. Everything else passes straight through.
+
+    :type window: int
+    :ivar window: How far ahead of the next sequence number a packet may be held. Packets further
+        ahead than this release everything held and restart the sequence.
+
+    :type timeout: float
+    :ivar timeout: Seconds of capture time a tunnel waits for a missing packet before skipping it.
+
+    :type idle: float
+    :ivar idle: Seconds of capture time after which an idle tunnel is forgotten.
+
+    :type max_tunnels: int
+    :ivar max_tunnels: The most tunnels tracked at once.
+
+    :ivar int reordered: Packets held back and released in order.
+    :ivar int duplicates: Duplicate packets dropped.
+    :ivar int late: Packets that arrived after their gap had been skipped, or from before the first
+        packet of their tunnel, let through as they came.
+    :ivar int stale: Packets more than a window behind, let through as they came.
+    :ivar int skipped: Sequence numbers given up on.
+    :ivar int evicted: Tunnels forgotten to stay within ``max_tunnels``.
+    """
+    def __init__(self, window=DEFAULT_WINDOW, timeout=DEFAULT_TIMEOUT, idle=DEFAULT_IDLE,
+                 max_tunnels=DEFAULT_MAX_TUNNELS):
+        if not 0 < window < SEQ_MODULO // 2:
+            raise Reorder_Error("window must be between 1 and " + str(SEQ_MODULO // 2 - 1) +
+                                ", received " + str(window))
+        self.window      = window
+        self.timeout     = timeout
+        self.idle        = idle
+        self.max_tunnels = max_tunnels
+        # Least recently active first, so eviction pops from the front
+        self.tunnels     = collections.OrderedDict()
+        self.last_sweep  = None
+        self.reordered   = 0
+        self.duplicates  = 0
+        self.late        = 0
+        self.stale       = 0
+        self.skipped     = 0
+        self.evicted     = 0
+
+
+    def reorder(self, packets):
+        """ Yields the packets of ``packets``, with each ICMP tunnel's packets in order.
+
+        :rtype: generator of :class:`~packet_tunnel.Tunnel_Packet`
+        """
+        for packet in packets:
+            echo = parse_echo(packet)
+            if echo is None:
+                yield packet
+                continue
+            now = timestamp(packet)
+            if self.last_sweep is None or now - self.last_sweep >= self.timeout / 2:
+                for released in self.sweep(now):
+                    yield released
+            for released in self.add(packet, echo, now):
+                yield released
+        for tunnel in self.tunnels.itervalues():
+            for released in self.flush(tunnel):
+                yield released
+        self.tunnels.clear()
+
+
+    def add(self, packet, echo, now):
+        """ Takes in one tunnel packet.
+
+        :rtype:   list
+        :returns: The packets it releases, in order.
+        """
+        (key, seq) = echo
+        tunnel     = self.tunnels.pop(key, None)
+        released   = []
+        if tunnel is None:
+            if len(self.tunnels) >= self.max_tunnels:
+                released = self.evict()
+            tunnel = ICMP_Tunnel(seq, now)
+        self.tunnels[key] = tunnel
+        tunnel.last_seen  = now
+        return released + self.order(tunnel, packet, seq, now)
+
+
+    def order(self, tunnel, packet, seq, now):
+        """ Places one packet in its tunnel's sequence.
+
+        :rtype: list
+        """
+        ahead = (seq - tunnel.next_seq) % SEQ_MODULO
+        if ahead >= SEQ_MODULO // 2:
+            if ahead < SEQ_MODULO - self.window:
+                # Too old to tell a duplicate from a straggler; the sequence carries on regardless
+                self.stale += 1
+                return [packet]
+            # A duplicate of a released packet, one whose gap was skipped, or one from before the
+            # first packet seen
+            if (tunnel.first_seq is not None and
+                    0 < (tunnel.first_seq - seq) % SEQ_MODULO <= self.window):
+                # The capture started mid-reorder, so the window before it may still turn up
+                tunnel.skipped   = (tunnel.skipped or set()).union(
+                    (tunnel.first_seq - step) % SEQ_MODULO for step in xrange(1, self.window + 1))
+                tunnel.first_seq = None
+            if tunnel.skipped and seq in tunnel.skipped:
+                tunnel.skipped.discard(seq)
+                self.late += 1
+                return [packet]
+            self.duplicates += 1
+            return []
+        if ahead >= self.window:
+            # Too far ahead to wait for: give up on everything before it
+            released        = self.flush(tunnel)
+            tunnel.next_seq = seq
+            return released + self.release(tunnel, packet)
+        if ahead:
+            return self.hold(tunnel, packet, seq, now)
+        return self.release(tunnel, packet)
+
+
+    def hold(self, tunnel, packet, seq, now):
+        """ Holds a packet that arrived before its turn.
+
+        :rtype: list
+        """
+        if tunnel.pending is None:
+            (tunnel.pending, tunnel.held_since) = ({}, now)
+        if seq in tunnel.pending:
+            self.duplicates += 1
+        else:
+            tunnel.pending[seq] = packet
+        return []
+
+
+    def release(self, tunnel, packet):
+        """ Releases ``packet``, which is due next, and any held packets that follow on from it.
+        """
+        released        = [packet]
+        tunnel.next_seq = (tunnel.next_seq + 1) % SEQ_MODULO
+        while tunnel.pending:
+            held = tunnel.pending.pop(tunnel.next_seq, None)
+            if held is None:
+                break
+            released.append(held)
+            self.reordered += 1
+            tunnel.next_seq = (tunnel.next_seq + 1) % SEQ_MODULO
+        if not tunnel.pending:
+            tunnel.pending = None
+        return released
+
+
+    def flush(self, tunnel, now=None):
+        """ Releases held packets in order, skipping over the gaps between them.
+
+        :param now: If given, only release up to the last packet held for longer than ``timeout``.
+            Otherwise release everything.
+        """
+        released = []
+        due      = lambda seq: (seq - tunnel.next_seq) % SEQ_MODULO
+        if now is None:
+            expired = tunnel.pending
+        else:
+            expired = [seq for (seq, packet) in tunnel.pending.iteritems()
+                       if now - timestamp(packet) > self.timeout]
+        if not expired:
+            return released
+        last = max(expired, key=due)
+        while tunnel.pending and last in tunnel.pending:
+            seq = min(tunnel.pending, key=due)
+            gap = due(seq)
+            if gap:
+                if tunnel.skipped is None:
+                    tunnel.skipped = set()
+                tunnel.skipped.update((tunnel.next_seq + step) % SEQ_MODULO for step in
+                                      xrange(max(gap - self.window, 0), gap))
+                self.skipped += gap
+            tunnel.next_seq = seq
+            released.extend(self.release(tunnel, tunnel.pending.pop(seq)))
+            self.reordered += 1
+        if tunnel.pending:
+            tunnel.held_since = min(timestamp(packet) for packet in tunnel.pending.itervalues())
+        # Only the most recent window of skipped sequence numbers can still turn up late
+        if tunnel.skipped:
+            tunnel.skipped = set(seq for seq in tunnel.skipped
+                                 if (tunnel.next_seq - seq) % SEQ_MODULO <= self.window) or None
+        return released
+
+
+    def sweep(self, now):
+        """ Skips the gaps that have been waited on for longer than ``timeout``, and forgets
+        tunnels that have been idle for longer than ``idle``.
+
+        :rtype: list
+        """
+        self.last_sweep = now
+        released        = []
+        for (key, tunnel) in self.tunnels.items():
+            if tunnel.pending and now - tunnel.held_since > self.timeout:
+                released.extend(self.flush(tunnel, now))
+            elif not tunnel.pending and now - tunnel.last_seen > self.idle:
+                del self.tunnels[key]
+        return released
+
+
+    def evict(self):
+        """ Forgets the least recently active tunnel, releasing anything it holds.
+
+        :rtype: list
+        """
+        (_, tunnel)   = self.tunnels.popitem(last=False)
+        self.evicted += 1
+        return self.flush(tunnel)
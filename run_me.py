@@ -6,32 +6,602 @@ import __init__
 
 ##
 # Python Imports
+import io
 import os
 import sys
-import binascii
+import argparse
+import functools
+import contextlib
 
 ##
 # Project Imports
-from header_pcap    import PCAP_Header
-from packet         import Packet
+from reader         import PCAP_MMap_Reader, Reader_Error, open_reader
+from pcapng         import PCAPNG_Writer, PCAPNG_Error, SHB_MAGIC
+from writer         import PCAP_Writer
+from parallel       import decapsulate_parallel
+from index          import Record_Index, Index_Error, parse_timestamp
+from numpy_engine   import NumPy_Decapsulator
+from compression    import open_input, open_output, detect_compression, MAGIC_XZ
+from lib            import peek
+from packet_tunnel  import Tunnel_Packet
+from decoders       import DEFAULT_DEPTH
+from fragments      import Fragment_Reassembler, DEFAULT_MAX_MEMORY, DEFAULT_TIMEOUT
+from tcp_stream     import (TCP_Reassembler, Reframed_Packet, FRAMERS, DEFAULT_MAX_FLOWS,
+                            DEFAULT_IDLE, DEFAULT_MAX_MEMORY as DEFAULT_TCP_MEMORY)
+from reorder        import (ICMP_Reorderer, DEFAULT_WINDOW, DEFAULT_MAX_TUNNELS,
+                            DEFAULT_TIMEOUT as DEFAULT_REORDER_TIMEOUT)
+from flows          import Flow_Table
+from tolerant       import Tolerant_Decoder
+from follow         import Follower, Follow_Error, DEFAULT_POLL_INTERVAL
+from stats          import Run_Stats, run_profiled
+from filters        import Packet_Filter, Filter_Error
+from shards         import Sharded_Writer, DEFAULT_MAX_OPEN
 ##
 # Global Variables
+STDIO       = "-"
+PIPE_BUFFER = 1024 * 1024   # Bytes per read from stdin and write to stdout
 
 
-if __name__ == "__main__":
-    # Read the pcap file as binary data
-    with open(sys.argv[1], "rb") as file:
-        raw_bytes = file.read()
-    # PCAP Header
-    (pcap_header, raw_bytes)   = PCAP_Header.parse_PCAP_Header(raw_bytes)
-    packets = []
-    while len(raw_bytes) != 0:
-        (packet, raw_bytes) = Packet.parse_Packet(pcap_header, raw_bytes)
-        packets.append(packet)
-    # Re-Write decapsulated packets
-    decap_bytes = pcap_header.raw_bytes
+def parse_ports(value):
+    try:
+        return set(int(port) for port in value.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected comma separated port numbers, received '" +
+                                         value + "'")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Decapsulate encapsulated packet payloads.")
+    parser.add_argument("pcap", help="The capture to decapsulate, or - to read it from stdin.")
+    parser.add_argument("-o", "--output", metavar="PATH",
+                        help="Where to write the decapsulated capture, or - for stdout " +
+                             "(default: decap_<name> in the same directory as the capture, or " +
+                             "stdout when reading stdin).")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Decapsulate using this many processes (default: 1).")
+    parser.add_argument("--numpy", action="store_true",
+                        help="Decapsulate in batches with the NumPy engine (requires numpy).")
+    parser.add_argument("--format", choices=["pcap", "pcapng"],
+                        help="Output format (default: the same as the input).")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, metavar="N",
+                        help="Peel off up to N nested tunnels per packet; 0 peels off every " +
+                             "recognized tunnel (default: %(default)s).")
+    parser.add_argument("--io-threads", action="store_true",
+                        help="Run decompression and compression in background threads.")
+    indexed = parser.add_argument_group("indexed extraction",
+                                        "Decapsulate only part of the capture, using (and if " +
+                                        "needed building) the <pcap>.idx sidecar index.")
+    indexed.add_argument("--packet", type=int, metavar="N",
+                         help="Decapsulate only packet N (counting from 0).")
+    indexed.add_argument("--start", metavar="SECONDS",
+                         help="Decapsulate packets captured at or after this UNIX timestamp.")
+    indexed.add_argument("--end", metavar="SECONDS",
+                         help="Decapsulate packets captured before this UNIX timestamp.")
+    indexed.add_argument("--reindex", action="store_true",
+                         help="Rebuild the sidecar index even if it looks up to date.")
+    fragments = parser.add_argument_group("IPv4 fragment reassembly",
+                                          "Reassemble fragmented tunnel packets before " +
+                                          "decapsulating them. Not available with --jobs or " +
+                                          "--numpy.")
+    fragments.add_argument("--reassemble", action="store_true",
+                           help="Reassemble IPv4 fragments.")
+    fragments.add_argument("--frag-memory", type=int, default=DEFAULT_MAX_MEMORY // 2 ** 20,
+                           metavar="MB",
+                           help="Most fragment data to buffer (default: %(default)s MB).")
+    fragments.add_argument("--frag-timeout", type=float, default=DEFAULT_TIMEOUT,
+                           metavar="SECONDS",
+                           help="Give up on a datagram after this much capture time without a " +
+                                "new fragment (default: %(default)s).")
+    tcp = parser.add_argument_group("TCP tunnels",
+                                    "Reassemble TCP streams on the given ports and write out the " +
+                                    "packets carried inside them. Not available with --jobs or " +
+                                    "--numpy.")
+    tcp.add_argument("--tcp-ports", type=parse_ports, metavar="PORT[,PORT...]",
+                     help="The TCP ports tunnels run on.")
+    tcp.add_argument("--tcp-framing", choices=sorted(FRAMERS), default="ip",
+                     help="How inner packets are delimited within a stream: back-to-back IP " +
+                          "packets, or a 2 byte length before each (default: %(default)s).")
+    tcp.add_argument("--tcp-flows", type=int, default=DEFAULT_MAX_FLOWS, metavar="N",
+                     help="Most flows tracked at once (default: %(default)s).")
+    tcp.add_argument("--tcp-memory", type=int, default=DEFAULT_TCP_MEMORY // 2 ** 20, metavar="MB",
+                     help="Most stream data buffered across all flows (default: %(default)s MB).")
+    tcp.add_argument("--tcp-idle", type=float, default=DEFAULT_IDLE, metavar="SECONDS",
+                     help="Drop a flow after this much capture time without a segment " +
+                          "(default: %(default)s).")
+    icmp = parser.add_argument_group("ICMP tunnel reordering",
+                                     "Write the packets of each ICMP tunnel (source, destination " +
+                                     "and echo identifier) in sequence number order, dropping " +
+                                     "duplicates. Not available with --jobs or --numpy.")
+    icmp.add_argument("--icmp-reorder", action="store_true",
+                      help="Reorder ICMP tunnel packets.")
+    icmp.add_argument("--icmp-window", type=int, default=DEFAULT_WINDOW, metavar="N",
+                      help="Hold packets up to N sequence numbers early (default: %(default)s).")
+    icmp.add_argument("--icmp-timeout", type=float, default=DEFAULT_REORDER_TIMEOUT,
+                      metavar="SECONDS",
+                      help="Skip a missing packet after waiting this much capture time for it " +
+                           "(default: %(default)s).")
+    icmp.add_argument("--icmp-tunnels", type=int, default=DEFAULT_MAX_TUNNELS, metavar="N",
+                      help="Most tunnels tracked at once (default: %(default)s).")
+    flows = parser.add_argument_group("flow accounting",
+                                      "Count packets, bytes, first and last capture times and " +
+                                      "tunnel overhead per flow (outer and inner 5-tuple), " +
+                                      "heaviest first. Not available with --jobs or --numpy.")
+    flows.add_argument("--flows", metavar="PATH",
+                       help="Write the flow table to PATH.")
+    flows.add_argument("--flows-format", choices=["csv", "json"],
+                       help="The flow table's format (default: json if PATH ends in .json, " +
+                            "otherwise csv).")
+    tolerant = parser.add_argument_group("fault tolerance",
+                                         "Keep going past records that fail to decode, and skip " +
+                                         "ahead past corrupted record lengths in classic pcap " +
+                                         "files. Only available when streaming (not with --jobs, " +
+                                         "--numpy or indexed extraction).")
+    tolerant.add_argument("--keep-going", action="store_true",
+                          help="Pass records that fail to decode through unchanged.")
+    tolerant.add_argument("--quarantine", action="store_true",
+                          help="Write records that fail to decode to quarantine_<name> instead " +
+                               "(implies --keep-going).")
+    follow = parser.add_argument_group("following a live capture",
+                                       "Keep reading the capture as it is written, flushing " +
+                                       "decapsulated packets as they arrive, and move on to the " +
+                                       "next file when it is rotated. Stop with Ctrl-C. Only " +
+                                       "available when streaming an uncompressed capture.")
+    follow.add_argument("--follow", action="store_true",
+                        help="Follow the capture as it grows.")
+    follow.add_argument("--follow-poll", type=float, default=DEFAULT_POLL_INTERVAL,
+                        metavar="SECONDS",
+                        help="How often to look for new data, which bounds the output latency " +
+                             "(default: %(default)s).")
+    follow.add_argument("--follow-idle", type=float, metavar="SECONDS",
+                        help="Stop after this long without new data (default: never).")
+    follow.add_argument("--follow-glob", metavar="PATTERN",
+                        help="The names rotated files match, e.g. 'tunnel-*.pcap' (default: the " +
+                             "capture's name with its digits as wildcards, or with a wildcard " +
+                             "after it if it has none).")
+    filtering = parser.add_argument_group("filtering",
+                                          "Only decapsulate the records that match a filter, " +
+                                          "checked against the raw record before it is parsed. " +
+                                          "Not available with --jobs or --numpy.")
+    filtering.add_argument("--filter", metavar="EXPRESSION",
+                           help="e.g. 'src net 192.0.2.0/24 and (icmp or gre) and len >= 100'. " +
+                                "Primitives: host, net, src, dst, ip, ip6, proto, icmp, tcp, " +
+                                "udp, gre, icmp-type, len, after and before.")
+    filtering.add_argument("--filter-action", choices=["drop", "pass"], default="drop",
+                           help="What happens to records that do not match: left out, or " +
+                                "written unchanged (default: %(default)s).")
+    sharding = parser.add_argument_group("output sharding",
+                                         "Split the output into shards named after it, e.g. " +
+                                         "decap_<name>.0000.pcap, each a complete capture. Not " +
+                                         "available with --jobs, --numpy or stdout.")
+    shard_by = sharding.add_mutually_exclusive_group()
+    shard_by.add_argument("--shard-size", type=float, metavar="MB",
+                          help="Start a new shard once the current one would grow past MB.")
+    shard_by.add_argument("--shard-time", type=int, metavar="SECONDS",
+                          help="Shard by capture time, one shard per SECONDS (named after the " +
+                               "UNIX time it starts at).")
+    shard_by.add_argument("--shard-flows", type=int, metavar="N",
+                          help="Shard by a hash of the inner flow into N shards, so both " +
+                               "directions of a flow share a shard.")
+    sharding.add_argument("--shard-open", type=int, default=DEFAULT_MAX_OPEN, metavar="N",
+                          help="Most shards open at once; others are closed and appended to " +
+                               "later (default: %(default)s).")
+    instrument = parser.add_argument_group("instrumentation",
+                                           "Measure the run. --stats and --progress are not " +
+                                           "available with --jobs or --numpy.")
+    instrument.add_argument("--stats", metavar="PATH",
+                            help="Count packets, bytes and time per stage (read, packet, each " +
+                                 "decoder, decapsulate, write), print them on stderr and write " +
+                                 "them to PATH as JSON.")
+    instrument.add_argument("--progress", type=float, metavar="SECONDS",
+                            help="Print the packets read and the rate every SECONDS on stderr.")
+    instrument.add_argument("--profile", metavar="PATH",
+                            help="Run under cProfile, saving the profile to PATH and listing " +
+                                 "the most expensive functions on stderr.")
+    return parser
+
+
+def parse_args(argv):
+    parser = build_parser()
+    args   = parser.parse_args(argv)
+    args.keep_going = args.keep_going or args.quarantine
+    if args.output is None:
+        if args.pcap == STDIO:
+            args.output = STDIO
+        else:
+            args.output = os.path.join(os.path.dirname(args.pcap),
+                                       "decap_" + os.path.basename(args.pcap))
+    if args.pcap == STDIO and (args.jobs > 1 or args.numpy or args.packet is not None or
+                               args.start or args.end or args.follow):
+        parser.error("--jobs, --numpy, --follow and indexed extraction need a capture file, " +
+                     "not stdin")
+    if args.output == STDIO and args.jobs > 1:
+        parser.error("--jobs needs an output file, not stdout")
+    if args.output == STDIO and sys.stdout.isatty():
+        parser.error("refusing to write a capture to a terminal; redirect stdout or use --output")
+    if args.depth < 0:
+        parser.error("--depth must be 0 or more")
+    if args.packet is not None and args.packet < 0:
+        parser.error("--packet must be 0 or more")
+    for (option, value) in (("--start", args.start), ("--end", args.end)):
+        if value is not None:
+            try:
+                parse_timestamp(value)
+            except Index_Error as error:
+                parser.error(option + ": " + str(error))
+    if args.numpy and args.format == "pcapng":
+        parser.error("--numpy writes classic pcap records and cannot be combined with " +
+                     "--format pcapng")
+    if ((args.reassemble or args.tcp_ports or args.icmp_reorder or args.flows) and
+            (args.jobs > 1 or args.numpy)):
+        parser.error("--reassemble, --tcp-ports, --icmp-reorder and --flows cannot be combined " +
+                     "with --jobs or --numpy")
+    if args.keep_going and (args.jobs > 1 or args.numpy or args.packet is not None or
+                            args.start or args.end):
+        parser.error("--keep-going and --quarantine cannot be combined with --jobs, --numpy or " +
+                     "indexed extraction")
+    if args.follow and (args.jobs > 1 or args.numpy or args.packet is not None or args.start or
+                        args.end):
+        parser.error("--follow cannot be combined with --jobs, --numpy or indexed extraction")
+    if args.follow and args.follow_poll <= 0:
+        parser.error("--follow-poll must be more than 0")
+    if (args.stats or args.progress) and (args.jobs > 1 or args.numpy):
+        parser.error("--stats and --progress cannot be combined with --jobs or --numpy")
+    if args.progress is not None and args.progress <= 0:
+        parser.error("--progress must be more than 0")
+    args.packet_filter = None
+    if args.filter:
+        if args.jobs > 1 or args.numpy:
+            parser.error("--filter cannot be combined with --jobs or --numpy")
+        try:
+            args.packet_filter = Packet_Filter(args.filter)
+        except Filter_Error as error:
+            parser.error("--filter: " + str(error))
+    (args.shard_by, args.shard_limit) = (None, None)
+    if args.shard_size is not None:
+        (args.shard_by, args.shard_limit) = ("size", int(args.shard_size * 2 ** 20))
+    elif args.shard_time is not None:
+        (args.shard_by, args.shard_limit) = ("time", args.shard_time)
+    elif args.shard_flows is not None:
+        (args.shard_by, args.shard_limit) = ("flow", args.shard_flows)
+    if args.shard_by is not None:
+        if args.jobs > 1 or args.numpy or args.output == STDIO:
+            parser.error("--shard-size, --shard-time and --shard-flows cannot be combined with " +
+                         "--jobs, --numpy or stdout")
+        if args.shard_limit < 1:
+            parser.error("--shard-size, --shard-time and --shard-flows must be more than 0")
+        if args.shard_open < 1:
+            parser.error("--shard-open must be at least 1")
+    if args.flows and not args.flows_format:
+        args.flows_format = "json" if args.flows.lower().endswith(".json") else "csv"
+    if not 0 < args.icmp_window < 2 ** 15:
+        parser.error("--icmp-window must be between 1 and 32767")
+    # Everything but the streaming path memory-maps the capture, which needs it uncompressed and
+    # in classic pcap, and a compressed stream cannot be followed while it is being written
+    mapped = args.jobs > 1 or args.numpy or args.packet is not None or args.start or args.end
+    if mapped or args.follow:
+        with io.open(args.pcap, "rb") as in_file:
+            magic = peek(in_file, len(MAGIC_XZ))[0]
+        if detect_compression(magic):
+            parser.error("--jobs, --numpy, --follow and indexed extraction need an " +
+                         "uncompressed capture")
+        if mapped and magic.startswith(SHB_MAGIC):
+            parser.error("--jobs, --numpy and indexed extraction need a classic pcap capture, " +
+                         "not pcapng")
+    return args
+
+
+def reassemble(args, packets):
+    """ Passes ``packets`` through IPv4 fragment reassembly (``--reassemble``), TCP stream
+    reassembly (``--tcp-ports``) and ICMP tunnel reordering (``--icmp-reorder``), reporting their
+    counters on stderr once the capture is done. Flow accounting (``--flows``) comes last, so it
+    counts the packets as written. With ``--stats`` or ``--progress`` the packets read are counted
+    first.
+    """
+    fragments = tcp = icmp = flows = None
+    if args.run_stats is not None:
+        packets = args.run_stats.read(packets)
+    if args.reassemble:
+        fragments = Fragment_Reassembler(args.packet_class, args.frag_memory * 2 ** 20,
+                                         args.frag_timeout)
+        packets   = fragments.reassemble(packets)
+    if args.tcp_ports:
+        # The TCP stream is one layer; packets inside it get whatever depth is left
+        if args.depth == 1:
+            inner_class = Reframed_Packet
+        else:
+            inner_class = functools.partial(Tunnel_Packet, depth=max(args.depth - 1, 0))
+        tcp     = TCP_Reassembler(args.tcp_ports, args.tcp_framing, inner_class, args.tcp_flows,
+                                  args.tcp_memory * 2 ** 20, idle=args.tcp_idle)
+        packets = tcp.reassemble(packets)
+    if args.icmp_reorder:
+        icmp    = ICMP_Reorderer(args.icmp_window, args.icmp_timeout,
+                                 max_tunnels=args.icmp_tunnels)
+        packets = icmp.reorder(packets)
+    if args.flows:
+        flows   = Flow_Table()
+        packets = flows.account(packets)
     for packet in packets:
-        decap_bytes += packet.decapsulate()
-    filepath = os.path.join(os.path.dirname(sys.argv[1]), "decap_" + os.path.basename(sys.argv[1]))
-    with open(filepath, "wb") as file:
-        file.write(decap_bytes)
+        yield packet
+    if fragments is not None:
+        sys.stderr.write("Fragments: %d seen, %d datagrams reassembled; %d evicted, %d timed out, "
+                         "%d incomplete and %d longer than the snaplen written unchanged\n" %
+                         (fragments.fragments, fragments.reassembled, fragments.evicted,
+                          fragments.timed_out, fragments.incomplete, fragments.oversized))
+    if tcp is not None:
+        sys.stderr.write("TCP: %d segments, %d inner packets; %d retransmitted, %d out of order, "
+                         "%d dropped; %d flows desynced, %d evicted, %d timed out; %d buffered "
+                         "bytes discarded, %d packets snapped to the snaplen\n" %
+                         (tcp.segments, tcp.packets, tcp.retransmitted, tcp.out_of_order,
+                          tcp.dropped, tcp.desynced, tcp.evicted, tcp.timed_out, tcp.discarded,
+                          tcp.snapped))
+    if icmp is not None:
+        sys.stderr.write("ICMP: %d packets reordered, %d duplicates dropped, %d arrived late, "
+                         "%d more than a window late; %d sequence numbers skipped, %d tunnels "
+                         "evicted\n" % (icmp.reordered, icmp.duplicates, icmp.late, icmp.stale,
+                                         icmp.skipped, icmp.evicted))
+    if flows is not None:
+        with open(args.flows, "wb") as flows_file:
+            if args.flows_format == "json":
+                flows.write_json(flows_file)
+            else:
+                flows.write_csv(flows_file)
+        sys.stderr.write("Flows: %d written to %s; %d packets were not IP\n" %
+                         (len(flows), args.flows, flows.skipped))
+
+
+def instrument(args, writer):
+    """ Times ``writer`` as the write stage, with ``--stats``.
+    """
+    if args.run_stats is not None:
+        args.run_stats.writer(writer)
+
+
+def report(args):
+    """ Prints the records matched by ``--filter``, and the totals and stages counted with
+    ``--stats`` or ``--progress``, writing those to the ``--stats`` file.
+    """
+    packet_filter = args.packet_filter
+    if packet_filter is not None:
+        sys.stderr.write("Filter: %d records matched, %d %s\n" %
+                         (packet_filter.matched, packet_filter.rejected,
+                          "dropped" if args.filter_action == "drop" else
+                          "passed through unchanged"))
+    stats = args.run_stats
+    if stats is None:
+        return
+    stats.stop()
+    stats.print_report()
+    if args.stats:
+        with open(args.stats, "wb") as stats_file:
+            stats.write_json(stats_file)
+
+
+def open_source(path):
+    """ Opens the capture at ``path``, or stdin if it is ``-``. stdin is read in large chunks
+    and only ever peeked at, never seeked.
+    """
+    if path == STDIO:
+        return io.open(sys.stdin.fileno(), "rb", buffering=PIPE_BUFFER, closefd=False)
+    return io.open(path, "rb")
+
+
+def open_destination(path, threaded=False):
+    """ Opens ``path`` for the decapsulated capture (see :func:`compression.open_output`), or
+    stdout if it is ``-``.
+    """
+    if path == STDIO:
+        return io.open(sys.stdout.fileno(), "wb", buffering=PIPE_BUFFER, closefd=False)
+    return open_output(path, threaded)
+
+
+@contextlib.contextmanager
+def open_writer(args, path, writer_class, pcap_header, threaded=False):
+    """ Opens ``writer_class`` over :func:`open_destination`, or a
+    :class:`~shards.Sharded_Writer` with ``--shard-*``, and closes both when done.
+
+    :rtype:   (writer, file-like object or None)
+    :returns: The writer and the file it writes to, which is None for shards.
+    """
+    if args.shard_by is None:
+        with open_destination(path, threaded) as out_file:
+            with writer_class(out_file, pcap_header) as writer:
+                yield (writer, out_file)
+        return
+    with Sharded_Writer(path, pcap_header, args.shard_by, args.shard_limit, args.shard_open,
+                        writer_class, threaded) as writer:
+        yield (writer, None)
+    sys.stderr.write("Shards: %d written to %s; %d reopened\n" %
+                     (len(writer.paths), os.path.dirname(path) or ".", writer.reopened))
+
+
+def keep_going(args, reader, records):
+    """ Builds the packets of ``records`` with a :class:`~tolerant.Tolerant_Decoder`
+    (``--keep-going``), diverting bad records to quarantine_<name> with ``--quarantine``, and
+    reports its counters on stderr once the capture is done.
+    """
+    quarantine = None
+    if args.quarantine:
+        if args.pcap == STDIO:
+            path = "quarantine.pcap"
+        else:
+            path = os.path.join(os.path.dirname(args.pcap),
+                                "quarantine_" + os.path.basename(args.pcap))
+        quarantine_file = open_output(path, args.io_threads)
+        quarantine      = PCAP_Writer(quarantine_file, reader.pcap_header)
+    decoder = Tolerant_Decoder(args.packet_class, quarantine)
+    try:
+        for packet in decoder.decode(records):
+            yield packet
+    finally:
+        if quarantine is not None:
+            quarantine.close()
+            quarantine_file.close()
+    errors = ", ".join("%d %s" % (count, name) for (name, count) in sorted(decoder.errors.items()))
+    sys.stderr.write("Errors: %s; %d records quarantined, %d dropped\n" %
+                     (errors or "none", decoder.quarantined, decoder.dropped))
+    if getattr(reader, "resync", False):
+        sys.stderr.write("Resynced %d times, skipping %d bytes\n" %
+                         (reader.resyncs, reader.skipped_bytes))
+    if decoder.stopped:
+        sys.stderr.write("Stopped early: %s\n" % decoder.stopped)
+
+
+def decode(args, reader, records):
+    """ Builds the packets of ``records``, dropping the records that do not match ``--filter`` and
+    keeping going past those that fail to decode with ``--keep-going``.
+    """
+    if args.packet_filter is not None and args.filter_action == "drop":
+        records = args.packet_filter.select(records)
+    if args.keep_going:
+        return keep_going(args, reader, records)
+    return (args.packet_class(pcap_header, record) for (pcap_header, record) in records)
+
+
+def iter_followed(args, reader, files, writer_class):
+    """ Yields ``(pcap_header, record)`` for every record of ``reader``'s file, and then of each
+    file the capture is rotated to. A file that ends in a broken record is reported and left
+    behind, rather than ending the run.
+    """
+    first = reader.pcap_header
+    while True:
+        if writer_class is PCAPNG_Writer and reader.format == "pcapng":
+            records = reader.iter_records()
+        else:
+            records = reader.iter_classic_records()
+        try:
+            for record in records:
+                yield record
+        except (Reader_Error, PCAPNG_Error) as error:
+            sys.stderr.write("Skipping the rest of the capture file: %s\n" % error)
+        growing_file = next(files, None)
+        if growing_file is None:
+            return
+        reader = open_reader(growing_file, resync=args.keep_going)
+        # Every classic record is written under the first file's header
+        if writer_class is PCAP_Writer and (reader.pcap_header.network != first.network or
+                                            reader.pcap_header.codec is not first.codec):
+            raise Follow_Error("The capture was rotated to a file with a different link type " +
+                               "or timestamp resolution")
+
+
+def decapsulate_following(args, filepath):
+    """ Decapsulates a capture while it is being written (``--follow``). The output is flushed
+    whenever the follower waits for more data, so it lags the capture by about ``--follow-poll``.
+    """
+    follower = Follower(args.pcap, args.follow_glob, args.follow_poll, args.follow_idle,
+                        exclude=[filepath])
+    files    = follower.files()
+    reader   = open_reader(next(files), resync=args.keep_going)
+    if (args.format or reader.format) == "pcapng":
+        writer_class = PCAPNG_Writer
+    else:
+        writer_class = PCAP_Writer
+    packets = decode(args, reader, iter_followed(args, reader, files, writer_class))
+    with open_writer(args, filepath, writer_class, reader.pcap_header) as (writer, out_file):
+        instrument(args, writer)
+        def flush():
+            writer.flush()
+            if out_file is not None:
+                out_file.flush()
+        follower.on_idle = flush
+        try:
+            for packet in reassemble(args, packets):
+                writer.write_packet(packet)
+        except KeyboardInterrupt:
+            pass
+    sys.stderr.write("Followed %d rotations\n" % follower.rotations)
+
+
+def decapsulate_indexed(args, filepath):
+    """ Decapsulates the packets selected by ``--packet``/``--start``/``--end`` by seeking straight
+    to them through the sidecar index.
+    """
+    with open(args.pcap, "rb") as in_file:
+        with PCAP_MMap_Reader(in_file) as reader:
+            index = Record_Index.for_capture(reader, args.pcap, args.reindex)
+            if args.packet is not None:
+                if not 0 <= args.packet < len(index):
+                    raise Index_Error("Packet " + str(args.packet) + " is out of range. The " +
+                                      "capture has " + str(len(index)) + " packets")
+                (first, last) = (args.packet, args.packet + 1)
+            else:
+                nanosecond = reader.pcap_header.codec.nanosecond
+                start      = parse_timestamp(args.start or "0", nanosecond)
+                end        = (parse_timestamp(args.end, nanosecond) if args.end else None)
+                first      = index.bisect_time(*start)
+                last       = index.bisect_time(*end) if end else len(index)
+            predicate = None
+            if args.packet_filter is not None and args.filter_action == "drop":
+                predicate = functools.partial(args.packet_filter.matches, reader.pcap_header)
+            packets = index.iter_packets(reader, first, last, args.packet_class, predicate)
+            writer_class = PCAPNG_Writer if args.format == "pcapng" else PCAP_Writer
+            with open_writer(args, filepath, writer_class, reader.pcap_header,
+                             args.io_threads) as (writer, _):
+                instrument(args, writer)
+                for packet in reassemble(args, packets):
+                    writer.write_packet(packet)
+
+
+def main(args):
+    filepath          = args.output
+    args.packet_class = functools.partial(Tunnel_Packet, depth=args.depth)
+    args.run_stats    = None
+    if args.stats or args.progress:
+        args.run_stats    = Run_Stats(timing=bool(args.stats), progress=args.progress)
+        args.packet_class = functools.partial(args.run_stats.packet_class(Tunnel_Packet),
+                                              depth=args.depth)
+    if args.packet_filter is not None and args.filter_action == "pass":
+        args.packet_class = args.packet_filter.packet_class(args.packet_class)
+    if args.packet is not None or args.start or args.end:
+        decapsulate_indexed(args, filepath)
+        report(args)
+        return
+    if args.jobs > 1:
+        writer_class = PCAPNG_Writer if args.format == "pcapng" else PCAP_Writer
+        decapsulate_parallel(args.pcap, filepath, args.jobs, depth=args.depth,
+                             writer_class=writer_class, threaded=args.io_threads)
+        return
+    if args.numpy:
+        with open(args.pcap, "rb") as in_file:
+            with PCAP_MMap_Reader(in_file) as reader:
+                with open_writer(args, filepath, PCAP_Writer, reader.pcap_header,
+                                 args.io_threads) as (writer, _):
+                    NumPy_Decapsulator(reader, depth=args.depth).write(writer)
+        return
+    if args.follow:
+        decapsulate_following(args, filepath)
+        report(args)
+        return
+    # Stream the capture one record at a time, writing each decapsulated packet as we go
+    # Compressed captures are decompressed on the fly, and decap_<name>.gz is compressed again
+    with open_source(args.pcap) as raw_file:
+        in_file = open_input(raw_file, args.io_threads)
+        reader  = open_reader(in_file, resync=args.keep_going)
+        if (args.format or reader.format) == "pcapng":
+            (writer_class, packets) = (PCAPNG_Writer, reader.iter_packets(args.packet_class))
+        else:
+            (writer_class, packets) = (PCAP_Writer, reader.iter_classic_packets(args.packet_class))
+        if args.keep_going or args.packet_filter is not None:
+            if writer_class is PCAPNG_Writer and reader.format == "pcapng":
+                records = reader.iter_records()
+            else:
+                records = reader.iter_classic_records()
+            packets = decode(args, reader, records)
+        with open_writer(args, filepath, writer_class, reader.pcap_header,
+                         args.io_threads) as (writer, _):
+            instrument(args, writer)
+            for packet in reassemble(args, packets):
+                writer.write_packet(packet)
+    report(args)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    try:
+        if args.profile:
+            run_profiled(args.profile, main, args)
+        else:
+            main(args)
+    except Index_Error as error:
+        # Only known once the capture is indexed, e.g. --packet past the last packet
+        build_parser().error(str(error))
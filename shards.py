@@ -0,0 +1,218 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+Splits the decapsulated output across many smaller captures (shards), so that a long capture can be
+handed to tools that choke on one huge file, or processed a piece at a time. A new shard is started
+once the current one reaches a size, for every interval of capture time, or for each of a fixed
+number of flow buckets, so that every packet of an inner flow (in both directions) lands in the
+same shard. Each shard is a complete capture with its own copy of the PCAP Global Header.
+
+Time and flow sharding can have many shards in use at once, so only the ``max_open`` most recently
+written are kept open. A shard that is written to again after being closed is reopened and appended
+to, without a second global header (a compressed shard gets a second stream, which every reader of
+gzip, bz2 and xz concatenates).
+
+.. example::
+
+    ``` python
+    with Sharded_Writer("decap_x.pcap", reader.pcap_header, "flow", 16) as writer:
+        for packet in reader.iter_classic_packets():
+            writer.write_packet(packet)
+    # decap_x.00.pcap to decap_x.15.pcap
+    ```
+"""
+
+##
+# Python Imports
+import os
+import zlib
+import collections
+
+##
+# Project Imports
+from writer        import PCAP_Writer
+from compression   import open_output, EXTENSIONS
+from header_packet import HEADER_LENGTH_PACKET
+from flows         import TUPLE, five_tuple, inner_tuple
+
+##
+# Error Handling
+from errors import GenericException
+class Shard_Error(GenericException):
+    """ Errors relating to sharded output.
+    """
+    pass
+
+##
+# Global Variables
+SHARD_BY         = ("size", "time", "flow")
+DEFAULT_MAX_OPEN = 64               # Shards kept open at once
+SIZE_DIGITS      = 4                # Size shards are numbered decap_x.0000.pcap onwards
+
+
+def shard_path(path, label):
+    """ The path of the shard ``label`` of ``path``, with the label before the capture's extension
+    and any compression extension (``decap_x.pcap.gz`` becomes ``decap_x.<label>.pcap.gz``).
+    """
+    (stem, extension) = os.path.splitext(path)
+    if extension.lower() in EXTENSIONS:
+        (stem, inner_extension) = os.path.splitext(stem)
+        extension               = inner_extension + extension
+    return stem + "." + label + extension
+
+
+def flow_hash(packet):
+    """ Hashes the flow of ``packet``: the packet tunnelled inside it if there is one, otherwise the
+    packet itself. Both directions of a flow hash the same, and the hash is the same from one run
+    to the next.
+
+    :rtype:   int
+    :returns: A non-negative hash, or 0 if the packet carries no IP.
+    """
+    packed = inner_tuple(packet)
+    if packed is None:
+        data   = packet.data
+        packed = five_tuple(packet.packet_header.pcap_header.network, data, 0, len(data))
+        if packed is None:
+            return 0
+    (version, src_ip, dst_ip, protocol, src_port, dst_port) = TUPLE.unpack(packed)
+    if (src_ip, src_port) > (dst_ip, dst_port):
+        packed = TUPLE.pack(version, dst_ip, src_ip, protocol, dst_port, src_port)
+    return zlib.crc32(packed) & 0xffffffff
+
+
+class Sharded_Writer(object):
+    """ Writes decapsulated packets to a set of shards of ``path`` instead of one capture. Takes
+    the place of a :class:`~writer.PCAP_Writer` (``write_packet()``, ``flush()``, ``close()``), but
+    opens, and closes, the shard files itself.
+
+    :type by: str
+    :ivar by: What starts a new shard: ``size``, ``time`` or ``flow``.
+
+    :type limit: int
+    :ivar limit: The most bytes in a shard (``size``), the seconds of capture time in each shard
+        (``time``) or the number of shards (``flow``). A size shard always takes at least one
+        record, however big, and counts records as classic pcap records.
+
+    :ivar int max_open: The most shards open at once.
+    :ivar writer_class: :class:`~writer.PCAP_Writer` or :class:`~pcapng.PCAPNG_Writer`.
+    :ivar paths: The path of every shard, by shard, in the order they were started.
+    :ivar int packet_count: The number of records written so far.
+    :ivar int reopened: The number of times a shard was closed to stay within ``max_open`` and then
+        written to again.
+    """
+    def __init__(self, path, pcap_header, by, limit, max_open=DEFAULT_MAX_OPEN,
+                 writer_class=PCAP_Writer, threaded=False):
+        if by not in SHARD_BY:
+            raise Shard_Error("Shards must be split by " + ", ".join(SHARD_BY) + ", received '" +
+                              str(by) + "'")
+        if limit < 1:
+            raise Shard_Error("The " + by + " limit must be at least 1, received " + str(limit))
+        if max_open < 1:
+            raise Shard_Error("max_open must be at least 1, received " + str(max_open))
+        self.path         = path
+        self.pcap_header  = pcap_header
+        self.by           = by
+        self.limit        = limit
+        self.max_open     = max_open
+        self.writer_class = writer_class
+        self.threaded     = threaded
+        self.open         = collections.OrderedDict()   # Open writers, least recently used first
+        self.paths        = collections.OrderedDict()
+        self.packet_count = 0
+        self.reopened     = 0
+        self.closed       = False
+        self.shard        = 0                           # The current size shard
+        self.shard_bytes  = 0
+        self.digits       = len(str(limit - 1)) if by == "flow" else SIZE_DIGITS
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def shard_for(self, packet):
+        """ The shard ``packet`` belongs in, starting a new size shard if it would not fit.
+
+        :rtype: int
+        """
+        if self.by == "time":
+            return packet.packet_header.ts_sec // self.limit * self.limit
+        if self.by == "flow":
+            return flow_hash(packet) % self.limit
+        length = HEADER_LENGTH_PACKET + packet.decap_length
+        if self.shard_bytes + length > self.limit and self.shard in self.paths:
+            # Size shards are only ever written in order, so the full one is done with
+            self.close_shard(self.shard)
+            self.shard      += 1
+            self.shard_bytes = 0
+        if not self.shard_bytes:
+            self.shard_bytes = len(self.pcap_header.raw_bytes)
+        self.shard_bytes += length
+        return self.shard
+
+
+    def writer(self, shard):
+        """ The open writer of ``shard``, opening (or reopening) it if needed and closing the least
+        recently used shard if that would make too many open.
+
+        :rtype: :class:`~writer.PCAP_Writer`
+        """
+        writer = self.open.pop(shard, None)
+        if writer is None:
+            if len(self.open) >= self.max_open:
+                self.close_shard(next(iter(self.open)))
+            path = self.paths.get(shard)
+            if path is None:
+                label  = str(shard) if self.by == "time" else str(shard).zfill(self.digits)
+                path   = self.paths[shard] = shard_path(self.path, label)
+                writer = self.writer_class(open_output(path, self.threaded), self.pcap_header)
+            else:
+                self.reopened += 1
+                writer = self.writer_class(open_output(path, self.threaded, append=True),
+                                           self.pcap_header, header=False)
+        self.open[shard] = writer
+        return writer
+
+
+    def write_packet(self, packet):
+        """ Appends the decapsulated form of ``packet`` to its shard.
+
+        :type packet: :class:`~packet_tunnel.Tunnel_Packet`
+        """
+        if self.closed:
+            raise Shard_Error("Cannot write to a closed Sharded_Writer")
+        self.writer(self.shard_for(packet)).write_packet(packet)
+        self.packet_count += 1
+
+
+    def flush(self):
+        """ Writes every open shard's buffered bytes out to its file.
+        """
+        for writer in self.open.values():
+            writer.flush()
+            writer.fileobj.flush()
+
+
+    def close_shard(self, shard):
+        writer = self.open.pop(shard, None)
+        if writer is not None:
+            writer.close()
+            writer.fileobj.close()
+
+
+    def close(self):
+        """ Closes every open shard. A capture with no packets still gets one, empty, shard.
+        """
+        if self.closed:
+            return
+        if not self.paths:
+            self.writer(0)
+        for shard in list(self.open):
+            self.close_shard(shard)
+        self.closed = True
@@ -0,0 +1,289 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+Instrumentation for a decapsulation run: packets, bytes and time per stage, periodic progress lines
+and an optional cProfile of the whole run.
+
+Nothing here touches the hot path unless it is switched on. Stages are timed by wrapping the
+callables that make them up: the reader's iterator, the packet class, each decoder of a copy of the
+packet class's :class:`~decoders.Decoder_Registry`, ``decapsulate_parts()`` and the writer's
+``write_packet()``. A run without instrumentation runs exactly the code it always did.
+
+Time is counted against the innermost stage running, so a stage's time excludes the stages it calls
+(e.g. ``ipv4`` excludes the ``icmp`` decoder it dispatches to) and the stage times add up.
+"""
+
+##
+# Python Imports
+import sys
+import json
+import pstats
+import timeit
+import cProfile
+import collections
+
+##
+# Project Imports
+
+##
+# Error Handling
+from errors import GenericException
+class Stats_Error(GenericException):
+    """ Errors relating to run instrumentation.
+    """
+    pass
+
+##
+# Global Variables
+PROFILE_LINES = 25      # Functions listed in the profile summary on stderr
+
+
+class Stage(object):
+    """ The counters of one stage.
+
+    :ivar int packets: The number of times the stage ran (once per packet, or per layer for a
+        decoder).
+    :ivar int bytes: The bytes the stage was handed.
+    :ivar float seconds: The time spent in the stage itself, not counting the stages it called.
+    """
+    __slots__ = ("packets", "bytes", "seconds")
+
+
+    def __init__(self):
+        self.packets = 0
+        self.bytes   = 0
+        self.seconds = 0.0
+
+
+class Run_Stats(object):
+    """ Counts packets, bytes and time per stage of a run, and reports its progress.
+
+    .. example::
+
+        ``` python
+        stats        = Run_Stats(timing=True, progress=5)
+        packet_class = stats.packet_class(Tunnel_Packet)
+        writer       = stats.writer(PCAP_Writer(out_file, reader.pcap_header))
+        for packet in stats.read(reader.iter_classic_packets(packet_class)):
+            writer.write_packet(packet)
+        stats.write_json(stats_file)
+        ```
+
+    :type timing: bool
+    :ivar timing: Time each stage. Without it only the packets read are counted.
+
+    :type progress: float or None
+    :ivar progress: Seconds between progress lines on ``stream``, or None for none.
+
+    :ivar stages: The :class:`Stage` of each stage name, in the order they first ran.
+    :ivar int packets: The packets read.
+    :ivar int bytes: The bytes read.
+    """
+    def __init__(self, timing=True, progress=None, stream=sys.stderr):
+        if progress is not None and progress <= 0:
+            raise Stats_Error("progress must be more than 0 seconds, received " + str(progress))
+        self.timing     = timing
+        self.progress   = progress
+        self.stream     = stream
+        self.stages     = collections.OrderedDict()
+        self.running    = []        # Time taken by the stages called from each running stage
+        self.packets    = 0
+        self.bytes      = 0
+        self.started    = timeit.default_timer()
+        self.finished   = None
+        self.next_line  = self.started + (progress or 0)
+        if timing:
+            # Report the stages from the outside in, whatever order they are wrapped in
+            self.stage("read")
+            self.stage("packet")
+
+
+    def stage(self, name):
+        """ The :class:`Stage` called ``name``, added if it is new.
+        """
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = Stage()
+        return stage
+
+
+    ##
+    # Instrumenting
+    def timed(self, name, func, size=None):
+        """ Wraps ``func`` so that each call is counted against the stage ``name``.
+
+        :param size: Called as ``size(args, result)`` to give the bytes a call handled, or None.
+        :rtype:      callable
+        """
+        stage   = self.stage(name)
+        running = self.running
+        timer   = timeit.default_timer
+        def timed_call(*args, **kwargs):
+            started = timer()
+            running.append(0.0)
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                elapsed = timer() - started
+                called  = running.pop()
+                if running:
+                    running[-1] += elapsed
+                stage.seconds += elapsed - called
+                stage.packets += 1
+            if size is not None:
+                stage.bytes += size(args, result)
+            return result
+        return timed_call
+
+
+    def registry(self, registry):
+        """ Returns a copy of ``registry`` with every decoder timed as a stage named after it
+        (``decode_ipv4`` becomes ``ipv4``).
+
+        :rtype: :class:`~decoders.Decoder_Registry`
+        """
+        timed_registry = registry.copy()
+        size           = lambda args, result: args[3] - args[2]
+        for table in (timed_registry.link_types, timed_registry.ether_types,
+                      timed_registry.ip_protocols, timed_registry.udp_ports):
+            for (key, decoder) in table.items():
+                name       = getattr(decoder, "__name__", str(key)).replace("decode_", "", 1)
+                table[key] = self.timed(name, decoder, size)
+        return timed_registry
+
+
+    def packet_class(self, base):
+        """ Returns a callable building ``base`` packets (e.g.
+        :class:`~packet_tunnel.Tunnel_Packet`) whose construction, decoders and
+        ``decapsulate_parts()`` are timed. Construction, less the decoders, is the ``packet``
+        stage: the Packet Header and the walk over the link-layer headers.
+        """
+        if not self.timing:
+            return base
+        timed_class = type("Timed_" + base.__name__, (base,), {
+            "registry":          self.registry(base.registry),
+            "decapsulate_parts": self.timed("decapsulate", base.decapsulate_parts)})
+        return self.timed("packet", timed_class, lambda args, packet: len(packet.bytes))
+
+
+    def writer(self, writer):
+        """ Times ``writer.write_packet()``, less ``decapsulate_parts()``, as the ``write`` stage.
+
+        :returns: ``writer``
+        """
+        if self.timing:
+            writer.write_packet = self.timed("write", writer.write_packet)
+        return writer
+
+
+    def read(self, packets):
+        """ Yields every packet of ``packets``, counting them and timing the reader itself (less
+        building the packets) as the ``read`` stage. Prints a progress line every ``progress``
+        seconds.
+
+        :rtype: generator of packets
+        """
+        packets = iter(packets)
+        stage   = self.stage("read") if self.timing else None
+        running = self.running
+        timer   = timeit.default_timer
+        while True:
+            started = timer()
+            running.append(0.0)
+            try:
+                packet = next(packets)
+            except StopIteration:
+                return
+            finally:
+                now    = timer()
+                called = running.pop()
+                if stage is not None:
+                    stage.seconds += now - started - called
+            self.packets += 1
+            self.bytes   += len(packet.bytes)
+            if stage is not None:
+                stage.packets += 1
+                stage.bytes   += len(packet.bytes)
+            if self.progress is not None and now >= self.next_line:
+                self.next_line = now + self.progress
+                self.print_progress(now)
+            yield packet
+
+
+    ##
+    # Reporting
+    def stop(self):
+        """ Ends the run's clock, once everything has been written.
+        """
+        if self.finished is None:
+            self.finished = timeit.default_timer()
+
+
+    def print_progress(self, now):
+        elapsed = max(now - self.started, 1e-9)
+        self.stream.write("%.1fs: %d packets, %.1f MB read (%.0f packets/s, %.2f MB/s)\n" %
+                          (elapsed, self.packets, self.bytes / 1e6, self.packets / elapsed,
+                           self.bytes / 1e6 / elapsed))
+
+
+    def report(self):
+        """ The run's totals and, if ``timing``, its stages.
+
+        :rtype: dict
+        """
+        seconds = max((self.finished or timeit.default_timer()) - self.started, 1e-9)
+        report  = collections.OrderedDict([
+            ("seconds",         round(seconds, 6)),
+            ("packets",         self.packets),
+            ("bytes",           self.bytes),
+            ("packets_per_sec", round(self.packets / seconds, 1)),
+            ("mb_per_sec",      round(self.bytes / 1e6 / seconds, 3))])
+        if self.timing:
+            stages = collections.OrderedDict()
+            for (name, stage) in self.stages.items():
+                if not stage.packets:
+                    continue
+                stages[name] = collections.OrderedDict([
+                    ("packets", stage.packets),
+                    ("bytes",   stage.bytes),
+                    ("seconds", round(stage.seconds, 6)),
+                    ("share",   round(stage.seconds / seconds, 4))])
+            report["stages"]        = stages
+            report["other_seconds"] = round(seconds - sum(stage.seconds for stage in
+                                                          self.stages.values()), 6)
+        return report
+
+
+    def print_report(self):
+        """ Writes the totals, then each stage's share of the run, to ``stream``.
+        """
+        report = self.report()
+        self.stream.write("Read %d packets, %.1f MB in %.2fs (%.0f packets/s, %.2f MB/s)\n" %
+                          (report["packets"], report["bytes"] / 1e6, report["seconds"],
+                           report["packets_per_sec"], report["mb_per_sec"]))
+        for (name, stage) in report.get("stages", {}).items():
+            self.stream.write("  %-12s %10d calls %9.3fs %6.1f%%\n" %
+                              (name, stage["packets"], stage["seconds"], stage["share"] * 100))
+        if "other_seconds" in report:
+            self.stream.write("  %-12s %16s %9.3fs\n" % ("other", "", report["other_seconds"]))
+
+
+    def write_json(self, fileobj):
+        json.dump(self.report(), fileobj, indent=1, separators=(",", ": "))
+        fileobj.write("\n")
+
+
+def run_profiled(path, func, *args):
+    """ Runs ``func(*args)`` under cProfile, saving the profile to ``path`` (for ``pstats`` or a
+    viewer such as snakeviz) and listing the most expensive functions on stderr.
+
+    :returns: Whatever ``func`` returns.
+    """
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(func, *args)
+    finally:
+        profile.dump_stats(path)
+        summary = pstats.Stats(profile, stream=sys.stderr)
+        summary.sort_stats("cumulative").print_stats(PROFILE_LINES)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+Writes deterministic synthetic captures for benchmarking and testing: the same arguments (and seed)
+always give a byte-for-byte identical file. The packet count, frame size distribution, byte order,
+timestamp resolution and mix of tunnel types are all configurable.
+
+.. example::
+
+    ``` bash
+    python synthetic.py bench.pcap --packets 1000000 --sizes imix --mix icmp=4,gre=2,vxlan=1
+    ```
+"""
+
+##
+# Fix Path
+import __init__
+
+##
+# Python Imports
+import sys
+import random
+import struct
+import argparse
+
+##
+# Project Imports
+from codec          import PCAP_Codec, ETHERNET, INTERNET, ICMP, UDP, GRE
+from lib            import internet_checksum
+from decoders       import LINKTYPE_ETHERNET, PROTO_IPIP, PROTO_GRE, PORT_VXLAN, VXLAN_FLAG_VNI
+from frame_ethernet import ETHERTYPE_IPV4
+from frame_protocol import PROTO_ICMP, PROTO_UDP
+
+##
+# Error Handling
+from errors import GenericException
+class Synthetic_Error(GenericException):
+    """ Errors relating to generating synthetic captures.
+    """
+    pass
+
+##
+# Global Variables
+TUNNEL_KINDS = ("plain", "icmp", "ipip", "gre", "vxlan")   # plain is an untunnelled UDP packet
+DEFAULT_MIX  = "icmp=4,ipip=1,gre=2,vxlan=1,plain=2"
+DEFAULT_SIZE = "imix"
+IMIX         = ((64, 7), (576, 4), (1500, 1))               # (frame length, weight)
+START_TIME   = 1500000000
+INTERVAL     = 10000                                        # Microseconds between packets
+NUM_HOSTS    = 256                                          # Inner hosts, so flows repeat
+SNAPLEN      = 65535
+VXLAN        = struct.Struct("!B3xI")                       # flags, VNI << 8
+MAC_A        = "\x00\x11\x22\x33\x44\x55"
+MAC_B        = "\x66\x77\x88\x99\xaa\xbb"
+OUTER_SRC    = "\xc0\x00\x02\x01"                           # 192.0.2.1 and 2 (TEST-NET-1)
+OUTER_DST    = "\xc0\x00\x02\x02"
+
+
+def parse_sizes(spec):
+    """ Parses a frame size distribution: ``imix``, ``fixed:N`` or ``uniform:MIN-MAX``.
+
+    :rtype:   callable
+    :returns: Called with a ``random.Random``, returns a frame length.
+    """
+    try:
+        if spec == "imix":
+            choices = [length for (length, weight) in IMIX for _ in xrange(weight)]
+            return lambda rng: rng.choice(choices)
+        (kind, _, value) = spec.partition(":")
+        if kind == "fixed":
+            length = int(value)
+            return lambda rng: length
+        if kind == "uniform":
+            (low, high) = [int(part) for part in value.split("-")]
+            if low <= high:
+                return lambda rng: rng.randint(low, high)
+    except ValueError:
+        pass
+    raise Synthetic_Error("Size distribution must be imix, fixed:N or uniform:MIN-MAX, " +
+                          "received '" + spec + "'")
+
+
+def parse_mix(spec):
+    """ Parses a tunnel mix such as ``icmp=4,gre=1``: each kind of ``TUNNEL_KINDS`` with its
+    weight.
+
+    :rtype: list of str
+    :returns: Every kind, repeated by its weight.
+    """
+    kinds = []
+    for part in spec.split(","):
+        (kind, _, weight) = part.partition("=")
+        if kind not in TUNNEL_KINDS or not weight.isdigit():
+            raise Synthetic_Error("Tunnel mix must be kind=weight pairs of " +
+                                  ", ".join(TUNNEL_KINDS) + ", received '" + spec + "'")
+        kinds.extend([kind] * int(weight))
+    if not kinds:
+        raise Synthetic_Error("Tunnel mix '" + spec + "' has no weight")
+    return kinds
+
+
+def ipv4(protocol, payload, src_ip, dst_ip, identification=0):
+    """ An IPv4 header, with its checksum, followed by ``payload``.
+    """
+    header = INTERNET.pack(0x45, 0, 20 + len(payload), identification, 0, 64, protocol, 0, src_ip,
+                           dst_ip)
+    return (header[:10] + struct.pack("!H", internet_checksum(header)) + header[12:] + payload)
+
+
+def udp(src_port, dst_port, payload):
+    return UDP.pack(src_port, dst_port, UDP.size + len(payload), 0) + payload
+
+
+def ethernet(payload):
+    return ETHERNET.pack(MAC_A, MAC_B, ETHERTYPE_IPV4) + payload
+
+
+# The bytes each kind of tunnel puts around the inner IPv4 packet, before the outer Ethernet Frame
+OVERHEAD = {
+    "plain": 0,
+    "icmp":  INTERNET.size + ICMP.size,
+    "ipip":  INTERNET.size,
+    "gre":   INTERNET.size + GRE.size,
+    "vxlan": INTERNET.size + UDP.size + VXLAN.size + ETHERNET.size,
+}
+INNER_MINIMUM = INTERNET.size + UDP.size
+
+
+def frame(rng, kind, length, sequence):
+    """ Builds one Ethernet Frame of about ``length`` bytes (never less than the headers need)
+    carrying an inner UDP packet in a ``kind`` tunnel.
+
+    :rtype: **Binary** string
+    """
+    host    = struct.pack("!I", 0x0a000000 + rng.randrange(NUM_HOSTS))
+    peer    = struct.pack("!I", 0x0a010000 + rng.randrange(NUM_HOSTS))
+    padding = max(length - ETHERNET.size - OVERHEAD[kind] - INNER_MINIMUM, 0)
+    inner   = ipv4(PROTO_UDP, udp(1024 + rng.randrange(1024), 53, "\x00" * padding), host, peer,
+                   sequence & 0xffff)
+    if kind == "icmp":
+        inner = ipv4(PROTO_ICMP, ICMP.pack(8, 0, 0, 7, sequence & 0xffff) + inner, OUTER_SRC,
+                     OUTER_DST, sequence & 0xffff)
+    elif kind == "ipip":
+        inner = ipv4(PROTO_IPIP, inner, OUTER_SRC, OUTER_DST, sequence & 0xffff)
+    elif kind == "gre":
+        inner = ipv4(PROTO_GRE, GRE.pack(0, ETHERTYPE_IPV4) + inner, OUTER_SRC, OUTER_DST,
+                     sequence & 0xffff)
+    elif kind == "vxlan":
+        inner = ipv4(PROTO_UDP, udp(49152, PORT_VXLAN, VXLAN.pack(VXLAN_FLAG_VNI, 42 << 8) +
+                                    ethernet(inner)), OUTER_SRC, OUTER_DST, sequence & 0xffff)
+    return ethernet(inner)
+
+
+def write_capture(fileobj, packets, sizes=DEFAULT_SIZE, mix=DEFAULT_MIX, byte_order="<",
+                  nanosecond=False, seed=0):
+    """ Writes a synthetic capture of ``packets`` records to ``fileobj``.
+
+    :param sizes:      The frame size distribution (see :func:`parse_sizes`).
+    :param mix:        The tunnel mix (see :func:`parse_mix`).
+    :param byte_order: ``<`` (little endian) or ``>`` (big endian).
+    :param nanosecond: Write the nanosecond resolution magic number and timestamps.
+
+    :rtype:   int
+    :returns: The number of bytes written.
+    """
+    if byte_order not in ("<", ">"):
+        raise Synthetic_Error("byte_order must be < or >, received '" + str(byte_order) + "'")
+    rng       = random.Random(seed)
+    size_of   = parse_sizes(sizes)
+    kinds     = parse_mix(mix)
+    codec     = PCAP_Codec(byte_order, nanosecond)
+    header    = codec.packet_header
+    scale     = 1000 if nanosecond else 1
+    written   = codec.pcap_header.size
+    fileobj.write(codec.pcap_header.pack(codec.magic_number, 2, 4, 0, 0, SNAPLEN,
+                                         LINKTYPE_ETHERNET))
+    for sequence in xrange(packets):
+        data              = frame(rng, rng.choice(kinds), size_of(rng), sequence)
+        (seconds, micros) = divmod(sequence * INTERVAL, 1000000)
+        fileobj.write(header.pack(START_TIME + seconds, micros * scale, len(data), len(data)))
+        fileobj.write(data)
+        written += header.size + len(data)
+    return written
+
+
+def add_arguments(parser):
+    """ Adds the generator's options to ``parser`` (shared with the benchmark suite).
+    """
+    parser.add_argument("--packets", type=int, default=100000,
+                        help="Records to write (default: %(default)s).")
+    parser.add_argument("--sizes", default=DEFAULT_SIZE,
+                        help="Frame sizes: imix, fixed:N or uniform:MIN-MAX " +
+                             "(default: %(default)s).")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help="Weights of each kind of packet, from " + ", ".join(TUNNEL_KINDS) +
+                             " (default: %(default)s).")
+    parser.add_argument("--big-endian", action="store_true",
+                        help="Write a big endian capture (default: little endian).")
+    parser.add_argument("--nanosecond", action="store_true",
+                        help="Write nanosecond resolution timestamps.")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed for the generator (default: %(default)s).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a deterministic synthetic capture.")
+    parser.add_argument("pcap", help="Where to write the capture.")
+    add_arguments(parser)
+    args = parser.parse_args(sys.argv[1:])
+    with open(args.pcap, "wb") as out_file:
+        size = write_capture(out_file, args.packets, args.sizes, args.mix,
+                             ">" if args.big_endian else "<", args.nanosecond, args.seed)
+    sys.stderr.write("Wrote %d packets, %d bytes to %s\n" % (args.packets, size, args.pcap))
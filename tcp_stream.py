@@ -0,0 +1,412 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+Reassembles TCP streams that carry tunnelled packets (e.g. IP over a TCP VPN), and re-packetizes
+the inner packets out of them. Each direction of a flow on one of the tunnel ports is tracked in a
+flow table; segments are put back in sequence order, retransmitted bytes are discarded, and every
+complete inner packet is written out as its own record, framed under the outer link-layer header
+and timestamped with the segment that completed it.
+
+Memory is bounded by a per-flow reordering window, a cap on the number of flows and a cap on the
+bytes buffered across all of them. Idle flows are swept out periodically, and when a cap is reached
+the least recently active flows are evicted. The stream bytes a flow was still holding when it was
+dropped are counted, as the segments they came from are gone.
+
+An inner packet longer than the capture's snaplen is snapped to it, as a capture would have done:
+its record keeps the full length as ``orig_len``.
+"""
+
+##
+# Python Imports
+
+##
+# Project Imports
+from codec          import TCP, UINT16
+from decoders       import Decoder_Registry, ip_header, ETHERTYPE_IPV6, IPV4_FRAGMENT
+from frame_ethernet import ETHERTYPE_IPV4
+from frame_protocol import PROTO_TCP
+from packet_tunnel  import Tunnel_Packet
+from fragments      import timestamp
+from header_packet  import HEADER_LENGTH_PACKET
+
+##
+# Error Handling
+from errors import GenericException
+class TCP_Stream_Error(GenericException):
+    """ Errors relating to TCP stream reassembly.
+    """
+    pass
+
+##
+# Global Variables
+DEFAULT_MAX_FLOWS   = 262144
+DEFAULT_MAX_MEMORY  = 256 * 1024 * 1024     # Bytes buffered across every flow
+DEFAULT_FLOW_WINDOW = 256 * 1024            # Bytes of out-of-order data held per flow
+DEFAULT_IDLE        = 300.0                 # Seconds of capture time before a flow is dropped
+EVICT_FRACTION      = 0.9                   # Evict down to this fraction of a cap at once
+
+FLAG_FIN            = 0x01
+FLAG_SYN            = 0x02
+FLAG_RST            = 0x04
+SEQ_MODULO          = 2 ** 32
+SEQ_HALF            = 2 ** 31
+
+
+def frame_ip(stream, start):
+    """ Framing for streams of back-to-back IPv4/IPv6 packets, which delimit themselves.
+
+    :type  stream: bytearray
+
+    :rtype:   (int, int) or None
+    :returns: The length of the framing header (0) and of the packet at ``start`` (0 if more data
+        is needed to tell), or None if ``stream`` does not hold an IP packet at ``start``.
+    """
+    if len(stream) - start < 6:
+        return (0, 0)
+    version = stream[start] >> 4
+    if version == 4:
+        length = (stream[start + 2] << 8) | stream[start + 3]
+        if length < 20:
+            return None
+    elif version == 6:
+        length = 40 + ((stream[start + 4] << 8) | stream[start + 5])
+    else:
+        return None
+    return (0, length)
+
+
+def frame_length16(stream, start):
+    """ Framing for streams of packets that each follow a 2 byte, big endian length (as used by
+    OpenVPN and DNS over TCP).
+    """
+    if len(stream) - start < 2:
+        return (0, 0)
+    length = (stream[start] << 8) | stream[start + 1]
+    if not length:
+        return None
+    return (2, length)
+
+
+FRAMERS = {"ip": frame_ip, "length16": frame_length16}
+
+
+def parse_segment(packet, ports):
+    """ Decodes the IPv4/IPv6 and TCP headers of ``packet`` if it is a TCP segment to or from one
+    of ``ports``.
+
+    :rtype:   tuple or None
+    :returns: ``(key, link_length, seq, flags, payload)`` where ``payload`` is a ``buffer``, or
+        None.
+    """
+    data                     = packet.data
+    end                      = len(data)
+    (ip_offset, ether_type)  = ip_header(packet.packet_header.pcap_header.network, data, 0, end)
+    if ether_type == ETHERTYPE_IPV4 and end - ip_offset >= 20:
+        (flags_offset,)      = UINT16.unpack_from(data, ip_offset + 6)
+        header_length        = (ord(data[ip_offset]) & 0x0f) * 4
+        if ord(data[ip_offset + 9]) != PROTO_TCP or flags_offset & IPV4_FRAGMENT:
+            return None
+        (total_len,)         = UINT16.unpack_from(data, ip_offset + 2)
+        (addresses, tcp)     = (data[ip_offset + 12:ip_offset + 20], ip_offset + header_length)
+        end                  = min(end, ip_offset + total_len)
+    elif ether_type == ETHERTYPE_IPV6 and end - ip_offset >= 40:
+        if ord(data[ip_offset + 6]) != PROTO_TCP:
+            return None
+        (payload_len,)       = UINT16.unpack_from(data, ip_offset + 4)
+        (addresses, tcp)     = (data[ip_offset + 8:ip_offset + 40], ip_offset + 40)
+        end                  = min(end, tcp + payload_len)
+    else:
+        return None
+    if end - tcp < TCP.size:
+        return None
+    (src_port, dst_port, seq, _, data_offset, flags) = TCP.unpack_from(data, tcp)
+    if src_port not in ports and dst_port not in ports:
+        return None
+    payload = tcp + (data_offset >> 4) * 4
+    if payload > end:
+        return None
+    return ((addresses, src_port, dst_port), ip_offset, seq, flags,
+            buffer(data, payload, end - payload))
+
+
+class Reframed_Packet(Tunnel_Packet):
+    """ An inner packet re-framed out of a TCP stream, written out as it is.
+    """
+    registry = Decoder_Registry()
+
+
+class TCP_Flow(object):
+    """ The reassembly state of one direction of a TCP connection.
+
+    :ivar int next_seq: The sequence number of the next in-order byte, or None before any data.
+    :ivar dict pending: Out-of-order payloads keyed by sequence number, or None if there are none.
+    :ivar int pending_bytes: The number of bytes in ``pending``.
+    :ivar bytearray stream: In-order bytes not yet framed into a complete inner packet.
+    :ivar float last_seen: The capture time of the latest segment.
+    :ivar str link_header: The link-layer header inner packets are framed under.
+    :ivar bool desynced: True once the stream stopped making sense; its segments pass through.
+    """
+    __slots__ = ("next_seq", "pending", "pending_bytes", "stream", "last_seen", "link_header",
+                 "desynced")
+
+
+    def __init__(self, link_header):
+        self.next_seq      = None
+        self.pending       = None
+        self.pending_bytes = 0
+        self.stream        = bytearray()
+        self.last_seen     = 0.0
+        self.link_header   = link_header
+        self.desynced      = False
+
+
+    @property
+    def memory(self):
+        return self.pending_bytes + len(self.stream)
+
+
+class TCP_Reassembler(object):
+    """ Sits between a reader and the writer, replacing the segments of TCP tunnel flows with the
+    packets carried inside them. Segments on other ports are passed through unchanged.
+
+    :type ports: set of int
+    :ivar ports: The TCP ports tunnels run on; a segment is reassembled if either port matches.
+
+    :ivar framer: A function from :data:`FRAMERS` that delimits inner packets within a stream.
+
+    :ivar packet_class: The class (e.g. a ``functools.partial`` of
+        :class:`~packet_tunnel.Tunnel_Packet`) built for each inner packet, to decapsulate any
+        further tunnels inside it. Defaults to writing the inner packets as they are.
+
+    :ivar int segments: Segments reassembled.
+    :ivar int packets: Inner packets written.
+    :ivar int retransmitted: Segments that only repeated bytes already seen.
+    :ivar int out_of_order: Segments held back until the bytes before them arrived.
+    :ivar int dropped: Segments beyond a flow's reordering window, which are lost.
+    :ivar int desynced: Flows whose stream could not be framed; they are passed through.
+    :ivar int evicted: Flows evicted to stay within ``max_flows`` or ``max_memory``.
+    :ivar int timed_out: Flows dropped after ``idle`` seconds without a segment.
+    :ivar int discarded: Buffered stream bytes lost when flows were reset, desynchronized,
+        evicted, timed out or left unfinished at the end of the capture.
+    :ivar int snapped: Inner packets longer than the snaplen, cut short to it.
+    """
+    def __init__(self, ports, framing="ip", packet_class=Reframed_Packet,
+                 max_flows=DEFAULT_MAX_FLOWS, max_memory=DEFAULT_MAX_MEMORY,
+                 flow_window=DEFAULT_FLOW_WINDOW, idle=DEFAULT_IDLE):
+        if framing not in FRAMERS:
+            raise TCP_Stream_Error("Unknown framing '" + str(framing) + "'. Expected one of " +
+                                   ", ".join(sorted(FRAMERS)))
+        self.ports         = set(ports)
+        self.framer        = FRAMERS[framing]
+        self.packet_class  = packet_class
+        self.max_flows     = max_flows
+        self.max_memory    = max_memory
+        self.flow_window   = flow_window
+        self.idle          = idle
+        self.flows         = {}
+        self.memory        = 0
+        self.last_sweep    = None
+        self.segments      = 0
+        self.packets       = 0
+        self.retransmitted = 0
+        self.out_of_order  = 0
+        self.dropped       = 0
+        self.desynced      = 0
+        self.evicted       = 0
+        self.timed_out     = 0
+        self.discarded     = 0
+        self.snapped       = 0
+
+
+    def reassemble(self, packets):
+        """ Yields every packet of ``packets``, except that segments of tunnel flows are replaced by
+        the inner packets they complete.
+
+        :rtype: generator of :class:`~packet_tunnel.Tunnel_Packet`
+        """
+        for packet in packets:
+            segment = parse_segment(packet, self.ports)
+            if segment is None:
+                yield packet
+                continue
+            now = timestamp(packet)
+            if self.last_sweep is None or now - self.last_sweep >= self.idle / 4:
+                self.sweep(now)
+            for inner in self.add(packet, segment, now):
+                yield inner
+        for key in self.flows.keys():
+            self.remove(key)
+
+
+    def add(self, packet, segment, now):
+        """ Feeds one segment to its flow.
+
+        :rtype:   list
+        :returns: The inner packets it completes, or the segment itself for desynchronized flows.
+        """
+        (key, link_length, seq, flags, payload) = segment
+        flow = self.flows.get(key)
+        if flow is None:
+            if len(self.flows) >= self.max_flows:
+                self.evict(int(self.max_flows * EVICT_FRACTION), self.max_memory)
+            flow = self.flows[key] = TCP_Flow(str(packet.data[:link_length]))
+        flow.last_seen = now
+        if flow.desynced:
+            return [packet]
+        self.segments += 1
+        if flags & FLAG_RST:
+            self.remove(key)
+            return []
+        if flags & FLAG_SYN:
+            (flow.next_seq, seq) = ((seq + 1) % SEQ_MODULO, (seq + 1) % SEQ_MODULO)
+        elif flow.next_seq is None:
+            flow.next_seq = seq             # Picked up mid-stream
+        memory_before = flow.memory
+        if len(payload):
+            self.insert(flow, seq, payload)
+        inner = self.frame(key, flow, packet)
+        if key in self.flows:
+            self.memory += flow.memory - memory_before
+            if flags & FLAG_FIN and not flow.pending:
+                self.remove(key)
+            elif self.memory > self.max_memory:
+                self.evict(self.max_flows, int(self.max_memory * EVICT_FRACTION))
+        return inner
+
+
+    def insert(self, flow, seq, payload):
+        """ Appends ``payload`` to the stream if it is next in sequence, otherwise holds it back
+        within the reordering window. Bytes already seen are trimmed off.
+        """
+        ahead = (seq - flow.next_seq) % SEQ_MODULO
+        if ahead >= SEQ_HALF:
+            # Starts before next_seq: a retransmission, or a segment that overlaps what we have
+            behind = SEQ_MODULO - ahead
+            if behind >= len(payload):
+                self.retransmitted += 1
+                return
+            (payload, ahead) = (buffer(payload, behind), 0)
+        if ahead:
+            if flow.pending is None:
+                flow.pending = {}
+            held = flow.pending.get(seq)
+            if held is not None and len(held) >= len(payload):
+                self.retransmitted += 1
+            elif flow.pending_bytes + len(payload) > self.flow_window:
+                self.dropped += 1
+            else:
+                flow.pending_bytes += len(payload) - (len(held) if held is not None else 0)
+                flow.pending[seq]   = str(payload)
+                self.out_of_order  += 1
+            return
+        flow.stream  += payload
+        flow.next_seq = (flow.next_seq + len(payload)) % SEQ_MODULO
+        while flow.pending:
+            # The held segment that starts closest to (at or before) next_seq fills the hole next
+            (ahead, seq) = min(((held_seq - flow.next_seq) % SEQ_MODULO, held_seq)
+                               for held_seq in flow.pending)
+            if 0 < ahead < SEQ_HALF:
+                break
+            held                = flow.pending.pop(seq)
+            flow.pending_bytes -= len(held)
+            behind              = (SEQ_MODULO - ahead) % SEQ_MODULO
+            if behind < len(held):
+                flow.stream  += buffer(held, behind)
+                flow.next_seq = (flow.next_seq + len(held) - behind) % SEQ_MODULO
+        if not flow.pending:
+            flow.pending = None
+
+
+    def frame(self, key, flow, packet):
+        """ Cuts every complete inner packet off the front of the flow's stream. The packets framed
+        before a flow loses sync are still returned, and counted, ahead of the segment itself.
+
+        :rtype: list
+        """
+        inner  = []
+        stream = flow.stream
+        start  = 0
+        synced = True
+        while start < len(stream):
+            framing = self.framer(stream, start)
+            if framing is None:
+                synced = False
+                break
+            (header, length) = framing
+            if not length or len(stream) - start < header + length:
+                break
+            data    = str(stream[start + header:start + header + length])
+            version = ord(data[0]) >> 4
+            if version not in (4, 6):
+                synced = False
+                break
+            inner.append(self.reframe(flow, packet, data,
+                                      ETHERTYPE_IPV4 if version == 4 else ETHERTYPE_IPV6))
+            self.packets += 1
+            start        += header + length
+        del stream[:start]
+        if not synced:
+            self.desync(key, flow)
+            inner.append(packet)
+        return inner
+
+
+    def reframe(self, flow, packet, data, ether_type):
+        """ Builds a record for one inner packet, under the flow's link-layer header with its
+        EtherType rewritten, and with the timestamp of ``packet``.
+        """
+        link_header = flow.link_header
+        if link_header:
+            link_header = link_header[:-2] + UINT16.pack(ether_type)
+        packet_header = packet.packet_header
+        orig_len      = len(link_header) + len(data)
+        incl_len      = min(orig_len, packet_header.pcap_header.snaplen)
+        if incl_len < orig_len:
+            self.snapped += 1
+        record        = packet_header.codec.packet_header.pack(packet_header.ts_sec,
+                                                               packet_header.ts_usec, incl_len,
+                                                               orig_len) + link_header + data
+        return self.packet_class(packet_header.pcap_header, record[:HEADER_LENGTH_PACKET +
+                                                                   incl_len])
+
+
+    def desync(self, key, flow):
+        """ Gives up on a flow whose stream cannot be framed. Its buffered bytes are discarded and
+        its later segments are passed through unchanged.
+        """
+        self.desynced     += 1
+        self.discarded    += flow.memory
+        flow.desynced      = True
+        flow.pending       = None
+        flow.pending_bytes = 0
+        flow.stream        = bytearray()
+
+
+    def remove(self, key):
+        """ Forgets a flow, counting the stream bytes it was still holding as discarded.
+        """
+        flow            = self.flows.pop(key)
+        self.memory    -= flow.memory
+        self.discarded += flow.memory
+
+
+    def sweep(self, now):
+        """ Drops flows that have been idle for longer than ``idle`` seconds.
+        """
+        self.last_sweep = now
+        for (key, flow) in self.flows.items():
+            if now - flow.last_seen > self.idle:
+                self.timed_out += 1
+                self.remove(key)
+
+
+    def evict(self, max_flows, max_memory):
+        """ Evicts the least recently active flows until there are at most ``max_flows`` of them
+        buffering at most ``max_memory`` bytes.
+        """
+        for (key, flow) in sorted(self.flows.items(), key=lambda item: item[1].last_seen):
+            if len(self.flows) <= max_flows and self.memory <= max_memory:
+                break
+            self.evicted += 1
+            self.remove(key)
@@ -0,0 +1,72 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+Peeling tunnels with :mod:`decoders`: with ``depth`` 0 every recognized tunnel comes off, and
+peeling stops at the first layer that is not one, such as an ordinary ping carried in an ICMP
+tunnel.
+
+.. example::
+
+    ``` bash
+    python -m unittest test_decoders
+    ```
+"""
+
+##
+# Fix Path
+import __init__
+
+##
+# Python Imports
+import unittest
+
+##
+# Project Imports
+from codec          import ICMP
+from decoders       import REGISTRY, LINKTYPE_ETHERNET
+from frame_protocol import PROTO_ICMP
+from synthetic      import ipv4, ethernet, OUTER_SRC, OUTER_DST
+
+##
+# Global Variables
+HOST_SRC  = "\x0a\x00\x00\x01"
+HOST_DST  = "\x0a\x01\x00\x01"
+ECHO_DATA = "abcdefghijklmnopqrstuvwabcdefghi"     # What Windows' ping sends
+
+
+def icmp_tunnel(inner):
+    return ethernet(ipv4(PROTO_ICMP, ICMP.pack(8, 0, 0, 7, 1) + inner, OUTER_SRC, OUTER_DST))
+
+
+class Decapsulate_Test(unittest.TestCase):
+
+    def decapsulate(self, frame, depth):
+        return REGISTRY.decapsulate(LINKTYPE_ETHERNET, frame, 0, len(frame), depth)
+
+
+    def test_depth_zero_stops_at_inner_echo_request(self):
+        echo = ipv4(PROTO_ICMP, ICMP.pack(8, 0, 0, 1, 1) + ECHO_DATA, HOST_SRC, HOST_DST)
+        (header, payload, layers) = self.decapsulate(icmp_tunnel(echo), 0)
+        self.assertEqual(layers, 1)
+        self.assertEqual(str(payload), echo)
+        self.assertEqual(header, ethernet("")[:len(header)])
+
+
+    def test_depth_zero_peels_nested_icmp_tunnels(self):
+        echo      = ipv4(PROTO_ICMP, ICMP.pack(8, 0, 0, 1, 1) + ECHO_DATA, HOST_SRC, HOST_DST)
+        tunnelled = ipv4(PROTO_ICMP, ICMP.pack(8, 0, 0, 7, 2) + echo, HOST_SRC, HOST_DST)
+        (_, payload, layers) = self.decapsulate(icmp_tunnel(tunnelled), 0)
+        self.assertEqual(layers, 2)
+        self.assertEqual(str(payload), echo)
+
+
+    def test_plain_ping_is_not_a_tunnel(self):
+        ping = ethernet(ipv4(PROTO_ICMP, ICMP.pack(8, 0, 0, 1, 1) + ECHO_DATA, OUTER_SRC,
+                             OUTER_DST))
+        self.assertIsNone(self.decapsulate(ping, 0))
+        self.assertIsNone(self.decapsulate(ping, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
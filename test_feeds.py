@@ -0,0 +1,124 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+Round trips through :mod:`feeds`: a capture sent over a socket pair in arbitrary pieces must come
+out of a :class:`~feeds.Feed_Reader` as the same records the file reader gives, and a
+:class:`~feeds.Feed_Server` must forget each feed once it ends.
+
+.. example::
+
+    ``` bash
+    python -m unittest test_feeds
+    ```
+"""
+
+##
+# Fix Path
+import __init__
+
+##
+# Python Imports
+import io
+import random
+import socket
+import asyncore
+import unittest
+import threading
+
+##
+# Project Imports
+from feeds     import Feed_Reader, Feed_Server
+from reader    import PCAP_Reader
+from synthetic import write_capture
+
+##
+# Global Variables
+PACKETS   = 2000
+MAX_PIECE = 5000                # Most bytes sent at a time, so records arrive split at random
+
+
+class Record_Sink(object):
+    """ A feed sink that keeps the raw record of every packet.
+    """
+    def __init__(self):
+        self.records = []
+        self.closed  = False
+
+
+    def write_packet(self, packet):
+        self.records.append(str(packet.bytes))
+
+
+    def close(self):
+        self.closed = True
+
+
+def synthetic_capture():
+    capture = io.BytesIO()
+    write_capture(capture, PACKETS, seed=7)
+    return capture.getvalue()
+
+
+def send_in_pieces(sock, data, seed=0):
+    """ Sends ``data`` over ``sock`` in pieces of random length, then closes it.
+    """
+    rng    = random.Random(seed)
+    offset = 0
+    while offset < len(data):
+        length  = rng.randint(1, MAX_PIECE)
+        sock.sendall(data[offset:offset + length])
+        offset += length
+    sock.close()
+
+
+class Feed_Test(unittest.TestCase):
+
+    def test_socket_pair_round_trip(self):
+        capture     = synthetic_capture()
+        expected    = list(PCAP_Reader(io.BytesIO(capture)).iter_records())
+        (near, far) = socket.socketpair()
+        sinks       = []
+        feed_map    = {}
+        def sink_factory(peer, pcap_header):
+            sinks.append(Record_Sink())
+            return sinks[-1]
+        feed   = Feed_Reader(far, sink_factory, map=feed_map)
+        sender = threading.Thread(target=send_in_pieces, args=(near, capture))
+        sender.start()
+        asyncore.loop(timeout=0.05, use_poll=True, map=feed_map)
+        sender.join()
+        self.assertIsNone(feed.error)
+        self.assertEqual(len(sinks), 1)
+        self.assertTrue(sinks[0].closed)
+        self.assertEqual(len(sinks[0].records), PACKETS)
+        self.assertEqual(sinks[0].records, expected)
+
+
+    def test_server_forgets_finished_feeds(self):
+        capture  = synthetic_capture()
+        sinks    = []
+        feed_map = {}
+        def sink_factory(peer, pcap_header):
+            sinks.append(Record_Sink())
+            return sinks[-1]
+        server = Feed_Server(("127.0.0.1", 0), sink_factory, map=feed_map)
+        port   = server.socket.getsockname()[1]
+        try:
+            for attempt in xrange(3):
+                client = socket.create_connection(("127.0.0.1", port))
+                sender = threading.Thread(target=send_in_pieces, args=(client, capture, attempt))
+                sender.start()
+                while server.accepted <= attempt or server.feeds:
+                    asyncore.loop(timeout=0.05, use_poll=True, map=feed_map, count=1)
+                sender.join()
+        finally:
+            server.close()
+        self.assertEqual(server.accepted, 3)
+        self.assertEqual(server.feeds, [])
+        self.assertEqual([len(sink.records) for sink in sinks], [PACKETS] * 3)
+        self.assertTrue(all(sink.closed for sink in sinks))
+
+
+if __name__ == "__main__":
+    unittest.main()
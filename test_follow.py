@@ -0,0 +1,100 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+Following a capture (:mod:`follow`) must never rotate onto our own output. A timestamp-named
+capture, whose rotation pattern matches any name starting with digits, is followed with the default
+output name next to it, and the run must end once the capture stops growing, with the output holding
+each packet once.
+
+.. example::
+
+    ``` bash
+    python -m unittest test_follow
+    ```
+"""
+
+##
+# Fix Path
+import __init__
+
+##
+# Python Imports
+import io
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+##
+# Project Imports
+from follow    import Follower, rotation_pattern
+from reader    import PCAP_Reader
+from synthetic import write_capture
+
+##
+# Global Variables
+PACKETS  = 500
+CAPTURE  = "20240101120000.pcap"
+DEADLINE = 30                   # Seconds before a run that never stops is killed
+RUN_ME   = os.path.join(os.path.dirname(os.path.abspath(__file__)), "run_me.py")
+
+
+def count_records(path):
+    with io.open(path, "rb") as in_file:
+        return sum(1 for _ in PCAP_Reader(in_file).iter_classic_records())
+
+
+class Follow_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="decap_follow_")
+        self.path      = os.path.join(self.directory, CAPTURE)
+        with open(self.path, "wb") as out_file:
+            write_capture(out_file, PACKETS, seed=3)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+    def touch(self, name):
+        with open(os.path.join(self.directory, name), "wb"):
+            pass
+
+
+    def test_rotation_pattern_anchors_digits(self):
+        self.assertEqual(rotation_pattern(CAPTURE), "[0-9]*.pcap")
+        self.assertEqual(rotation_pattern("tunnel.pcap"), "tunnel.pcap*")
+
+
+    def test_candidates_leave_out_output(self):
+        output = os.path.join(self.directory, "out.pcap")
+        for name in ("decap_" + CAPTURE, "quarantine_" + CAPTURE, CAPTURE + ".idx",
+                     "out.0001.pcap", "20240101130000.pcap"):
+            self.touch(name)
+        follower = Follower(self.path, exclude=[output])
+        self.assertEqual(sorted(follower.candidates()), [CAPTURE, "20240101130000.pcap"])
+
+
+    def test_follow_digit_named_capture(self):
+        process  = subprocess.Popen([sys.executable, RUN_ME, self.path, "--follow",
+                                     "--follow-idle", "0.5", "--follow-poll", "0.05"],
+                                    stderr=subprocess.PIPE)
+        deadline = time.time() + DEADLINE
+        while process.poll() is None and time.time() < deadline:
+            time.sleep(0.05)
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+            self.fail("--follow did not stop once the capture stopped growing")
+        self.assertEqual(process.returncode, 0, process.stderr.read())
+        output = os.path.join(self.directory, "decap_" + CAPTURE)
+        self.assertEqual(count_records(output), PACKETS)
+
+
+if __name__ == "__main__":
+    unittest.main()
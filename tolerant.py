@@ -0,0 +1,112 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+Keeps a run going past records that fail to decode. A record whose packet cannot be built is
+either passed through unchanged or diverted to a quarantine capture, and the errors are counted
+per exception class, so one bad record costs that record rather than the whole run.
+
+Corrupted record lengths are handled by the reader (see ``PCAP_Reader``'s ``resync``), which skips
+ahead to the next plausible record.
+"""
+
+##
+# Python Imports
+import struct
+import collections
+
+##
+# Project Imports
+from decoders      import Decoder_Registry
+from packet_tunnel import Tunnel_Packet
+
+##
+# Error Handling
+from errors import GenericException
+
+##
+# Global Variables
+DECODE_ERRORS = (GenericException, struct.error, IndexError)
+
+
+class Passthrough_Packet(Tunnel_Packet):
+    """ A record that could not be decoded, written out exactly as it was read.
+    """
+    registry = Decoder_Registry()
+
+
+class Tolerant_Decoder(object):
+    """ Builds a packet from every ``(pcap_header, record)`` without letting a bad record end the
+    run.
+
+    .. example::
+
+        ``` python
+        decoder = Tolerant_Decoder(Tunnel_Packet)
+        for packet in decoder.decode(reader.iter_classic_records()):
+            writer.write_packet(packet)
+        ```
+
+    :ivar packet_class: The class built for each record.
+
+    :type quarantine: :class:`writer.PCAP_Writer` or None
+    :ivar quarantine: Where records that fail to decode are written. If None they are passed
+        through unchanged instead.
+
+    :ivar collections.Counter errors: The number of errors by exception class name.
+    :ivar int quarantined: Records written to ``quarantine``.
+    :ivar int dropped: Records that could not even be passed through (e.g. a broken Packet
+        Header), so were left out.
+    :ivar str stopped: The reader error that ended the capture early, or None.
+    """
+    def __init__(self, packet_class=Tunnel_Packet, quarantine=None):
+        self.packet_class = packet_class
+        self.quarantine   = quarantine
+        self.errors       = collections.Counter()
+        self.quarantined  = 0
+        self.dropped      = 0
+        self.stopped      = None
+
+
+    def decode(self, records):
+        """ Yields a packet for every record of ``records`` that decodes, and a
+        :class:`Passthrough_Packet` for the rest unless they are quarantined. An error from the
+        reader itself ends the capture there, keeping everything before it.
+
+        :rtype: generator of :class:`~packet_tunnel.Tunnel_Packet`
+        """
+        records = iter(records)
+        while True:
+            try:
+                (pcap_header, record) = next(records)
+            except StopIteration:
+                return
+            except DECODE_ERRORS as error:
+                self.errors[error.__class__.__name__] += 1
+                self.stopped = str(error)
+                return
+            try:
+                packet = self.packet_class(pcap_header, record)
+            except DECODE_ERRORS as error:
+                self.errors[error.__class__.__name__] += 1
+                packet = self.divert(pcap_header, record)
+                if packet is None:
+                    continue
+            yield packet
+
+
+    def divert(self, pcap_header, record):
+        """ Quarantines a record that failed to decode, or wraps it to be passed through.
+
+        :rtype:   :class:`Passthrough_Packet` or None
+        :returns: The record to write out in place of the packet, if any.
+        """
+        if self.quarantine is not None:
+            self.quarantine.write_record(record)
+            self.quarantined += 1
+            return None
+        try:
+            return Passthrough_Packet(pcap_header, record)
+        except DECODE_ERRORS:
+            self.dropped += 1
+            return None
@@ -0,0 +1,104 @@
+"""
+:author: Shane Boissevain
+:date:   2026-10-17
+
+Streams decapsulated packets back out to a LibPCAP file through a bounded buffer.
+"""
+
+##
+# Python Imports
+
+##
+# Project Imports
+
+##
+# Error Handling
+from errors import GenericException
+class Writer_Error(GenericException):
+    """ Errors relating to writing a PCAP stream.
+    """
+    pass
+
+##
+# Global Variables
+DEFAULT_FLUSH_SIZE = 1024 * 1024
+
+
+class PCAP_Writer(object):
+    """ Writes the PCAP Global Header once, then appends records through a buffer that is flushed
+    to the file object whenever it grows past ``flush_size`` bytes. Output memory is therefore
+    bounded by ``flush_size`` plus the largest single record, regardless of the capture size.
+
+    :type fileobj: file
+    :ivar fileobj: The (binary) file object being written to. Only ``write()`` is used.
+
+    :type flush_size: int
+    :ivar flush_size: The number of buffered bytes that triggers a write to ``fileobj``.
+
+    :type packet_count: int
+    :ivar packet_count: The number of records written so far.
+
+    :param bool header: Write the PCAP Global Header. False appends records to a capture that
+        already has one.
+    """
+    def __init__(self, fileobj, pcap_header, flush_size=DEFAULT_FLUSH_SIZE, header=True):
+        if flush_size < 1:
+            raise Writer_Error("flush_size must be at least 1 byte, received " + str(flush_size))
+        self.fileobj      = fileobj
+        self.flush_size   = flush_size
+        self.packet_count = 0
+        self.buffer       = bytearray()
+        self.closed       = False
+        if header:
+            self.write_header(pcap_header)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def write_header(self, pcap_header):
+        """ Buffers the PCAP Global Header. Called once, by the constructor, unless appending.
+        """
+        self.buffer += pcap_header.raw_bytes
+
+
+    def write_record(self, *parts):
+        """ Appends a single record, given as any number of **binary** strings or buffers (e.g. the
+        Packet Header, Ethernet Frame and payload), without joining them together first.
+        """
+        if self.closed:
+            raise Writer_Error("Cannot write to a closed PCAP_Writer")
+        for part in parts:
+            self.buffer += part
+        self.packet_count += 1
+        if len(self.buffer) >= self.flush_size:
+            self.flush()
+
+
+    def write_packet(self, packet):
+        """ Appends the decapsulated form of ``packet``.
+
+        :type packet: :class:`~packet.Packet`
+        """
+        self.write_record(*packet.decapsulate_parts())
+
+
+    def flush(self):
+        """ Writes any buffered bytes out to ``fileobj``.
+        """
+        if self.buffer:
+            self.fileobj.write(self.buffer)
+            del self.buffer[:]
+
+
+    def close(self):
+        """ Flushes the buffer. The underlying file object is left open for the caller to close.
+        """
+        if not self.closed:
+            self.flush()
+            self.closed = True